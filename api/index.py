@@ -5,5 +5,6 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT_DIR / "flask_version"))
 
-from app import app  # noqa: E402,F401
-
+# Snapshot routes are served without importing Flask/SQLAlchemy; the full app
+# is loaded on first use of any other route.
+from serverless import app  # noqa: E402,F401
@@ -0,0 +1,138 @@
+function showPage(id) {
+  document.querySelectorAll('.page').forEach(p => p.classList.remove('active'));
+  document.querySelectorAll('.nav-item').forEach(n => n.classList.remove('active'));
+  const page = document.getElementById('page-' + id);
+  if (page) page.classList.add('active');
+  window.scrollTo({top: 0, behavior: 'smooth'});
+  const map = {home:'Página Inicial', acesso:'Acesso', financeiros:'Transparência', prestacao:'Transparência', contratacoes:'Transparência', projetos:'Projetos', politicas:'Transparência'};
+  document.querySelectorAll('.nav-item').forEach(n => {
+    if (map[id] && n.textContent.trim().startsWith(map[id])) n.classList.add('active');
+  });
+}
+
+function toggleProj(card) {
+  const wasOpen = card.classList.contains('open');
+  document.querySelectorAll('.proj-card.open').forEach(c => c.classList.remove('open'));
+  if (!wasOpen) card.classList.add('open');
+}
+
+function filtrarProjetos(status, btn) {
+  document.querySelectorAll('#proj-filter .filter-btn').forEach(b => b.classList.remove('active'));
+  btn.classList.add('active');
+  document.querySelectorAll('#proj-lista .proj-card').forEach(card => {
+    if (status === 'todos' || card.dataset.status === status) {
+      card.style.display = '';
+    } else {
+      card.style.display = 'none';
+    }
+  });
+}
+
+function setEsicStatus(type, message) {
+  const statusEl = document.getElementById('esic-status');
+  if (!statusEl) return;
+  statusEl.className = 'form-status ' + type;
+  statusEl.textContent = message;
+}
+
+function getPortalUrl(path) {
+  if (window.location.protocol === 'file:') {
+    return 'http://127.0.0.1:8000' + path;
+  }
+  return path;
+}
+async function submitEsicForm(event) {
+  event.preventDefault();
+  const tipo = document.getElementById('esic-tipo').value.trim();
+  const setor = document.getElementById('esic-setor').value.trim();
+  const formatoResposta = document.getElementById('esic-resposta').value.trim();
+  const nome = document.getElementById('esic-nome').value.trim();
+  const email = document.getElementById('esic-email').value.trim();
+  const descricao = document.getElementById('esic-descricao').value.trim();
+  const anexoInput = document.getElementById('esic-anexo');
+  const anexo = anexoInput && anexoInput.files ? anexoInput.files[0] : null;
+  const submitBtn = document.getElementById('esic-submit');
+  const form = document.getElementById('esic-form');
+
+  if (!descricao) {
+    setEsicStatus('error', 'Preencha a descrição do pedido antes de enviar.');
+    return;
+  }
+
+  submitBtn.disabled = true;
+  submitBtn.textContent = 'Enviando...';
+  setEsicStatus('success', 'Processando solicitação...');
+
+  try {
+    const body = new FormData();
+    body.append('tipo', tipo);
+    body.append('setor', setor);
+    body.append('descricao', descricao);
+    body.append('nome', nome);
+    body.append('email', email);
+    body.append('formato_resposta', formatoResposta);
+    if (anexo) {
+      body.append('anexo', anexo);
+    }
+
+    const response = await fetch(getPortalUrl('/api/esic/submit/'), {
+      method: 'POST',
+      body: body,
+    });
+
+    let payload = {};
+    try {
+      payload = await response.json();
+    } catch (_err) {}
+
+    if (!response.ok) {
+      const message = payload.error || 'Nao foi possivel enviar. Tente novamente.';
+      setEsicStatus('error', message);
+      return;
+    }
+
+    setEsicStatus(
+      'success',
+      'Solicitação registrada com sucesso. Protocolo: ' + (payload.protocolo || '-')
+    );
+    form.reset();
+  } catch (_err) {
+    setEsicStatus('error', 'Falha de conexão com o servidor.');
+  } finally {
+    submitBtn.disabled = false;
+    submitBtn.textContent = '📤 Enviar Solicitação';
+  }
+}
+
+function enhanceInteractiveAccessibility() {
+  const clickable = document.querySelectorAll('[onclick]');
+  clickable.forEach(function (el) {
+    const isAnchor = el.tagName === 'A';
+    const hasHref = isAnchor && el.hasAttribute('href');
+    if (!hasHref) {
+      el.setAttribute('role', 'button');
+      el.setAttribute('tabindex', '0');
+      el.addEventListener('keydown', function (event) {
+        if (event.key === 'Enter' || event.key === ' ') {
+          event.preventDefault();
+          el.click();
+        }
+      });
+    }
+  });
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+  if (window.location.protocol === 'file:') {
+    document.querySelectorAll('.admin-link').forEach(function (el) {
+      el.setAttribute('href', 'http://127.0.0.1:8000/admin/');
+      el.setAttribute('target', '_blank');
+      el.setAttribute('rel', 'noopener');
+    });
+  }
+  const form = document.getElementById('esic-form');
+  if (form) {
+    form.addEventListener('submit', submitEsicForm);
+  }
+  enhanceInteractiveAccessibility();
+});
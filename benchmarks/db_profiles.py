@@ -0,0 +1,157 @@
+"""Benchmark de leitura/escrita concorrente para os perfis de banco.
+
+Uso:
+    python benchmarks/db_profiles.py [--seconds 5] [--readers 4] [--writers 2]
+
+Cada perfil (ver portal_transparencia/db_profiles.py) roda em um processo
+separado. Sem DATABASE_URL, cada execucao usa um arquivo SQLite temporario;
+com DATABASE_URL (PostgreSQL) o mesmo banco e medido em todos os perfis.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _child(profile, seconds, readers, writers, sqlite_path):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'portal_transparencia.settings'
+    os.environ['DATABASE_PROFILE'] = profile
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    if sqlite_path:
+        settings.DATABASES['default']['NAME'] = sqlite_path
+
+    from django.core.management import call_command
+    from django.db import OperationalError, connection, transaction
+    from django.utils import timezone
+
+    from core.models import EsicPedido, PortalInformacao, UnidadeGestora
+
+    call_command('migrate', verbosity=0)
+    unidade, _ = UnidadeGestora.objects.get_or_create(
+        codigo='UG-BENCH', defaults={'nome': 'Unidade Benchmark', 'sigla': 'UGB'}
+    )
+    for ordem in range(20):
+        PortalInformacao.objects.create(
+            secao='FINANCEIROS', titulo=f'Relatorio {ordem}', descricao='x' * 200, ordem=ordem
+        )
+    connection.close()
+
+    counters = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def bump(key):
+        with lock:
+            counters[key] += 1
+
+    def reader():
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    list(PortalInformacao.objects.filter(ativo=True))
+                    EsicPedido.objects.filter(status='ABERTO').count()
+                    bump('reads')
+                except OperationalError:
+                    bump('errors')
+        finally:
+            connection.close()
+
+    def writer(worker):
+        seq = 0
+        try:
+            while time.perf_counter() < deadline:
+                seq += 1
+                try:
+                    with transaction.atomic():
+                        EsicPedido.objects.create(
+                            protocolo=f'B-{os.getpid()}-{worker}-{seq}',
+                            tipo='PEDIDO_ACESSO',
+                            descricao='Pedido de benchmark',
+                            status='ABERTO',
+                            prazo=timezone.now(),
+                            unidade=unidade,
+                        )
+                    bump('writes')
+                except OperationalError:
+                    bump('errors')
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    EsicPedido.objects.filter(protocolo__startswith=f'B-{os.getpid()}-').delete()
+    PortalInformacao.objects.filter(titulo__startswith='Relatorio ', descricao='x' * 200).delete()
+
+    print(json.dumps({
+        'profile': profile,
+        'engine': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+        'reads_per_s': round(counters['reads'] / elapsed, 1),
+        'writes_per_s': round(counters['writes'] / elapsed, 1),
+        'errors': counters['errors'],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--profile', help=argparse.SUPPRESS)
+    parser.add_argument('--sqlite-path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        _child(args.profile, args.seconds, args.readers, args.writers, args.sqlite_path)
+        return
+
+    from portal_transparencia.db_profiles import PROFILES
+
+    env = {
+        **os.environ,
+        'DJANGO_DEBUG': 'false',
+        'DJANGO_SECRET_KEY': 'benchmark',
+        'DJANGO_ALLOWED_HOSTS': 'benchmark.local',
+    }
+    print(f'{"perfil":<12} {"engine":<12} {"leituras/s":>12} {"escritas/s":>12} {"erros":>7}')
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            command = [
+                sys.executable, __file__,
+                '--profile', profile,
+                '--seconds', str(args.seconds),
+                '--readers', str(args.readers),
+                '--writers', str(args.writers),
+            ]
+            if not os.getenv('DATABASE_URL'):
+                command += ['--sqlite-path', str(Path(tmp) / 'bench.sqlite3')]
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+        print(
+            f'{result["profile"]:<12} {result["engine"]:<12} '
+            f'{result["reads_per_s"]:>12} {result["writes_per_s"]:>12} {result["errors"]:>7}'
+        )
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, str(BASE_DIR))
+    main()
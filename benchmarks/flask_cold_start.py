@@ -0,0 +1,106 @@
+"""Benchmark de cold start da versao Flask (deploy serverless).
+
+Uso:
+    python benchmarks/flask_cold_start.py [--runs 10]
+
+Cada execucao e um processo Python novo com diretorio de runtime vazio (como
+uma instancia recem-criada na Vercel). Mede o import da entrada, a primeira
+requisicao ``GET /`` e o tempo total do processo, comparando o app completo
+(``app``) com a entrada serverless (``serverless``, que usa o snapshot).
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FLASK_DIR = BASE_DIR / 'flask_version'
+
+ENTRYPOINTS = ('app', 'serverless')
+
+
+def _child(entrypoint):
+    started = time.perf_counter()
+    sys.path.insert(0, str(FLASK_DIR))
+    module = __import__(entrypoint)
+    imported = time.perf_counter()
+
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'benchmark.local',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.version': (1, 0),
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = b''.join(module.app(environ, lambda s, h, exc_info=None: status.append(s)))
+    finished = time.perf_counter()
+
+    print(json.dumps({
+        'entrypoint': entrypoint,
+        'status': status[0],
+        'bytes': len(body),
+        'import_ms': (imported - started) * 1000,
+        'first_request_ms': (finished - imported) * 1000,
+        'sqlalchemy_loaded': 'sqlalchemy' in sys.modules,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--entrypoint', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.entrypoint:
+        _child(args.entrypoint)
+        return
+
+    print(
+        f'{"entrada":<12} {"import ms":>10} {"1a req ms":>10} {"processo ms":>12} '
+        f'{"sqlalchemy":>11} {"status":>8}'
+    )
+    for entrypoint in ENTRYPOINTS:
+        results = []
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {**os.environ, 'FLASK_RUNTIME_DIR': tmp}
+                started = time.perf_counter()
+                output = subprocess.run(
+                    [sys.executable, __file__, '--entrypoint', entrypoint],
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                result['process_ms'] = (time.perf_counter() - started) * 1000
+            results.append(result)
+
+        print(
+            f'{entrypoint:<12} '
+            f'{statistics.median(r["import_ms"] for r in results):>10.1f} '
+            f'{statistics.median(r["first_request_ms"] for r in results):>10.1f} '
+            f'{statistics.median(r["process_ms"] for r in results):>12.1f} '
+            f'{"sim" if results[-1]["sqlalchemy_loaded"] else "nao":>11} '
+            f'{results[-1]["status"].split()[0]:>8}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark da leitura paralela de abas na importacao de despesas.
+
+Uso:
+    python benchmarks/import_parallel.py [--abas 8] [--linhas 20000] [--processos 1,2,4,8]
+
+Gera um XLSX com ``--abas`` abas de ``--linhas`` despesas cada e mede
+``import_sources`` em modo simulacao (le, valida e compara hashes sem gravar)
+com cada numero de processos, em um banco SQLite temporario. O speedup so
+aparece ate o numero de CPUs disponiveis.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _setup(tmp):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'portal_transparencia.settings'
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    settings.DATABASES['default']['NAME'] = str(Path(tmp) / 'benchmark.sqlite3')
+
+    from django.core.management import call_command
+
+    from core.models import UnidadeGestora
+
+    call_command('migrate', verbosity=0)
+    UnidadeGestora.objects.get_or_create(codigo='UG-BENCH', defaults={'nome': 'Unidade Benchmark', 'sigla': 'UGB'})
+
+
+def _build_workbook(path, abas, linhas):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for aba in range(abas):
+        ws = wb.create_sheet(f'Mes {aba + 1}')
+        ws.append(['codigo', 'descricao', 'categoria', 'dotacao', 'empenhado', 'liquidado', 'pago', 'exercicio', 'unidade'])
+        for n in range(linhas):
+            ws.append([f'D-{aba}-{n}', f'Despesa {n}', 'CUSTEIO', '1.234,56', 1000, 900.5, 800, 2025, 'UG-BENCH'])
+    wb.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--abas', type=int, default=8)
+    parser.add_argument('--linhas', type=int, default=20000)
+    parser.add_argument('--processos', default='1,2,4,8')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(tmp)
+
+        from core.importacao import DespesaSpec, empty_report, import_sources, list_sources
+
+        path = Path(tmp) / 'despesas.xlsx'
+        _build_workbook(path, args.abas, args.linhas)
+        sources = list_sources([path], todas_abas=True)
+
+        baseline = None
+        for processos in [int(value) for value in args.processos.split(',')]:
+            relatorio = empty_report(simular=True)
+            started = time.perf_counter()
+            linhas = import_sources(DespesaSpec(), sources, relatorio, processos=processos, simular=True)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(json.dumps({
+                'processos': processos,
+                'linhas': linhas,
+                'segundos': round(elapsed, 2),
+                'linhas_por_segundo': round(linhas / elapsed),
+                'speedup': round(baseline / elapsed, 2),
+            }))
+
+
+if __name__ == '__main__':
+    main()
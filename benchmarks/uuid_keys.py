@@ -0,0 +1,150 @@
+"""Benchmark de chaves primarias: texto de 36 caracteres x UUIDField.
+
+Uso:
+    python benchmarks/uuid_keys.py [--unidades 200] [--despesas 200000] [--repeticoes 20]
+
+Cria duas copias de ``unidade``/``despesa`` (ids e FK como ``CharField(36)``
+e como ``UUIDField``, com o tipo de coluna que o Django usa no banco) e mede
+o tamanho dos indices de PK/FK, um JOIN agregado e buscas pontuais por PK.
+Sem DATABASE_URL usa um arquivo SQLite temporario (UUIDField vira
+``char(32)``); com DATABASE_URL (PostgreSQL) mede o tipo ``uuid`` nativo.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LOTE = 5000
+
+
+def _setup(tmp):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'portal_transparencia.settings'
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    if not os.getenv('DATABASE_URL'):
+        settings.DATABASES['default']['NAME'] = str(Path(tmp) / 'benchmark.sqlite3')
+
+
+def _layouts():
+    from django.db import models
+
+    return {
+        'char36': models.CharField(max_length=36),
+        'uuid': models.UUIDField(),
+    }
+
+
+def _create(cursor, connection, nome, field, unidades, despesas):
+    quote = connection.ops.quote_name
+    tipo = field.db_type(connection)
+    unidade, despesa = quote(f'bench_{nome}_unidade'), quote(f'bench_{nome}_despesa')
+    for tabela in (despesa, unidade):
+        cursor.execute(f'DROP TABLE IF EXISTS {tabela}')
+    cursor.execute(f'CREATE TABLE {unidade} (id {tipo} PRIMARY KEY, codigo varchar(32) NOT NULL)')
+    cursor.execute(
+        f'CREATE TABLE {despesa} (id {tipo} PRIMARY KEY, unidade_id {tipo} NOT NULL REFERENCES {unidade} (id), '
+        'valor integer NOT NULL)'
+    )
+    cursor.execute(f'CREATE INDEX {quote(f"bench_{nome}_despesa_unidade")} ON {despesa} (unidade_id)')
+
+    def prep(value):
+        if field.get_internal_type() != 'UUIDField':
+            value = str(value)
+        return field.get_db_prep_value(value, connection)
+
+    ids = [uuid.uuid4() for _ in range(unidades)]
+    cursor.executemany(
+        f'INSERT INTO {unidade} (id, codigo) VALUES (%s, %s)', [(prep(i), f'UG-{n}') for n, i in enumerate(ids)]
+    )
+    for inicio in range(0, despesas, LOTE):
+        cursor.executemany(
+            f'INSERT INTO {despesa} (id, unidade_id, valor) VALUES (%s, %s, %s)',
+            [(prep(uuid.uuid4()), prep(random.choice(ids)), n) for n in range(inicio, min(despesas, inicio + LOTE))],
+        )
+    cursor.execute(f'SELECT id FROM {despesa}')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _index_bytes(cursor, connection, nome):
+    tabelas = [f'bench_{nome}_unidade', f'bench_{nome}_despesa']
+    if connection.vendor == 'postgresql':
+        cursor.execute('ANALYZE')
+        cursor.execute(
+            'SELECT SUM(pg_indexes_size(tabela::regclass)) FROM unnest(%s::text[]) AS tabela', [tabelas]
+        )
+        return int(cursor.fetchone()[0])
+    if connection.vendor == 'sqlite':
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name IN (%s, %s))",
+            tabelas,
+        )
+        return cursor.fetchone()[0]
+    return None
+
+
+def _timed(func, repeticoes):
+    started = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return round((time.perf_counter() - started) / repeticoes * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--unidades', type=int, default=200)
+    parser.add_argument('--despesas', type=int, default=200000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _setup(tmp)
+
+        from django.db import connection, transaction
+
+        random.seed(42)
+        with connection.cursor() as cursor:
+            for nome, field in _layouts().items():
+                quote = connection.ops.quote_name
+                unidade, despesa = quote(f'bench_{nome}_unidade'), quote(f'bench_{nome}_despesa')
+                with transaction.atomic():
+                    ids = _create(cursor, connection, nome, field, args.unidades, args.despesas)
+                amostra = random.sample(ids, min(1000, len(ids)))
+
+                def join():
+                    cursor.execute(
+                        f'SELECT u.codigo, SUM(d.valor) FROM {despesa} d JOIN {unidade} u ON u.id = d.unidade_id '
+                        'GROUP BY u.codigo'
+                    )
+                    cursor.fetchall()
+
+                def lookups():
+                    for value in amostra:
+                        cursor.execute(f'SELECT valor FROM {despesa} WHERE id = %s', [value])
+                        cursor.fetchone()
+
+                print(json.dumps({
+                    'chave': nome,
+                    'tipo_coluna': field.db_type(connection),
+                    'despesas': args.despesas,
+                    'indices_bytes': _index_bytes(cursor, connection, nome),
+                    'join_ms': _timed(join, args.repeticoes),
+                    'busca_1000_pk_ms': _timed(lookups, max(1, args.repeticoes // 4)),
+                }))
+                for tabela in (despesa, unidade):
+                    cursor.execute(f'DROP TABLE {tabela}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
 ﻿from django import forms
-from django.contrib import admin, messages
-from django.db import transaction
-from django.shortcuts import redirect, render
+from django.contrib import admin
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path
 
+from .admin_scaling import AutocompleteFilter, IndexedSearchMixin, LargeTableAdminMixin
+from .esic import backlog_summary
+from .importacao import save_upload
+from .jobs import enqueue, retry
 from .models import (
     UnidadeGestora,
     Despesa,
@@ -11,6 +14,7 @@ from .models import (
     Servidor,
     EsicPedido,
     PortalInformacao,
+    Tarefa,
 )
 
 admin.site.site_header = 'Instituto Meio do Mundo'
@@ -18,70 +22,113 @@ admin.site.site_title = 'Admin IMM'
 admin.site.index_title = 'Painel Administrativo'
 
 
-SECAO_MAP = {
-    'FINANCEIROS': 'FINANCEIROS',
-    'FINANCEIRO': 'FINANCEIROS',
-    'PRESTACAO': 'PRESTACAO',
-    'PRESTAÇÃO': 'PRESTACAO',
-    'CONTRATACOES': 'CONTRATACOES',
-    'CONTRATAÇÕES': 'CONTRATACOES',
-    'POLITICAS': 'POLITICAS',
-    'POLÍTICAS': 'POLITICAS',
-}
-
-
 class PortalInformacaoImportForm(forms.Form):
     arquivo = forms.FileField(
-        label='Planilha Excel (.xlsx)',
+        label='Planilha Excel (.xlsx) ou CSV',
         help_text='Colunas: secao, titulo, descricao, link, ordem, ativo',
     )
+    simular = forms.BooleanField(
+        label='Somente simular',
+        required=False,
+        help_text='Mostra o que seria inserido, alterado e removido sem gravar nada.',
+    )
+    remover_ausentes = forms.BooleanField(
+        label='Remover itens ausentes',
+        required=False,
+        help_text='Remove itens importados anteriormente, das secoes presentes na planilha, que nao estao nela.',
+    )
 
 
 @admin.register(UnidadeGestora)
-class UnidadeGestoraAdmin(admin.ModelAdmin):
+class UnidadeGestoraAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('codigo', 'nome', 'sigla')
     search_fields = ('codigo', 'nome', 'sigla')
+    code_search_fields = ('codigo',)
+    text_search_fields = ('nome', 'sigla')
     readonly_fields = ('id',)
 
 
 @admin.register(Despesa)
-class DespesaAdmin(admin.ModelAdmin):
+class DespesaAdmin(IndexedSearchMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('codigo', 'descricao', 'categoria', 'exercicio', 'unidade')
-    list_filter = ('categoria', 'exercicio', 'unidade')
+    list_filter = ('categoria', 'exercicio', ('unidade', AutocompleteFilter))
     search_fields = ('codigo', 'descricao')
+    code_search_fields = ('codigo',)
+    text_search_fields = ('descricao',)
     readonly_fields = ('id',)
+    ordering = ('-exercicio', '-id')
+    sortable_by = ('exercicio',)
 
 
 @admin.register(Licitacao)
-class LicitacaoAdmin(admin.ModelAdmin):
+class LicitacaoAdmin(IndexedSearchMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('numero', 'modalidade', 'status', 'data_abertura', 'unidade')
-    list_filter = ('modalidade', 'status', 'unidade')
+    list_filter = ('modalidade', 'status', ('unidade', AutocompleteFilter))
     search_fields = ('numero', 'objeto')
+    code_search_fields = ('numero',)
+    text_search_fields = ('objeto',)
     readonly_fields = ('id',)
+    ordering = ('-data_abertura', '-id')
+    sortable_by = ('numero', 'data_abertura')
 
 
 @admin.register(Servidor)
-class ServidorAdmin(admin.ModelAdmin):
+class ServidorAdmin(IndexedSearchMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('matricula', 'nome', 'cargo', 'vinculo', 'competencia', 'unidade')
-    list_filter = ('vinculo', 'competencia', 'unidade')
+    list_filter = ('vinculo', 'competencia', ('unidade', AutocompleteFilter))
     search_fields = ('matricula', 'nome', 'cargo')
+    code_search_fields = ('matricula',)
+    text_search_fields = ('nome', 'cargo')
     readonly_fields = ('id',)
+    ordering = ('matricula',)
+    sortable_by = ('matricula',)
 
 
 @admin.register(EsicPedido)
-class EsicPedidoAdmin(admin.ModelAdmin):
+class EsicPedidoAdmin(IndexedSearchMixin, LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('protocolo', 'tipo', 'status', 'email', 'prazo', 'unidade')
-    list_filter = ('tipo', 'status', 'unidade')
+    list_filter = ('tipo', 'status', ('unidade', AutocompleteFilter))
     search_fields = ('protocolo', 'descricao', 'email')
-    readonly_fields = ('id',)
+    code_search_fields = ('protocolo', 'email')
+    text_search_fields = ('descricao',)
+    readonly_fields = ('id', 'criado_em', 'respondido_em')
+    ordering = ('-prazo', '-id')
+    sortable_by = ('protocolo', 'prazo')
+    change_list_template = 'admin/core/esicpedido/change_list.html'
+
+    def get_urls(self):
+        custom_urls = [
+            path('painel/', self.admin_site.admin_view(self.painel_view), name='core_esicpedido_painel'),
+        ]
+        return custom_urls + super().get_urls()
+
+    def painel_view(self, request):
+        try:
+            dias = max(1, min(90, int(request.GET.get('dias', 7))))
+        except ValueError:
+            dias = 7
+        resumo = backlog_summary(dias=dias)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Painel do e-SIC',
+            'resumo': resumo,
+            'por_status': [
+                (label, resumo['por_status'].get(value, 0), resumo['vencidos']['por_status'].get(value, 0))
+                for value, label in EsicPedido.STATUS_CHOICES
+            ],
+            'por_tipo': [(label, resumo['por_tipo'].get(value, 0)) for value, label in EsicPedido.TIPO_CHOICES],
+        }
+        return render(request, 'admin/core/esicpedido/painel.html', context)
 
 
 @admin.register(PortalInformacao)
-class PortalInformacaoAdmin(admin.ModelAdmin):
+class PortalInformacaoAdmin(IndexedSearchMixin, admin.ModelAdmin):
     change_list_template = 'admin/core/portalinformacao/change_list.html'
     list_display = ('secao', 'titulo', 'tipo_documento', 'ordem', 'ativo', 'atualizado_em')
     list_filter = ('secao', 'ativo')
     search_fields = ('titulo', 'descricao', 'link', 'arquivo')
+    text_search_fields = ('titulo', 'descricao', 'link', 'arquivo')
     list_editable = ('ordem', 'ativo')
     readonly_fields = ('id', 'tipo_documento', 'criado_em', 'atualizado_em')
     ordering = ('secao', 'ordem', 'titulo')
@@ -106,108 +153,30 @@ class PortalInformacaoAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.importar_planilha_view),
                 name='core_portalinformacao_importar_planilha',
             ),
+            path(
+                'importar-planilha/<uuid:tarefa_id>/',
+                self.admin_site.admin_view(self.importar_planilha_progresso_view),
+                name='core_portalinformacao_importar_planilha_progresso',
+            ),
         ]
         return custom_urls + urls
 
-    def _to_bool(self, value):
-        if isinstance(value, bool):
-            return value
-        if value is None:
-            return True
-        texto = str(value).strip().lower()
-        return texto in {'1', 'true', 'sim', 's', 'yes', 'y', 'ativo'}
-
-    def _normalizar_secao(self, secao):
-        if secao is None:
-            return None
-        chave = str(secao).strip().upper()
-        return SECAO_MAP.get(chave)
-
-    @transaction.atomic
-    def _importar_planilha(self, arquivo):
-        try:
-            from openpyxl import load_workbook
-        except ModuleNotFoundError as exc:
-            raise RuntimeError(
-                'Dependencia ausente: instale openpyxl para usar a importacao de planilhas.'
-            ) from exc
-
-        wb = load_workbook(filename=arquivo, data_only=True)
-        ws = wb.active
-
-        header = [str(c).strip().lower() if c is not None else '' for c in next(ws.iter_rows(min_row=1, max_row=1, values_only=True))]
-        header_map = {name: idx for idx, name in enumerate(header)}
-
-        required = {'secao', 'titulo', 'descricao'}
-        missing = sorted(required - set(header_map.keys()))
-        if missing:
-            raise ValueError(f'Colunas obrigatorias ausentes: {", ".join(missing)}')
-
-        created = 0
-        for row_index, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            if not any(cell is not None and str(cell).strip() for cell in row):
-                continue
-
-            secao_raw = row[header_map['secao']] if header_map.get('secao') is not None else None
-            secao = self._normalizar_secao(secao_raw)
-            if not secao:
-                raise ValueError(f'Secao invalida na linha {row_index}: {secao_raw}')
-
-            titulo = str(row[header_map['titulo']]).strip() if row[header_map['titulo']] is not None else ''
-            descricao = str(row[header_map['descricao']]).strip() if row[header_map['descricao']] is not None else ''
-            if not titulo or not descricao:
-                raise ValueError(f'Titulo e descricao sao obrigatorios na linha {row_index}')
-
-            link = ''
-            if 'link' in header_map:
-                raw_link = row[header_map['link']]
-                link = str(raw_link).strip() if raw_link is not None else ''
-
-            ordem = 0
-            if 'ordem' in header_map:
-                raw_ordem = row[header_map['ordem']]
-                if raw_ordem not in (None, ''):
-                    try:
-                        ordem = int(raw_ordem)
-                    except (TypeError, ValueError) as exc:
-                        raise ValueError(f'Ordem invalida na linha {row_index}: {raw_ordem}') from exc
-
-            ativo = True
-            if 'ativo' in header_map:
-                ativo = self._to_bool(row[header_map['ativo']])
-
-            PortalInformacao.objects.create(
-                secao=secao,
-                titulo=titulo,
-                descricao=descricao,
-                link=link or None,
-                ordem=ordem,
-                ativo=ativo,
-            )
-            created += 1
-
-        return created
-
     def importar_planilha_view(self, request):
         if request.method == 'POST':
             form = PortalInformacaoImportForm(request.POST, request.FILES)
             if form.is_valid():
                 arquivo = form.cleaned_data['arquivo']
                 nome = arquivo.name.lower()
-                if not nome.endswith('.xlsx'):
-                    form.add_error('arquivo', 'Formato invalido. Envie um arquivo .xlsx')
+                if not nome.endswith(('.xlsx', '.csv')):
+                    form.add_error('arquivo', 'Formato invalido. Envie um arquivo .xlsx ou .csv')
                 else:
-                    try:
-                        created = self._importar_planilha(arquivo)
-                    except Exception as exc:
-                        form.add_error(None, f'Falha ao importar: {exc}')
-                    else:
-                        self.message_user(
-                            request,
-                            f'Importacao concluida com sucesso. Registros criados: {created}',
-                            level=messages.SUCCESS,
-                        )
-                        return redirect('admin:core_portalinformacao_changelist')
+                    tarefa = enqueue(
+                        'importar_planilha_portal',
+                        arquivo=save_upload(arquivo),
+                        simular=form.cleaned_data['simular'],
+                        remover_ausentes=form.cleaned_data['remover_ausentes'],
+                    )
+                    return redirect('admin:core_portalinformacao_importar_planilha_progresso', tarefa.id)
         else:
             form = PortalInformacaoImportForm()
 
@@ -219,6 +188,28 @@ class PortalInformacaoAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/core/portalinformacao/importar_planilha.html', context)
 
+    def importar_planilha_progresso_view(self, request, tarefa_id):
+        tarefa = get_object_or_404(Tarefa, id=tarefa_id, nome='importar_planilha_portal')
+        if request.method == 'POST':
+            if tarefa.status == 'FALHOU':
+                retry(tarefa)
+            elif tarefa.status == 'CONCLUIDA' and tarefa.parametros.get('simular'):
+                # Aplica a simulacao revisada com o mesmo arquivo e opcoes.
+                tarefa = enqueue('importar_planilha_portal', **{**tarefa.parametros, 'simular': False})
+            return redirect('admin:core_portalinformacao_importar_planilha_progresso', tarefa.id)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importacao de Planilha',
+            'tarefa': tarefa,
+            'resultado': tarefa.resultado or {},
+            # Ultima linha do traceback (a mensagem da excecao).
+            'erro': tarefa.erro.strip().splitlines()[-1] if tarefa.erro else '',
+            'em_andamento': tarefa.status in {'PENDENTE', 'EXECUTANDO'},
+        }
+        return render(request, 'admin/core/portalinformacao/importar_planilha_progresso.html', context)
+
     @admin.display(description='Tipo de Documento')
     def tipo_documento(self, obj):
         if not obj.arquivo:
@@ -229,3 +220,16 @@ class PortalInformacaoAdmin(admin.ModelAdmin):
         if nome.endswith('.xls') or nome.endswith('.xlsx'):
             return 'Excel'
         return 'Arquivo'
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'status', 'progresso', 'total', 'tentativas', 'executar_em', 'atualizado_em')
+    list_filter = ('status', 'nome')
+    ordering = ('-criado_em',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
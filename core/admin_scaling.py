@@ -0,0 +1,154 @@
+import json
+import re
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """Estimativa de linhas do planejador do PostgreSQL (``None`` nos demais).
+
+    Sem filtros usa ``pg_class.reltuples``; com filtros, o ``Plan Rows`` do
+    ``EXPLAIN`` da consulta (nenhuma das duas percorre a tabela).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1: tabela ainda nao analisada.
+            return row[0] if row and row[0] >= 0 else None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Usa a estimativa do planejador quando a tabela e grande demais para COUNT(*)."""
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Filtro de FK com busca (autocomplete) em vez de listar todas as opcoes."""
+
+    template = 'admin/core/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        values = params.get(self.lookup_kwarg)
+        self.lookup_val = values[-1] if isinstance(values, list) else values
+        super().__init__(field, request, params, model, model_admin, field_path)
+        # O widget so consulta a opcao selecionada; as demais vem via AJAX.
+        self.widget = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(
+                field,
+                model_admin.admin_site,
+                attrs={'data-lookup': self.lookup_kwarg},
+            ),
+        ).widget
+        self.base_query_string = ''
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        self.base_query_string = changelist.get_query_string(remove=[self.lookup_kwarg])
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': self.base_query_string,
+            'display': 'Todas',
+        }
+
+    def widget_html(self):
+        return self.widget.render(f'filtro_{self.field_path}', self.lookup_val)
+
+
+class LargeTableAdminMixin:
+    """Changelist para tabelas com milhoes de linhas.
+
+    - ``unidade`` vem no mesmo SELECT (``list_select_related``);
+    - sem ``COUNT(*)`` da tabela inteira e com contagem estimada no PostgreSQL;
+    - FK por autocomplete no filtro e no formulario;
+    - ordenacao coberta por indice com ``pk`` como desempate (ordem total
+      estavel entre paginas), e so colunas indexadas sao ordenaveis.
+    """
+
+    list_select_related = ('unidade',)
+    autocomplete_fields = ('unidade',)
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    paginator = EstimatedCountPaginator
+
+    @property
+    def media(self):
+        field = self.model._meta.get_field('unidade')
+        return super().media + AutocompleteSelect(field, self.admin_site).media
+
+
+# Termo com digito ou "@" e sem espacos: protocolo, matricula, numero, codigo,
+# e-mail. Vai para as colunas de codigo (indice B-tree); o resto e texto livre.
+CODE_TERM = re.compile(r'^(?=.*[\d@])[\w.@/-]+$')
+
+
+def is_code_term(term):
+    return bool(CODE_TERM.match(term))
+
+
+class IndexedSearchMixin:
+    """Busca do admin que usa indices em vez de ``LIKE '%termo%'`` em tudo.
+
+    - ``code_search_fields``: termo com cara de codigo vira busca por prefixo
+      (``startswith``, ``LIKE 'termo%'``) com o termo como digitado, em
+      maiusculas e em minusculas. No PostgreSQL o LIKE so usa indice com
+      ``varchar_pattern_ops`` (criado pelo Django para campos ``unique`` e
+      declarado em ``Meta.indexes`` para os demais), seja qual for a collation;
+    - ``text_search_fields``: texto livre usa ``icontains`` (``UPPER(col) LIKE``),
+      coberto no PostgreSQL por indices GIN de trigramas (migracao 0007).
+    """
+
+    code_search_fields = ()
+    text_search_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+
+        if self.code_search_fields and is_code_term(term):
+            # LIKE com indice diferencia maiusculas; codigos sao gravados em
+            # maiusculas (protocolo, matricula) e e-mails em minusculas.
+            condition = Q()
+            for field in self.code_search_fields:
+                for variant in {term, term.upper(), term.lower()}:
+                    condition |= Q(**{f'{field}__startswith': variant})
+            return queryset.filter(condition), False
+
+        for word in term.split():
+            condition = Q()
+            for field in self.text_search_fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset, False
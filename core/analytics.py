@@ -0,0 +1,176 @@
+"""Estatisticas de execucao orcamentaria das despesas, calculadas com NumPy.
+
+As colunas de um exercicio sao lidas em uma unica passada (``values_list``)
+e guardadas como arrays no cache em camadas; as estatisticas derivadas
+tambem ficam em cache. Os dois sao invalidados pelos sinais de ``Despesa`` e
+pela importacao de planilhas (alteracoes via ``QuerySet.update`` ou SQL
+direto exigem ``invalidate_despesa_analytics``).
+
+Taxas: ``pagamento = pago / dotacao`` e ``liquidacao = liquidado /
+empenhado`` (despesas com denominador zero ficam de fora). Outliers sao as
+despesas com taxa de pagamento fora das cercas de Tukey (Q1 - 1,5 IQR,
+Q3 + 1,5 IQR) da sua categoria.
+"""
+
+import numpy as np
+from django.conf import settings
+
+from .cache import get_tiered_cache
+from .models import Despesa, UnidadeGestora
+
+
+COLUNAS_CACHE_KEY = 'analise-despesas:colunas:{}'
+ESTATISTICAS_CACHE_KEY = 'analise-despesas:estatisticas:{}'
+PERCENTIS = (10, 25, 50, 75, 90)
+VALORES = ('dotacao', 'empenhado', 'liquidado', 'pago')
+
+
+def load_columns(exercicio):
+    """Arrays das despesas do exercicio: valores em ``float64`` e categoria/
+    unidade como indices para ``categorias``/``unidades``."""
+    rows = list(
+        Despesa.objects.filter(exercicio=exercicio)
+        .order_by()
+        .values_list('codigo', 'categoria', 'unidade_id', *VALORES)
+    )
+    colunas = list(zip(*rows)) or [()] * (3 + len(VALORES))
+    categorias, categoria_idx = np.unique(np.array(colunas[1], dtype=str), return_inverse=True)
+    unidade_ids, unidade_idx = np.unique(np.array(colunas[2], dtype=str), return_inverse=True)
+    unidades = UnidadeGestora.objects.filter(id__in=unidade_ids.tolist()).values_list('id', 'codigo')
+    codigos = {str(unidade_id): codigo for unidade_id, codigo in unidades}
+    snapshot = {
+        'codigo': np.array(colunas[0], dtype=str),
+        'categoria': categoria_idx.astype(np.intp),
+        'categorias': categorias.tolist(),
+        'unidade': unidade_idx.astype(np.intp),
+        'unidades': [codigos.get(valor, valor) for valor in unidade_ids.tolist()],
+    }
+    for nome, valores in zip(VALORES, colunas[3:]):
+        snapshot[nome] = np.array(valores, dtype=np.float64)
+    return snapshot
+
+
+def _cached(key, compute):
+    ttl = settings.ANALISE_DESPESAS_CACHE_TTL
+    if not ttl:
+        return compute()
+    return get_tiered_cache().get_or_set(key, compute, ttl=ttl)
+
+
+def cached_columns(exercicio):
+    return _cached(COLUNAS_CACHE_KEY.format(exercicio), lambda: load_columns(exercicio))
+
+
+def ratio(numerador, denominador):
+    """``numerador / denominador`` com ``nan`` onde o denominador e zero."""
+    resultado = np.full(numerador.shape, np.nan)
+    np.divide(numerador, denominador, out=resultado, where=denominador != 0)
+    return resultado
+
+
+def grouped_stats(valores, grupos, total_grupos):
+    """Contagem, media e ``PERCENTIS`` de cada grupo, sem laco por grupo.
+
+    Ordena por (grupo, valor) e interpola linearmente entre as posicoes de
+    cada percentil (mesmo resultado de ``np.percentile``). Retorna arrays com
+    uma linha por grupo; grupos sem valores ficam com ``nan``.
+    """
+    validos = ~np.isnan(valores)
+    valores, grupos = valores[validos], grupos[validos]
+    ordenados = valores[np.lexsort((valores, grupos))]
+    contagem = np.bincount(grupos, minlength=total_grupos)
+    somas = np.bincount(grupos, weights=valores, minlength=total_grupos)
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+
+    posicao = inicio[:, None] + (np.maximum(contagem, 1)[:, None] - 1) * (np.array(PERCENTIS) / 100)[None, :]
+    baixo = np.floor(posicao).astype(np.intp)
+    alto = np.ceil(posicao).astype(np.intp)
+    if ordenados.size:
+        baixo, alto = np.minimum(baixo, ordenados.size - 1), np.minimum(alto, ordenados.size - 1)
+        percentis = ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (posicao - baixo)
+    else:
+        percentis = np.full(posicao.shape, np.nan)
+
+    vazio = contagem == 0
+    percentis[vazio] = np.nan
+    media = np.divide(somas, contagem, out=np.full(total_grupos, np.nan), where=~vazio)
+    return contagem, media, percentis
+
+
+def _number(valor, casas=4):
+    return None if np.isnan(valor) else round(float(valor), casas)
+
+
+def _stats_row(contagem, media, percentis):
+    row = {'n': int(contagem), 'media': _number(media)}
+    row.update({f'p{p}': _number(valor) for p, valor in zip(PERCENTIS, percentis)})
+    return row
+
+
+def _by_group(taxas, grupos, nomes, chave):
+    contagem = np.bincount(grupos, minlength=len(nomes))
+    resultado = [{chave: nome, 'despesas': int(total)} for nome, total in zip(nomes, contagem)]
+    for nome_taxa, valores in taxas.items():
+        for row, *stats in zip(resultado, *grouped_stats(valores, grupos, len(nomes))):
+            row[nome_taxa] = _stats_row(*stats)
+    return resultado
+
+
+def outliers(colunas, taxa):
+    grupos = colunas['categoria']
+    _, _, percentis = grouped_stats(taxa, grupos, len(colunas['categorias']))
+    q1 = percentis[:, PERCENTIS.index(25)][grupos]
+    q3 = percentis[:, PERCENTIS.index(75)][grupos]
+    iqr = q3 - q1
+    with np.errstate(invalid='ignore'):
+        desvio = np.maximum(q1 - 1.5 * iqr - taxa, taxa - (q3 + 1.5 * iqr))
+        indices = np.flatnonzero(desvio > 0)
+    indices = indices[np.argsort(-desvio[indices], kind='stable')][: settings.ANALISE_DESPESAS_MAX_OUTLIERS]
+    return [
+        {
+            'codigo': str(colunas['codigo'][i]),
+            'unidade': colunas['unidades'][colunas['unidade'][i]],
+            'categoria': colunas['categorias'][colunas['categoria'][i]],
+            'dotacao': round(float(colunas['dotacao'][i]), 2),
+            'pago': round(float(colunas['pago'][i]), 2),
+            'taxa_pagamento': _number(taxa[i]),
+        }
+        for i in indices
+    ]
+
+
+def compute_statistics(exercicio, colunas):
+    taxas = {
+        'pagamento': ratio(colunas['pago'], colunas['dotacao']),
+        'liquidacao': ratio(colunas['liquidado'], colunas['empenhado']),
+    }
+    todos = np.zeros(colunas['codigo'].shape, dtype=np.intp)
+    return {
+        'exercicio': exercicio,
+        'despesas': int(colunas['codigo'].size),
+        'totais': {nome: round(float(colunas[nome].sum()), 2) for nome in VALORES},
+        'taxas': {
+            nome: _stats_row(*(coluna[0] for coluna in grouped_stats(valores, todos, 1)))
+            for nome, valores in taxas.items()
+        },
+        'por_unidade': _by_group(taxas, colunas['unidade'], colunas['unidades'], 'unidade'),
+        'por_categoria': _by_group(taxas, colunas['categoria'], colunas['categorias'], 'categoria'),
+        'outliers': outliers(colunas, taxas['pagamento']),
+    }
+
+
+def despesa_statistics(exercicio):
+    return _cached(
+        ESTATISTICAS_CACHE_KEY.format(exercicio),
+        lambda: compute_statistics(exercicio, cached_columns(exercicio)),
+    )
+
+
+def invalidate_despesa_analytics(exercicios=None):
+    """Descarta colunas e estatisticas (de todos os exercicios se ``None``)."""
+    if exercicios is None:
+        exercicios = Despesa.objects.order_by().values_list('exercicio', flat=True).distinct()
+    cache = get_tiered_cache()
+    for exercicio in set(exercicios):
+        cache.delete(COLUNAS_CACHE_KEY.format(exercicio))
+        cache.delete(ESTATISTICAS_CACHE_KEY.format(exercicio))
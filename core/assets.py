@@ -0,0 +1,80 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+
+
+CRITICAL_MARKER = '/* @critical-end */'
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACES = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON = re.compile(r':\s+')
+_CSS_PROPERTY = re.compile(r'([{;])([\w-]+)\s+:')
+
+
+def assets_source_dir():
+    return Path(settings.BASE_DIR) / 'assets' / 'portal'
+
+
+def assets_output_dir():
+    return Path(settings.BASE_DIR) / 'static'
+
+
+def minify_css(source):
+    css = _CSS_COMMENT.sub('', source)
+    css = _CSS_SPACES.sub(' ', css)
+    css = _CSS_PUNCTUATION.sub(r'\1', css)
+    css = _CSS_COLON.sub(':', css)
+    css = _CSS_PROPERTY.sub(r'\1\2:', css)
+    return css.replace(';}', '}').strip() + '\n'
+
+
+def minify_js(source):
+    # Minificacao conservadora: remove indentacao, linhas vazias e comentarios
+    # de linha inteira, preservando as quebras de linha (ASI) e as strings.
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def build_portal_assets():
+    """Retorna ``{caminho relativo em static/: conteudo}`` dos assets do portal."""
+    source_dir = assets_source_dir()
+    css = (source_dir / 'portal.css').read_text(encoding='utf-8')
+    js = (source_dir / 'portal.js').read_text(encoding='utf-8')
+
+    critical, separator, rest = css.partition(CRITICAL_MARKER)
+    if not separator:
+        raise ValueError(f'Marcador {CRITICAL_MARKER} ausente em portal.css')
+
+    return {
+        'css/portal-critical.min.css': minify_css(critical),
+        'css/portal.min.css': minify_css(rest),
+        'js/portal.min.js': minify_js(js),
+    }
+
+
+def stale_portal_assets(outputs=None):
+    outputs = outputs if outputs is not None else build_portal_assets()
+    output_dir = assets_output_dir()
+    stale = []
+    for relative, content in outputs.items():
+        path = output_dir / relative
+        if not path.exists() or path.read_text(encoding='utf-8') != content:
+            stale.append(relative)
+    return stale
+
+
+def write_portal_assets():
+    outputs = build_portal_assets()
+    output_dir = assets_output_dir()
+    for relative in stale_portal_assets(outputs):
+        path = output_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(outputs[relative], encoding='utf-8')
+    return outputs
@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIERED_CACHE = {
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'tiered',
+    'LOCAL_MAX_ENTRIES': 256,
+    'LOCAL_MAX_BYTES': 8 * 1024 * 1024,
+    # Tempo maximo que um worker serve da memoria sem consultar o backend
+    # compartilhado (limita a defasagem apos uma invalidacao em outro worker).
+    'LOCAL_TTL': 5,
+    'LOCK_TIMEOUT': 30,
+    'WAIT_TIMEOUT': 5,
+}
+
+
+class LocalLRU:
+    """LRU em memoria limitado por numero de entradas e por bytes."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is not None:
+            self._data.move_to_end(key)
+        return item
+
+    def set(self, key, item, size):
+        """Retorna quantas entradas foram removidas para abrir espaco."""
+        self.delete(key)
+        if size > self.max_bytes:
+            return 0
+        self._data[key] = (item, size)
+        self.size += size
+        evicted = 0
+        while len(self._data) > self.max_entries or self.size > self.max_bytes:
+            _, (_, old_size) = self._data.popitem(last=False)
+            self.size -= old_size
+            evicted += 1
+        return evicted
+
+    def delete(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def clear(self):
+        self._data.clear()
+        self.size = 0
+
+
+class TieredCache:
+    """Cache em dois niveis: LRU do processo na frente do cache compartilhado.
+
+    ``get_or_set`` guarda ``(valor, fresco_ate, obsoleto_ate)``. Depois de
+    ``ttl`` o valor fica obsoleto por mais ``stale_ttl`` segundos: um unico
+    worker (lock via ``cache.add``) recalcula enquanto os demais continuam
+    servindo o valor obsoleto. Em um miss completo, quem nao obteve o lock
+    espera o valor calculado pelo outro worker.
+
+    ``add`` e atomico no Redis e no LocMem, mas no FileBasedCache e um
+    ``has_key`` seguido de ``set``; nele o lock e um ``flock`` em um arquivo
+    ``.lock`` no diretorio do cache (workers do mesmo host), liberado pelo
+    kernel se o processo morrer.
+    """
+
+    COUNTERS = (
+        'local_hits',
+        'shared_hits',
+        'stale_hits',
+        'misses',
+        'recomputes',
+        'recompute_errors',
+        'lock_waits',
+        'evictions',
+    )
+
+    def __init__(self, backend, key_prefix='tiered', local_max_entries=256, local_max_bytes=8 * 1024 * 1024,
+                 local_ttl=5, lock_timeout=30, wait_timeout=5):
+        self.backend = backend
+        self.key_prefix = key_prefix
+        self.local_ttl = local_ttl
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self.lock_dir = backend._dir if isinstance(backend, FileBasedCache) and fcntl is not None else None
+        self.local = LocalLRU(local_max_entries, local_max_bytes)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def _shared_key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    def _lock_key(self, key):
+        return f'{self.key_prefix}:lock:{key}'
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _get_local(self, key, now):
+        with self._lock:
+            item = self.local.get(key)
+        if item is None:
+            return None
+        (entry, local_until), _ = item
+        if now >= local_until or now >= entry[1]:
+            return None
+        return entry
+
+    def _set_local(self, key, entry, now):
+        size = len(pickle.dumps(entry[0], pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            evicted = self.local.set(key, (entry, now + self.local_ttl), size)
+            self._counters['evictions'] += evicted
+
+    def _lock_path(self, key):
+        nome = hashlib.md5(self._lock_key(key).encode(), usedforsecurity=False).hexdigest()
+        return os.path.join(self.lock_dir, f'{nome}.lock')
+
+    def _acquire(self, key):
+        if self.lock_dir is not None:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+            return fd
+        token = uuid.uuid4().hex
+        return token if self.backend.add(self._lock_key(key), token, self.lock_timeout) else None
+
+    def _release(self, key, token):
+        if self.lock_dir is not None:
+            # O arquivo fica: apagar um .lock travado por outro worker quebraria a exclusao.
+            fcntl.flock(token, fcntl.LOCK_UN)
+            os.close(token)
+            return
+        if self.backend.get(self._lock_key(key)) == token:
+            self.backend.delete(self._lock_key(key))
+
+    def _recompute(self, key, compute, ttl, stale_ttl):
+        self._count('recomputes')
+        value = compute()
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale_ttl)
+        self.backend.set(self._shared_key(key), entry, ttl + stale_ttl)
+        self._set_local(key, entry, now)
+        return value
+
+    def get_or_set(self, key, compute, ttl, stale_ttl=0):
+        now = time.time()
+        entry = self._get_local(key, now)
+        if entry is not None:
+            self._count('local_hits')
+            return entry[0]
+
+        entry = self.backend.get(self._shared_key(key))
+        if entry is not None:
+            value, fresh_until, _ = entry
+            if now < fresh_until:
+                self._count('shared_hits')
+                self._set_local(key, entry, now)
+                return value
+
+            token = self._acquire(key)
+            if token is None:
+                self._count('stale_hits')
+                return value
+            try:
+                return self._recompute(key, compute, ttl, stale_ttl)
+            except Exception:
+                # Melhor servir o valor obsoleto do que propagar a falha.
+                self._count('recompute_errors')
+                logger.warning('Falha ao recalcular %s; servindo valor obsoleto.', key, exc_info=True)
+                return value
+            finally:
+                self._release(key, token)
+
+        self._count('misses')
+        token = self._acquire(key)
+        if token is None:
+            self._count('lock_waits')
+            deadline = now + self.wait_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = self.backend.get(self._shared_key(key))
+                if entry is not None:
+                    self._set_local(key, entry, time.time())
+                    return entry[0]
+        try:
+            return self._recompute(key, compute, ttl, stale_ttl)
+        finally:
+            if token is not None:
+                self._release(key, token)
+
+    def delete(self, key):
+        with self._lock:
+            self.local.delete(key)
+        self.backend.delete(self._shared_key(key))
+
+    def clear_local(self):
+        with self._lock:
+            self.local.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                'local_entries': len(self.local),
+                'local_bytes': self.local.size,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_tiered_cache():
+    config = {**DEFAULT_TIERED_CACHE, **getattr(settings, 'TIERED_CACHE', {})}
+    return TieredCache(
+        caches[config['ALIAS']],
+        key_prefix=config['KEY_PREFIX'],
+        local_max_entries=config['LOCAL_MAX_ENTRIES'],
+        local_max_bytes=config['LOCAL_MAX_BYTES'],
+        local_ttl=config['LOCAL_TTL'],
+        lock_timeout=config['LOCK_TIMEOUT'],
+        wait_timeout=config['WAIT_TIMEOUT'],
+    )
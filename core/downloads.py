@@ -0,0 +1,92 @@
+"""Download de arquivos gerados (dados abertos) com suporte a ``Range``.
+
+Em producao o proxy reverso deve servir esses diretorios direto; esta view
+e o fallback (e o caminho usado em desenvolvimento). Aceita um unico
+intervalo ``bytes=inicio-fim``, ``bytes=inicio-`` ou ``bytes=-sufixo``,
+respeita ``If-Range``/``If-None-Match`` e responde 206/304/416.
+"""
+
+import mimetypes
+import re
+from pathlib import Path
+
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCO = 64 * 1024
+
+
+def _resolve(root, caminho):
+    root = Path(root).resolve()
+    path = (root / caminho).resolve()
+    if root not in path.parents or not path.is_file() or path.name.startswith('.'):
+        raise Http404('Arquivo nao encontrado.')
+    return path
+
+
+def _parse_range(header, tamanho):
+    """``(inicio, fim)`` inclusivo, ``None`` para o arquivo inteiro ou
+    ``False`` se o intervalo nao for satisfazivel."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    inicio, fim = match.groups()
+    if inicio == '':
+        sufixo = int(fim)
+        if sufixo == 0:
+            return False
+        return max(0, tamanho - sufixo), tamanho - 1
+    inicio = int(inicio)
+    fim = min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio > fim or inicio >= tamanho:
+        return False
+    return inicio, fim
+
+
+def _read(path, inicio, total):
+    with open(path, 'rb') as handle:
+        handle.seek(inicio)
+        while total > 0:
+            bloco = handle.read(min(BLOCO, total))
+            if not bloco:
+                return
+            total -= len(bloco)
+            yield bloco
+
+
+def ranged_file_response(request, root, caminho, cache_control):
+    path = _resolve(root, caminho)
+    stat = path.stat()
+    tamanho = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{tamanho:x}"'
+    content_type, encoding = mimetypes.guess_type(path.name)
+    # .ndjson.gz e baixado como arquivo gzip, nao descomprimido pelo cliente.
+    content_type = 'application/gzip' if encoding == 'gzip' else content_type or 'application/octet-stream'
+
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        intervalo = None
+        if_range = request.headers.get('If-Range')
+        if 'Range' in request.headers and (if_range is None or if_range == etag):
+            intervalo = _parse_range(request.headers['Range'], tamanho)
+
+        if intervalo is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamanho}'
+        elif intervalo:
+            inicio, fim = intervalo
+            response = StreamingHttpResponse(
+                _read(path, inicio, fim - inicio + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {inicio}-{fim}/{tamanho}'
+            response['Content-Length'] = str(fim - inicio + 1)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
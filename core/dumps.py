@@ -0,0 +1,234 @@
+"""Dumps completos dos dados publicos em NDJSON comprimido com gzip.
+
+Cada conjunto e gravado em arquivos de ate ``DUMPS_LINHAS_POR_ARQUIVO``
+linhas, lidos com ``QuerySet.iterator()``. O nome de cada arquivo inclui o
+SHA-256 do conteudo e o gzip e deterministico (``mtime=0``): arquivos nao
+alterados mantem o nome entre geracoes e podem ser cacheados como imutaveis.
+``manifest.json`` lista arquivos, linhas e checksums; os arquivos que nao
+estao no manifesto atual nem no anterior sao removidos.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Despesa, Licitacao, PortalInformacao, Servidor
+
+
+MANIFEST_NAME = 'manifest.json'
+SUFIXO = '.ndjson.gz'
+CENTAVOS = Decimal('0.01')
+
+
+class Dump:
+    nome = None
+    # (chave no JSON, lookup no model)
+    colunas = ()
+
+    def queryset(self):
+        raise NotImplementedError
+
+    def rows(self):
+        nomes = [nome for nome, _ in self.colunas]
+        lookups = [lookup for _, lookup in self.colunas]
+        for row in self.queryset().values_list(*lookups).iterator(chunk_size=2000):
+            yield dict(zip(nomes, row))
+
+
+class DespesasDump(Dump):
+    nome = 'despesas'
+    colunas = (
+        ('id', 'id'), ('codigo', 'codigo'), ('descricao', 'descricao'), ('categoria', 'categoria'),
+        ('dotacao', 'dotacao'), ('empenhado', 'empenhado'), ('liquidado', 'liquidado'), ('pago', 'pago'),
+        ('exercicio', 'exercicio'), ('unidade', 'unidade_id'),
+    )
+
+    def queryset(self):
+        return Despesa.objects.order_by('exercicio', 'id')
+
+
+class LicitacoesDump(Dump):
+    nome = 'licitacoes'
+    colunas = (
+        ('id', 'id'), ('numero', 'numero'), ('objeto', 'objeto'), ('modalidade', 'modalidade'),
+        ('status', 'status'), ('valor_estimado', 'valor_estimado'), ('data_abertura', 'data_abertura'),
+        ('unidade', 'unidade_id'),
+    )
+
+    def queryset(self):
+        return Licitacao.objects.order_by('data_abertura', 'id')
+
+
+class ServidoresAgregadosDump(Dump):
+    """Totais por unidade, competencia e vinculo (sem dados individuais)."""
+
+    nome = 'servidores_agregados'
+
+    def rows(self):
+        totais = (
+            Servidor.objects.values('unidade_id', 'competencia', 'vinculo')
+            .annotate(servidores=Count('id'), remuneracao_bruta=Sum('remuneracao_bruta'), descontos=Sum('descontos'))
+            .order_by('competencia', 'unidade_id', 'vinculo')
+        )
+        for row in totais.iterator(chunk_size=2000):
+            row['unidade'] = row.pop('unidade_id')
+            # O SQLite devolve somas sem as casas decimais.
+            row['remuneracao_bruta'] = row['remuneracao_bruta'].quantize(CENTAVOS)
+            row['descontos'] = row['descontos'].quantize(CENTAVOS)
+            yield row
+
+
+class PortalInformacaoDump(Dump):
+    nome = 'portal_informacoes'
+    colunas = (
+        ('id', 'id'), ('secao', 'secao'), ('titulo', 'titulo'), ('descricao', 'descricao'), ('link', 'link'),
+        ('arquivo', 'arquivo'), ('ordem', 'ordem'), ('atualizado_em', 'atualizado_em'),
+    )
+
+    def queryset(self):
+        return PortalInformacao.objects.filter(ativo=True).order_by('secao', 'ordem', 'titulo')
+
+    def rows(self):
+        for row in super().rows():
+            row['arquivo'] = settings.MEDIA_URL + row['arquivo'] if row['arquivo'] else None
+            yield row
+
+
+DUMPS = {
+    dump.nome: dump
+    for dump in (DespesasDump(), LicitacoesDump(), ServidoresAgregadosDump(), PortalInformacaoDump())
+}
+
+
+def dumps_root():
+    return Path(settings.DUMPS_ROOT)
+
+
+def _write_atomic(path, content):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+class _ChunkWriter:
+    """Grava um arquivo gzip temporario e o renomeia com o hash do conteudo."""
+
+    def __init__(self, root, nome, numero):
+        self.root, self.nome, self.numero = root, nome, numero
+        fd, self.tmp_name = tempfile.mkstemp(dir=root, prefix=f'.{nome}-')
+        self.raw = os.fdopen(fd, 'wb')
+        self.gzip = gzip.GzipFile(fileobj=self.raw, mode='wb', compresslevel=settings.DUMPS_GZIP_NIVEL, mtime=0)
+        self.linhas = 0
+
+    def write(self, linha):
+        self.gzip.write(linha)
+        self.linhas += 1
+
+    def close(self):
+        self.gzip.close()
+        self.raw.close()
+        digest = hashlib.sha256()
+        with open(self.tmp_name, 'rb') as handle:
+            for bloco in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(bloco)
+        sha256 = digest.hexdigest()
+        arquivo = f'{self.nome}-{self.numero:05d}-{sha256[:12]}{SUFIXO}'
+        os.replace(self.tmp_name, self.root / arquivo)
+        return {
+            'arquivo': arquivo,
+            'url': settings.DUMPS_URL + arquivo,
+            'linhas': self.linhas,
+            'bytes': (self.root / arquivo).stat().st_size,
+            'sha256': sha256,
+        }
+
+    def discard(self):
+        self.gzip.close()
+        self.raw.close()
+        os.unlink(self.tmp_name)
+
+
+def write_dump(dump, root, linhas_por_arquivo, on_chunk=None):
+    arquivos = []
+    writer = None
+    try:
+        for row in dump.rows():
+            if writer is None:
+                writer = _ChunkWriter(root, dump.nome, len(arquivos) + 1)
+            linha = json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+            writer.write(linha.encode('utf-8') + b'\n')
+            if writer.linhas == linhas_por_arquivo:
+                arquivos.append(writer.close())
+                writer = None
+                if on_chunk:
+                    on_chunk()
+        if writer is not None:
+            arquivos.append(writer.close())
+            writer = None
+    finally:
+        if writer is not None:
+            writer.discard()
+    return {'linhas': sum(arquivo['linhas'] for arquivo in arquivos), 'arquivos': arquivos}
+
+
+def read_manifest(root=None):
+    path = (root or dumps_root()) / MANIFEST_NAME
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def _manifest_files(manifest):
+    if not manifest:
+        return set()
+    return {arquivo['arquivo'] for conjunto in manifest['conjuntos'].values() for arquivo in conjunto['arquivos']}
+
+
+def generate_dumps(nomes=None, linhas_por_arquivo=None, on_progress=None):
+    """Gera os dumps e o manifesto; retorna ``(manifesto, arquivos removidos)``.
+
+    ``on_progress(concluidos, total)`` e chamado a cada arquivo gravado e a cada
+    conjunto concluido (a tarefa ``gerar_dumps`` renova a reserva nele).
+    """
+    root = dumps_root()
+    root.mkdir(parents=True, exist_ok=True)
+    linhas_por_arquivo = linhas_por_arquivo or settings.DUMPS_LINHAS_POR_ARQUIVO
+    anterior = read_manifest(root)
+
+    conjuntos = dict(anterior['conjuntos']) if anterior and nomes else {}
+    selecionados = list(nomes or DUMPS)
+    for concluidos, nome in enumerate(selecionados):
+        on_chunk = None
+        if on_progress:
+            on_chunk = partial(on_progress, concluidos, len(selecionados))
+        conjuntos[nome] = write_dump(DUMPS[nome], root, linhas_por_arquivo, on_chunk)
+        if on_progress:
+            on_progress(concluidos + 1, len(selecionados))
+    manifest = {
+        'gerado_em': timezone.now().isoformat(),
+        'linhas_por_arquivo': linhas_por_arquivo,
+        'conjuntos': conjuntos,
+    }
+    _write_atomic(root / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    # Quem baixou o manifesto anterior ainda encontra os arquivos dele.
+    manter = _manifest_files(manifest) | _manifest_files(anterior)
+    removidos = sorted(path.name for path in root.glob(f'*{SUFIXO}') if path.name not in manter)
+    for arquivo in removidos:
+        (root / arquivo).unlink(missing_ok=True)
+    return manifest, removidos
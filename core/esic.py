@@ -0,0 +1,144 @@
+"""Painel do e-SIC: contadores por status/tipo/unidade e prazos.
+
+Os totais vem de ``EsicContador``, atualizado pelos sinais de ``EsicPedido``
+a cada criacao, transicao de status/tipo/unidade ou exclusao (operacoes em
+massa como ``QuerySet.update`` nao disparam sinais: use
+``manage.py recalcular_contadores_esic``). Vencidos e a vencer dependem do
+relogio e sao contados no indice ``(status, prazo)``, so entre os pedidos em
+aberto.
+"""
+
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.utils import timezone
+
+from .cache import get_tiered_cache
+from .models import EsicContador, EsicPedido
+
+
+PROTOCOLO_RE = re.compile(r'^[A-Za-z0-9-]{1,32}$')
+STATUS_CACHE_PREFIX = 'esic-status'
+
+
+def counter_key(pedido):
+    return pedido.status, pedido.tipo, pedido.unidade_id
+
+
+def bump_counter(key, delta):
+    status, tipo, unidade_id = key
+    contadores = EsicContador.objects.filter(status=status, tipo=tipo, unidade_id=unidade_id)
+    if contadores.update(total=F('total') + delta) or delta < 0:
+        # Decremento sem contador: a unidade esta sendo excluida (cascata).
+        return
+    try:
+        with transaction.atomic():
+            EsicContador.objects.create(status=status, tipo=tipo, unidade_id=unidade_id, total=delta)
+    except IntegrityError:
+        # Outro processo criou o contador entre o UPDATE e o INSERT.
+        contadores.update(total=F('total') + delta)
+
+
+@transaction.atomic
+def rebuild_counters():
+    EsicContador.objects.all().delete()
+    totais = EsicPedido.objects.values('status', 'tipo', 'unidade_id').annotate(total=Count('id')).order_by()
+    return len(EsicContador.objects.bulk_create([EsicContador(**row) for row in totais]))
+
+
+def _totals(campo):
+    rows = EsicContador.objects.values(campo).annotate(soma=Sum('total')).order_by(campo)
+    return {row[campo]: row['soma'] for row in rows if row['soma']}
+
+
+def median_response_days(since):
+    duracoes = (
+        EsicPedido.objects.filter(respondido_em__gte=since)
+        .annotate(tempo=ExpressionWrapper(F('respondido_em') - F('criado_em'), output_field=DurationField()))
+        .order_by('tempo')
+        .values_list('tempo', flat=True)
+    )
+    total = duracoes.count()
+    if not total:
+        return None
+    meio = list(duracoes[(total - 1) // 2:total // 2 + 1])
+    return round(sum(meio, timedelta()) / len(meio) / timedelta(days=1), 1)
+
+
+def backlog_summary(dias=7, now=None):
+    now = now or timezone.now()
+    em_aberto = EsicPedido.objects.filter(status__in=EsicPedido.STATUS_EM_ABERTO)
+    vencidos = em_aberto.filter(prazo__lt=now)
+
+    unidades = {}
+    rows = EsicContador.objects.values(
+        'unidade_id', 'unidade__codigo', 'unidade__sigla', 'unidade__nome', 'status'
+    ).annotate(soma=Sum('total')).order_by('unidade__codigo')
+    for row in rows:
+        unidade = unidades.setdefault(row['unidade_id'], {
+            'codigo': row['unidade__codigo'],
+            'sigla': row['unidade__sigla'],
+            'nome': row['unidade__nome'],
+            'total': 0,
+            'em_aberto': 0,
+            'vencidos': 0,
+        })
+        unidade['total'] += row['soma']
+        if row['status'] in EsicPedido.STATUS_EM_ABERTO:
+            unidade['em_aberto'] += row['soma']
+    for row in vencidos.values('unidade_id').annotate(soma=Count('id')).order_by():
+        if row['unidade_id'] in unidades:
+            unidades[row['unidade_id']]['vencidos'] = row['soma']
+
+    por_status = _totals('status')
+    janela = settings.ESIC_PAINEL_JANELA_DIAS
+    return {
+        'gerado_em': now.isoformat(),
+        'total': sum(por_status.values()),
+        'por_status': por_status,
+        'por_tipo': _totals('tipo'),
+        'por_unidade': list(unidades.values()),
+        'em_aberto': sum(por_status.get(status, 0) for status in EsicPedido.STATUS_EM_ABERTO),
+        'vencidos': {
+            'total': vencidos.count(),
+            'por_status': dict(vencidos.values_list('status').annotate(soma=Count('id')).order_by()),
+        },
+        'vencendo': {
+            'dias': dias,
+            'total': em_aberto.filter(prazo__gte=now, prazo__lt=now + timedelta(days=dias)).count(),
+        },
+        'mediana_resposta_dias': median_response_days(now - timedelta(days=janela)),
+        'janela_mediana_dias': janela,
+    }
+
+
+def _status_cache_key(protocolo):
+    return f'{STATUS_CACHE_PREFIX}:{protocolo}'
+
+
+def protocol_status(protocolo):
+    """Situacao publica do pedido (sem dados pessoais); ``DoesNotExist`` se
+    nao houver. So respostas encontradas vao para o cache."""
+
+    def compute():
+        status, prazo, resposta = EsicPedido.objects.values_list('status', 'prazo', 'resposta').get(
+            protocolo=protocolo
+        )
+        return {
+            'protocolo': protocolo,
+            'status': status,
+            'status_descricao': dict(EsicPedido.STATUS_CHOICES)[status],
+            'prazo': prazo.isoformat(),
+            'possui_resposta': bool(resposta),
+        }
+
+    if not settings.ESIC_STATUS_CACHE_TTL:
+        return compute()
+    return get_tiered_cache().get_or_set(_status_cache_key(protocolo), compute, ttl=settings.ESIC_STATUS_CACHE_TTL)
+
+
+def invalidate_protocol_status(protocolo):
+    get_tiered_cache().delete(_status_cache_key(protocolo))
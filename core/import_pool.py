@@ -0,0 +1,92 @@
+"""Leitura de varias abas/arquivos em paralelo para a importacao de planilhas.
+
+Cada aba (ou arquivo CSV) e lida e validada por um processo do pool, que envia
+lotes ``(campos por chave, erros, linhas)`` por uma fila limitada; o processo
+principal e o unico que grava no banco. Os processos usam ``spawn`` (o worker
+de tarefas tem threads, e ``fork`` com threads nao e seguro) e nao abrem
+conexao com o banco: o ``ImportSpec`` ja chega preparado.
+
+Este modulo nao importa os models no topo: ele e carregado pelos processos
+filhos antes de ``django.setup()``.
+"""
+
+import multiprocessing
+import queue as queue_module
+from concurrent.futures import ProcessPoolExecutor
+
+
+PUT_TIMEOUT = 0.5
+GET_TIMEOUT = 0.1
+
+_queue = None
+_stop = None
+
+
+class ImportacaoInterrompida(Exception):
+    pass
+
+
+def init_worker(queue, stop):
+    global _queue, _stop
+    _queue = queue
+    _stop = stop
+    # Se o gravador desistir, mensagens nao lidas nao devem travar a saida do
+    # processo; no fluxo normal todas sao lidas antes do shutdown.
+    queue.cancel_join_thread()
+
+    import django
+
+    django.setup()
+
+
+def _put(message):
+    # Fila cheia = o gravador esta atrasado; espera, salvo se a importacao
+    # foi interrompida (senao o processo ficaria bloqueado para sempre).
+    while True:
+        try:
+            _queue.put(message, timeout=PUT_TIMEOUT)
+            return
+        except queue_module.Full:
+            if _stop.is_set():
+                raise ImportacaoInterrompida()
+
+
+def parse_in_worker(spec, source, batch_size, collect_keys):
+    from .importacao import parse_source
+
+    _, keys = parse_source(spec, source, batch_size, lambda batch: _put(('lote', batch)), collect_keys)
+    _put(('fim', keys))
+
+
+def parse_parallel(spec, sources, processos, batch_size, collect_keys=False):
+    """Gera ``('lote', batch)`` e ``('fim', chaves)`` de todas as fontes.
+
+    Excecoes de um processo (ex.: colunas ausentes) sao propagadas aqui.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue(maxsize=processos * 2)
+    stop = context.Event()
+    pool = ProcessPoolExecutor(
+        max_workers=min(processos, len(sources)),
+        mp_context=context,
+        initializer=init_worker,
+        initargs=(queue, stop),
+    )
+    try:
+        futures = [pool.submit(parse_in_worker, spec, source, batch_size, collect_keys) for source in sources]
+        pendentes = len(sources)
+        while pendentes:
+            try:
+                message = queue.get(timeout=GET_TIMEOUT)
+            except queue_module.Empty:
+                for future in futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+                continue
+            if message[0] == 'fim':
+                pendentes -= 1
+            yield message
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        queue.close()
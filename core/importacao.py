@@ -0,0 +1,534 @@
+"""Importacao incremental de planilhas (XLSX/CSV) em lotes confirmados.
+
+Cada registro importado guarda ``hash_importacao`` (SHA-256 dos campos de
+conteudo) e e identificado por uma chave natural (``ImportSpec.key_fields``).
+Por lote de ``IMPORTACAO_LOTE`` linhas, os hashes sao comparados em uma unica
+consulta e so linhas novas ou alteradas sao gravadas; com
+``remover_ausentes``, registros importados que sumiram da planilha sao
+apagados ao final. ``simular=True`` produz o mesmo relatorio sem gravar nada.
+
+No admin o upload e salvo no storage padrao e processado por
+``processar_tarefas``; o progresso e gravado na mesma transacao de cada lote,
+entao uma nova tentativa continua a partir do ultimo lote confirmado.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import posixpath
+import re
+import uuid
+import zipfile
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .jobs import FalhaPermanente
+from .models import Despesa, PortalInformacao, UnidadeGestora
+
+
+IMPORT_DIR = 'importacoes'
+MAX_ERROS_LISTADOS = 100
+MAX_AMOSTRAS = 50
+CONTADORES = ('inseridos', 'alterados', 'inalterados', 'removidos', 'total_erros')
+# 1.234 / 1.234.567: pontos como separador de milhar, sem parte decimal.
+MILHARES_RE = re.compile(r'[-+]?\d{1,3}(?:\.\d{3})+')
+
+SECAO_MAP = {
+    'FINANCEIROS': 'FINANCEIROS',
+    'FINANCEIRO': 'FINANCEIROS',
+    'PRESTACAO': 'PRESTACAO',
+    'PRESTAÇÃO': 'PRESTACAO',
+    'CONTRATACOES': 'CONTRATACOES',
+    'CONTRATAÇÕES': 'CONTRATACOES',
+    'POLITICAS': 'POLITICAS',
+    'POLÍTICAS': 'POLITICAS',
+}
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return True
+    texto = str(value).strip().lower()
+    return texto in {'1', 'true', 'sim', 's', 'yes', 'y', 'ativo'}
+
+
+def normalizar_secao(secao):
+    if secao is None:
+        return None
+    chave = str(secao).strip().upper()
+    return SECAO_MAP.get(chave)
+
+
+def to_text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def to_decimal(value, campo, row_index):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    texto = to_text(value).replace('R$', '').replace(' ', '')
+    if ',' in texto or MILHARES_RE.fullmatch(texto):
+        # Formato brasileiro: 1.234,56 ou 1.234
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(texto).quantize(Decimal('0.01'))
+    except InvalidOperation as exc:
+        raise ValueError(f'Valor invalido em {campo} na linha {row_index}: {value}') from exc
+
+
+def _hash_value(value):
+    if isinstance(value, Decimal):
+        return format(value.normalize(), 'f')
+    return value
+
+
+class ImportSpec:
+    """Descreve como uma planilha vira registros de ``model``.
+
+    ``lookup_field`` (indexado) seleciona os candidatos de cada lote;
+    ``scope_field`` limita ``remover_ausentes`` aos valores presentes no
+    arquivo (ex.: so os exercicios enviados).
+    """
+
+    model = None
+    required_columns = set()
+    key_fields = ()
+    hash_fields = ()
+    lookup_field = None
+    scope_field = None
+    touch_fields = ()
+
+    def prepare(self):
+        """Carrega dados auxiliares antes da leitura das linhas."""
+
+    def parse_row(self, cell, row_index):
+        raise NotImplementedError
+
+    def key(self, campos):
+        return tuple(campos[field] for field in self.key_fields)
+
+    def label(self, key):
+        return ' / '.join(str(value) for value in key)
+
+    def content_hash(self, campos):
+        payload = json.dumps([_hash_value(campos[field]) for field in self.hash_fields], default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def existing(self, keys):
+        """``{chave: (id, hash)}`` dos registros ja gravados com essas chaves."""
+        wanted = set(keys)
+        queryset = self.model.objects.filter(
+            **{f'{self.lookup_field}__in': {key[self.key_fields.index(self.lookup_field)] for key in wanted}}
+        ).order_by()
+        found = {}
+        for *key, pk, digest in queryset.values_list(*self.key_fields, 'pk', 'hash_importacao'):
+            key = tuple(key)
+            if key in wanted:
+                found.setdefault(key, (pk, digest))
+        return found
+
+
+class PortalInformacaoSpec(ImportSpec):
+    model = PortalInformacao
+    required_columns = {'secao', 'titulo', 'descricao'}
+    key_fields = ('secao', 'titulo')
+    hash_fields = ('descricao', 'link', 'ordem', 'ativo')
+    lookup_field = 'titulo'
+    scope_field = 'secao'
+    touch_fields = ('atualizado_em',)
+
+    def parse_row(self, cell, row_index):
+        secao_raw = cell('secao')
+        secao = normalizar_secao(secao_raw)
+        if not secao:
+            raise ValueError(f'Secao invalida na linha {row_index}: {secao_raw}')
+
+        titulo = to_text(cell('titulo'))
+        descricao = to_text(cell('descricao'))
+        if not titulo or not descricao:
+            raise ValueError(f'Titulo e descricao sao obrigatorios na linha {row_index}')
+
+        ordem = 0
+        raw_ordem = cell('ordem')
+        if raw_ordem not in (None, ''):
+            try:
+                ordem = int(raw_ordem)
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f'Ordem invalida na linha {row_index}: {raw_ordem}') from exc
+
+        return {
+            'secao': secao,
+            'titulo': titulo,
+            'descricao': descricao,
+            'link': to_text(cell('link')) or None,
+            'ordem': ordem,
+            'ativo': to_bool(cell('ativo', True)),
+        }
+
+
+class DespesaSpec(ImportSpec):
+    model = Despesa
+    required_columns = {
+        'codigo', 'descricao', 'categoria', 'dotacao', 'empenhado', 'liquidado', 'pago', 'exercicio', 'unidade',
+    }
+    key_fields = ('codigo', 'exercicio', 'unidade_id')
+    hash_fields = ('descricao', 'categoria', 'dotacao', 'empenhado', 'liquidado', 'pago')
+    lookup_field = 'codigo'
+    scope_field = 'exercicio'
+    categorias = {value for value, _ in Despesa.CATEGORIA_CHOICES}
+
+    def prepare(self):
+        self.unidades = dict(UnidadeGestora.objects.values_list('codigo', 'id'))
+        self.codigos = {pk: codigo for codigo, pk in self.unidades.items()}
+
+    def label(self, key):
+        codigo, exercicio, unidade_id = key
+        return f'{codigo} / {exercicio} / {self.codigos.get(unidade_id, unidade_id)}'
+
+    def parse_row(self, cell, row_index):
+        codigo = to_text(cell('codigo'))
+        descricao = to_text(cell('descricao'))
+        if not codigo or not descricao:
+            raise ValueError(f'Codigo e descricao sao obrigatorios na linha {row_index}')
+
+        categoria = to_text(cell('categoria')).upper()
+        if categoria not in self.categorias:
+            raise ValueError(f'Categoria invalida na linha {row_index}: {cell("categoria")}')
+
+        unidade_id = self.unidades.get(to_text(cell('unidade')))
+        if unidade_id is None:
+            raise ValueError(f'Unidade gestora desconhecida na linha {row_index}: {cell("unidade")}')
+
+        try:
+            exercicio = int(cell('exercicio'))
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f'Exercicio invalido na linha {row_index}: {cell("exercicio")}') from exc
+
+        campos = {
+            'codigo': codigo,
+            'descricao': descricao,
+            'categoria': categoria,
+            'exercicio': exercicio,
+            'unidade_id': unidade_id,
+        }
+        for campo in ('dotacao', 'empenhado', 'liquidado', 'pago'):
+            campos[campo] = to_decimal(cell(campo), campo, row_index)
+        return campos
+
+
+SPECS = {
+    'portal': PortalInformacaoSpec,
+    'despesa': DespesaSpec,
+}
+
+
+def save_upload(arquivo):
+    """Salva o upload no storage padrao; retorna o nome para a tarefa."""
+    extensao = posixpath.splitext(arquivo.name)[1].lower() or '.xlsx'
+    return default_storage.save(posixpath.join(IMPORT_DIR, f'{uuid.uuid4().hex}{extensao}'), arquivo)
+
+
+def _load_workbook(handle):
+    try:
+        from openpyxl import load_workbook
+    except ModuleNotFoundError as exc:
+        raise FalhaPermanente(
+            'Dependencia ausente: instale openpyxl para usar a importacao de planilhas.'
+        ) from exc
+
+    try:
+        return load_workbook(filename=handle, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, ValueError) as exc:
+        raise FalhaPermanente(f'Planilha invalida: {exc}') from exc
+
+
+@contextmanager
+def read_rows(handle, nome, aba=None):
+    """Produz ``(linhas, total)``: linhas como tuplas (cabecalho primeiro) e o
+    numero de linhas de dados, quando conhecido. Sem ``aba``, usa a ativa."""
+    if nome.lower().endswith('.csv'):
+        text = io.TextIOWrapper(handle, encoding='utf-8-sig', newline='')
+        try:
+            amostra = text.read(4096)
+            text.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+            except csv.Error:
+                dialect = csv.excel
+            yield (tuple(row) for row in csv.reader(text, dialect)), None
+        finally:
+            text.detach()
+        return
+
+    wb = _load_workbook(handle)
+    try:
+        if aba is not None and aba not in wb.sheetnames:
+            raise FalhaPermanente(f'Aba inexistente em {nome}: {aba}')
+        ws = wb[aba] if aba is not None else wb.active
+        yield ws.iter_rows(values_only=True), (max(0, ws.max_row - 1) if ws.max_row else None)
+    finally:
+        wb.close()
+
+
+def read_header(spec, row):
+    header = [str(c).strip().lower() if c is not None else '' for c in row]
+    header_map = {name: idx for idx, name in enumerate(header)}
+    missing = sorted(spec.required_columns - set(header_map.keys()))
+    if missing:
+        raise FalhaPermanente(f'Colunas obrigatorias ausentes: {", ".join(missing)}')
+    return header_map
+
+
+def parse_row(spec, header_map, row, row_index):
+    """Campos do registro (``None`` se a linha estiver vazia); ``ValueError`` se invalida."""
+    if not any(cell is not None and str(cell).strip() for cell in row):
+        return None
+
+    def cell(name, default=None):
+        idx = header_map.get(name)
+        if idx is None:
+            return default
+        return row[idx] if idx < len(row) else None
+
+    return spec.parse_row(cell, row_index)
+
+
+def empty_report(simular=False):
+    # escopos: valores de scope_field (secao/exercicio) com inclusao, alteracao ou remocao.
+    return {**dict.fromkeys(CONTADORES, 0), 'erros': [], 'amostras': {}, 'escopos': [], 'simulacao': simular}
+
+
+def _sample(relatorio, tipo, labels):
+    amostras = relatorio['amostras'].setdefault(tipo, [])
+    amostras.extend(islice(labels, max(0, MAX_AMOSTRAS - len(amostras))))
+
+
+def _record_scopes(spec, relatorio, keys):
+    scope_index = spec.key_fields.index(spec.scope_field)
+    conhecidos = set(relatorio['escopos'])
+    relatorio['escopos'].extend(sorted({key[scope_index] for key in keys} - conhecidos))
+
+
+def apply_batch(spec, lote, relatorio, simular=False):
+    """Compara ``lote`` (``{chave: campos}``) com o banco e grava so o que mudou."""
+    existentes = spec.existing(lote.keys())
+    novos, alterados = [], []
+    for key, campos in lote.items():
+        digest = spec.content_hash(campos)
+        atual = existentes.get(key)
+        if atual is None:
+            novos.append((key, campos, digest))
+        elif atual[1] != digest:
+            alterados.append((key, atual[0], campos, digest))
+        else:
+            relatorio['inalterados'] += 1
+
+    relatorio['inseridos'] += len(novos)
+    relatorio['alterados'] += len(alterados)
+    _sample(relatorio, 'inseridos', (spec.label(key) for key, _, _ in novos))
+    _sample(relatorio, 'alterados', (spec.label(key) for key, _, _, _ in alterados))
+    _record_scopes(spec, relatorio, [key for key, _, _ in novos] + [key for key, _, _, _ in alterados])
+    if simular:
+        return
+
+    spec.model.objects.bulk_create(
+        [spec.model(**campos, hash_importacao=digest) for _, campos, digest in novos]
+    )
+    if alterados:
+        now = timezone.now()
+        touch = dict.fromkeys(spec.touch_fields, now)
+        spec.model.objects.bulk_update(
+            [spec.model(pk=pk, **campos, **touch, hash_importacao=digest) for _, pk, campos, digest in alterados],
+            fields=[*spec.hash_fields, *spec.touch_fields, 'hash_importacao'],
+        )
+
+
+def import_rows(spec, rows, relatorio, *, inicio=0, simular=False, on_batch=None):
+    """Importa ``rows`` (cabecalho primeiro) pulando as ``inicio`` linhas ja
+    confirmadas. ``on_batch(processadas)`` roda dentro da transacao de cada
+    lote. Retorna o numero de linhas de dados processadas."""
+    header_map = read_header(spec, next(rows, ()))
+    lote_tamanho = max(1, settings.IMPORTACAO_LOTE)
+    processadas = inicio
+    lote = {}
+    erros = []
+
+    def confirmar():
+        with transaction.atomic():
+            apply_batch(spec, lote, relatorio, simular=simular)
+            relatorio['total_erros'] += len(erros)
+            relatorio['erros'] = (relatorio['erros'] + erros)[:MAX_ERROS_LISTADOS]
+            if on_batch is not None:
+                on_batch(processadas)
+        lote.clear()
+        erros.clear()
+
+    for row_index, row in enumerate(islice(rows, inicio, None), start=inicio + 2):
+        processadas += 1
+        try:
+            campos = parse_row(spec, header_map, row, row_index)
+        except ValueError as exc:
+            erros.append(str(exc))
+        else:
+            if campos is not None:
+                # Chave repetida no mesmo lote: vale a ultima linha.
+                lote[spec.key(campos)] = campos
+        if processadas - inicio >= lote_tamanho:
+            confirmar()
+            inicio = processadas
+    confirmar()
+    return processadas
+
+
+def collect_keys(spec, rows):
+    header_map = read_header(spec, next(rows, ()))
+    keys = set()
+    for row_index, row in enumerate(rows, start=2):
+        try:
+            campos = parse_row(spec, header_map, row, row_index)
+        except ValueError:
+            continue
+        if campos is not None:
+            keys.add(spec.key(campos))
+    return keys
+
+
+def remove_missing(spec, keys, relatorio, simular=False):
+    """Remove registros importados (com hash) do mesmo escopo que nao estao em ``keys``."""
+    scope_index = spec.key_fields.index(spec.scope_field)
+    escopo = {key[scope_index] for key in keys}
+    if not escopo:
+        return
+
+    queryset = spec.model.objects.filter(
+        **{f'{spec.scope_field}__in': escopo}
+    ).exclude(hash_importacao='').order_by()
+    ausentes = []
+    for *key, pk in queryset.values_list(*spec.key_fields, 'pk').iterator(chunk_size=2000):
+        if tuple(key) not in keys:
+            ausentes.append((tuple(key), pk))
+
+    relatorio['removidos'] += len(ausentes)
+    _sample(relatorio, 'removidos', (spec.label(key) for key, _ in ausentes))
+    _record_scopes(spec, relatorio, [key for key, _ in ausentes])
+    if simular:
+        return
+
+    lote_tamanho = max(1, settings.IMPORTACAO_LOTE)
+    for start in range(0, len(ausentes), lote_tamanho):
+        ids = [pk for _, pk in ausentes[start:start + lote_tamanho]]
+        with transaction.atomic():
+            spec.model.objects.filter(pk__in=ids).delete()
+
+
+def importar_arquivo(spec, open_file, nome, relatorio, *, inicio=0, simular=False, remover_ausentes=False,
+                     on_batch=None, on_total=None):
+    """Importa um arquivo; ``open_file()`` abre o arquivo em modo binario (e e
+    chamado de novo para a passada de remocao)."""
+    spec.prepare()
+    with open_file() as handle, read_rows(handle, nome) as (rows, total):
+        if on_total is not None:
+            on_total(total)
+        processadas = import_rows(spec, rows, relatorio, inicio=inicio, simular=simular, on_batch=on_batch)
+
+    if remover_ausentes:
+        # Segunda leitura so das chaves: nao depende de estado entre lotes,
+        # entao funciona igual apos uma retomada.
+        with open_file() as handle, read_rows(handle, nome) as (rows, _):
+            keys = collect_keys(spec, rows)
+        remove_missing(spec, keys, relatorio, simular=simular)
+    return processadas
+
+
+def list_sources(paths, todas_abas=False):
+    """Fontes ``(caminho, aba)``: uma por arquivo ou, com ``todas_abas``, uma
+    por aba de cada XLSX."""
+    sources = []
+    for path in map(str, paths):
+        if todas_abas and not path.lower().endswith('.csv'):
+            with open(path, 'rb') as handle:
+                wb = _load_workbook(handle)
+                sources.extend((path, aba) for aba in wb.sheetnames)
+                wb.close()
+        else:
+            sources.append((path, None))
+    return sources
+
+
+def parse_source(spec, source, batch_size, emit, collect_keys=False):
+    """Le e valida uma fonte, chamando ``emit((lote, erros, linhas))`` a cada
+    ``batch_size`` linhas. Nao acessa o banco (``spec`` ja preparado).
+    Retorna ``(linhas, chaves)``; ``chaves`` so com ``collect_keys``."""
+    path, aba = source
+    rotulo = f'{posixpath.basename(path)}:{aba}' if aba else posixpath.basename(path)
+    keys = set() if collect_keys else None
+    processadas = 0
+    with open(path, 'rb') as handle, read_rows(handle, path, aba) as (rows, _):
+        header_map = read_header(spec, next(rows, ()))
+        lote, erros, linhas = {}, [], 0
+        for row_index, row in enumerate(rows, start=2):
+            processadas += 1
+            linhas += 1
+            try:
+                campos = parse_row(spec, header_map, row, row_index)
+            except ValueError as exc:
+                erros.append(f'{rotulo}: {exc}')
+            else:
+                if campos is not None:
+                    key = spec.key(campos)
+                    lote[key] = campos
+                    if keys is not None:
+                        keys.add(key)
+            if linhas >= batch_size:
+                emit((lote, erros, linhas))
+                lote, erros, linhas = {}, [], 0
+        emit((lote, erros, linhas))
+    return processadas, keys
+
+
+def import_sources(spec, sources, relatorio, *, processos=1, simular=False, remover_ausentes=False, on_batch=None):
+    """Importa varias fontes ``(caminho, aba)``; com ``processos > 1`` a
+    leitura roda em paralelo (``core.import_pool``) e so este processo grava.
+    Retorna o numero de linhas de dados processadas."""
+    from .import_pool import parse_parallel
+
+    spec.prepare()
+    batch_size = max(1, settings.IMPORTACAO_LOTE)
+    keys = set()
+    processadas = 0
+
+    def write(batch):
+        nonlocal processadas
+        lote, erros, linhas = batch
+        with transaction.atomic():
+            apply_batch(spec, lote, relatorio, simular=simular)
+        relatorio['total_erros'] += len(erros)
+        relatorio['erros'] = (relatorio['erros'] + erros)[:MAX_ERROS_LISTADOS]
+        processadas += linhas
+        if on_batch is not None:
+            on_batch(processadas)
+
+    if processos <= 1 or len(sources) <= 1:
+        for source in sources:
+            _, source_keys = parse_source(spec, source, batch_size, write, remover_ausentes)
+            keys |= source_keys or set()
+    else:
+        for tipo, payload in parse_parallel(spec, sources, processos, batch_size, remover_ausentes):
+            if tipo == 'lote':
+                write(payload)
+            else:
+                keys |= payload or set()
+
+    if remover_ausentes:
+        remove_missing(spec, keys, relatorio, simular=simular)
+    return processadas
+
@@ -0,0 +1,262 @@
+"""Fila de tarefas em segundo plano guardada no banco (modelo ``Tarefa``).
+
+Tarefas sao funcoes registradas com ``@task('nome')`` que recebem a
+``Tarefa`` e os ``parametros``; ``enqueue`` as agenda e o comando
+``processar_tarefas`` as executa fora dos workers web.
+
+A reserva usa ``SELECT ... FOR UPDATE SKIP LOCKED`` quando o banco suporta
+(PostgreSQL) e, nos demais (SQLite), um UPDATE condicional que so reserva a
+tarefa se ninguem o fez antes. A reserva vale por ``TAREFAS_LEASE_SEGUNDOS``
+e e renovada por ``report_progress``; se o worker morrer, outra instancia
+assume a tarefa quando a reserva expira (contando como tentativa; esgotadas
+as ``max_tentativas``, a tarefa vai para FALHOU).
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tarefa
+from .routers import end_request, start_request
+
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+class FalhaPermanente(Exception):
+    """Erro que nao se resolve com nova tentativa (ex.: arquivo invalido)."""
+
+
+def task(nome):
+    def register(func):
+        TASKS[nome] = func
+        return func
+
+    return register
+
+
+def _tarefas():
+    # Reserva e estado sempre no primario, nunca nas replicas de leitura.
+    return Tarefa.objects.using(DEFAULT_DB_ALIAS)
+
+
+def enqueue(nome, *, executar_em=None, max_tentativas=None, **parametros):
+    if nome not in TASKS:
+        raise ValueError(f'Tarefa desconhecida: {nome}')
+
+    tarefa = _tarefas().create(
+        nome=nome,
+        parametros=parametros,
+        executar_em=executar_em or timezone.now(),
+        max_tentativas=max_tentativas or settings.TAREFAS_MAX_TENTATIVAS,
+    )
+    if settings.TAREFAS_EAGER:
+        _run_eager(tarefa)
+    return tarefa
+
+
+def _run_eager(tarefa):
+    tarefa.status = 'EXECUTANDO'
+    tarefa.tentativas += 1
+    tarefa.worker = 'eager'
+    _tarefas().filter(id=tarefa.id).update(status='EXECUTANDO', tentativas=tarefa.tentativas, worker='eager')
+    run(tarefa)
+
+
+def retry(tarefa):
+    """Reagenda uma tarefa que falhou; ela recebe ``progresso`` e ``resultado``
+    parciais e pode continuar de onde parou."""
+    changes = {'status': 'PENDENTE', 'tentativas': 0, 'executar_em': timezone.now(), 'concluida_em': None}
+    if not _tarefas().filter(id=tarefa.id, status='FALHOU').update(**changes):
+        return False
+    for field, value in changes.items():
+        setattr(tarefa, field, value)
+    if settings.TAREFAS_EAGER:
+        _run_eager(tarefa)
+    return True
+
+
+def backoff_seconds(tentativas):
+    base = settings.TAREFAS_BACKOFF_BASE * 2 ** max(0, tentativas - 1)
+    return min(settings.TAREFAS_BACKOFF_MAX, base) * random.uniform(0.8, 1.2)
+
+
+def _claimable(now):
+    return _tarefas().filter(
+        Q(status='PENDENTE', executar_em__lte=now)
+        | Q(status='EXECUTANDO', reservada_ate__lt=now, tentativas__lt=F('max_tentativas'))
+    )
+
+
+def _fail_exhausted(now):
+    # Reserva expirada sem tentativas restantes: o worker morreu (OOM, SIGKILL)
+    # em todas elas, entao run() nunca registrou a falha.
+    return _tarefas().filter(
+        status='EXECUTANDO', reservada_ate__lt=now, tentativas__gte=F('max_tentativas')
+    ).update(
+        status='FALHOU',
+        reservada_ate=None,
+        concluida_em=now,
+        atualizado_em=now,
+        erro='Reserva expirada sem tentativas restantes: o worker foi interrompido durante a execucao.',
+    )
+
+
+def claim(worker, limit=1):
+    now = timezone.now()
+    _fail_exhausted(now)
+    changes = {
+        'status': 'EXECUTANDO',
+        'reservada_ate': now + timedelta(seconds=settings.TAREFAS_LEASE_SEGUNDOS),
+        'worker': worker,
+        'tentativas': F('tentativas') + 1,
+    }
+
+    if connections[DEFAULT_DB_ALIAS].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            ids = list(
+                _claimable(now)
+                .select_for_update(skip_locked=True)
+                .order_by('executar_em')
+                .values_list('id', flat=True)[:limit]
+            )
+            _tarefas().filter(id__in=ids).update(**changes)
+    else:
+        ids = []
+        for tarefa_id in _claimable(now).order_by('executar_em').values_list('id', flat=True)[: limit * 4]:
+            # Outro worker pode ter reservado entre o SELECT e o UPDATE.
+            if _claimable(now).filter(id=tarefa_id).update(**changes):
+                ids.append(tarefa_id)
+                if len(ids) == limit:
+                    break
+
+    return list(_tarefas().filter(id__in=ids).order_by('executar_em'))
+
+
+def _finish(tarefa, **changes):
+    for field, value in changes.items():
+        setattr(tarefa, field, value)
+    # So o dono atual da reserva grava o resultado.
+    return _tarefas().filter(id=tarefa.id, worker=tarefa.worker, status='EXECUTANDO').update(
+        atualizado_em=timezone.now(), **changes
+    )
+
+
+def report_progress(tarefa, progresso, total=None, mensagem=None, resultado=None):
+    """Atualiza o progresso (e o ``resultado`` parcial) e renova a reserva.
+
+    Chamado dentro da mesma transacao do trabalho feito, o progresso salvo
+    corresponde exatamente ao que foi confirmado.
+    """
+    changes = {
+        'progresso': progresso,
+        'reservada_ate': timezone.now() + timedelta(seconds=settings.TAREFAS_LEASE_SEGUNDOS),
+        'atualizado_em': timezone.now(),
+    }
+    if total is not None:
+        changes['total'] = total
+    if mensagem is not None:
+        changes['mensagem'] = mensagem[:255]
+    if resultado is not None:
+        changes['resultado'] = resultado
+    for field, value in changes.items():
+        setattr(tarefa, field, value)
+    # 0 quando a reserva expirou e outro worker assumiu a tarefa.
+    return _tarefas().filter(id=tarefa.id, worker=tarefa.worker, status='EXECUTANDO').update(**changes)
+
+
+def run(tarefa):
+    func = TASKS.get(tarefa.nome)
+    try:
+        if func is None:
+            raise LookupError(f'Tarefa desconhecida: {tarefa.nome}')
+        resultado = func(tarefa, **tarefa.parametros)
+    except Exception as exc:
+        erro = traceback.format_exc()
+        now = timezone.now()
+        permanente = func is None or isinstance(exc, FalhaPermanente)
+        if not permanente and tarefa.tentativas < tarefa.max_tentativas:
+            espera = backoff_seconds(tarefa.tentativas)
+            logger.warning('Tarefa %s (%s) falhou; nova tentativa em %.0fs.', tarefa.id, tarefa.nome, espera)
+            _finish(
+                tarefa,
+                status='PENDENTE',
+                executar_em=now + timedelta(seconds=espera),
+                reservada_ate=None,
+                erro=erro,
+            )
+        else:
+            logger.error('Tarefa %s (%s) falhou definitivamente.', tarefa.id, tarefa.nome)
+            _finish(tarefa, status='FALHOU', reservada_ate=None, concluida_em=now, erro=erro)
+        return False
+
+    _finish(
+        tarefa,
+        status='CONCLUIDA',
+        resultado=resultado,
+        reservada_ate=None,
+        concluida_em=timezone.now(),
+        erro='',
+    )
+    return True
+
+
+def run_worker(concurrency=1, poll_interval=1.0, burst=False, stop_event=None):
+    """Executa tarefas em ``concurrency`` threads ate ``stop_event``.
+
+    Com ``burst=True`` cada thread termina quando a fila estiver vazia.
+    Retorna o numero de tarefas executadas.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    processed = []
+
+    def loop(number):
+        token = start_request(pinned=True)
+        try:
+            while not stop_event.is_set():
+                close_old_connections()
+                tarefas = claim(f'{worker_id}:{number}')
+                if not tarefas:
+                    if burst:
+                        return
+                    stop_event.wait(poll_interval)
+                    continue
+                for tarefa in tarefas:
+                    run(tarefa)
+                    processed.append(tarefa.id)
+        finally:
+            end_request(token)
+            connections.close_all()
+
+    if concurrency == 1:
+        loop(0)
+        return len(processed)
+
+    threads = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(processed)
+
+
+def install_stop_handlers(stop_event):
+    def handle(signum, frame):
+        logger.info('Sinal %s recebido; encerrando apos as tarefas em andamento.', signum)
+        stop_event.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.assets import stale_portal_assets, write_portal_assets
+
+
+class Command(BaseCommand):
+    help = 'Gera o CSS critico e os assets minificados do portal a partir de assets/portal/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Apenas verifica se os arquivos em static/ estao atualizados.',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale = stale_portal_assets()
+            if stale:
+                raise CommandError(f'Assets desatualizados: {", ".join(stale)}')
+            self.stdout.write(self.style.SUCCESS('Assets do portal atualizados.'))
+            return
+
+        outputs = write_portal_assets()
+        for relative, content in outputs.items():
+            self.stdout.write(f'OK: static/{relative} ({len(content.encode("utf-8"))} bytes)')
+
+        self.stdout.write(self.style.SUCCESS('Build de assets concluido.'))
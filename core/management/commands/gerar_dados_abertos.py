@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.opendata import CONJUNTOS, generate
+
+
+class Command(BaseCommand):
+    help = 'Gera os arquivos Parquet de dados abertos, regravando so as particoes alteradas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conjunto', choices=sorted(CONJUNTOS), action='append', dest='conjuntos')
+        parser.add_argument('--todas', action='store_true', help='Regrava todas as particoes.')
+
+    def handle(self, *args, **options):
+        geradas, removidas = generate(options['conjuntos'], todas=options['todas'])
+        for registro in geradas:
+            self.stdout.write(f'OK: {registro.arquivo} ({registro.linhas} linhas, {registro.tamanho} bytes)')
+        for registro in removidas:
+            self.stdout.write(f'Removida: {registro}')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Dados abertos atualizados. Geradas: {len(geradas)}. Removidas: {len(removidas)}.')
+        )
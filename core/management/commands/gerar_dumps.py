@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.dumps import DUMPS, dumps_root, generate_dumps
+
+
+class Command(BaseCommand):
+    help = 'Gera os dumps NDJSON (gzip) dos dados publicos e o manifest.json.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conjunto', choices=sorted(DUMPS), action='append', dest='conjuntos')
+        parser.add_argument('--linhas-por-arquivo', type=int)
+
+    def handle(self, *args, **options):
+        manifest, removidos = generate_dumps(options['conjuntos'], options['linhas_por_arquivo'])
+        for nome, conjunto in manifest['conjuntos'].items():
+            self.stdout.write(f'{nome}: {conjunto["linhas"]} linhas em {len(conjunto["arquivos"])} arquivo(s).')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Dumps gerados em {dumps_root()}. Arquivos antigos removidos: {len(removidos)}.')
+        )
@@ -0,0 +1,85 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import invalidate_despesa_analytics
+from core.importacao import SPECS, empty_report, import_sources, list_sources
+from core.jobs import FalhaPermanente
+from core.opendata import mark_changed
+from core.publishing import invalidate_portal_info_cache
+from core.utils import cpu_limit
+
+
+class Command(BaseCommand):
+    help = 'Importa planilhas (.xlsx/.csv) de forma incremental, gravando so linhas novas ou alteradas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(SPECS), help='Tipo de registro da planilha.')
+        parser.add_argument('arquivos', nargs='+', help='Arquivos .xlsx ou .csv.')
+        parser.add_argument(
+            '--todas-abas',
+            action='store_true',
+            help='Importa todas as abas de cada XLSX (padrao: so a aba ativa).',
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=settings.IMPORTACAO_PROCESSOS,
+            help='Processos lendo abas/arquivos em paralelo; 0 = CPUs do container. A gravacao e sempre em um so.',
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Mostra o diff (inseridos/alterados/removidos) sem gravar nada.',
+        )
+        parser.add_argument(
+            '--remover-ausentes',
+            action='store_true',
+            help='Remove registros importados do mesmo escopo (secao/exercicio) ausentes do arquivo.',
+        )
+
+    def handle(self, *args, **options):
+        for arquivo in options['arquivos']:
+            if not Path(arquivo).is_file():
+                raise CommandError(f'Arquivo nao encontrado: {arquivo}')
+
+        relatorio = empty_report(options['simular'])
+        started = time.perf_counter()
+        try:
+            sources = list_sources(options['arquivos'], todas_abas=options['todas_abas'])
+            processadas = import_sources(
+                SPECS[options['modelo']](),
+                sources,
+                relatorio,
+                processos=options['processos'] or cpu_limit(),
+                simular=options['simular'],
+                remover_ausentes=options['remover_ausentes'],
+            )
+        except FalhaPermanente as exc:
+            raise CommandError(str(exc)) from exc
+        elapsed = time.perf_counter() - started
+
+        # bulk_create/bulk_update nao disparam os sinais dos models.
+        if options['modelo'] == 'portal' and not options['simular']:
+            invalidate_portal_info_cache()
+        if options['modelo'] == 'despesa' and not options['simular']:
+            invalidate_despesa_analytics(relatorio['escopos'])
+            mark_changed('despesas', relatorio['escopos'])
+
+        for erro in relatorio['erros']:
+            self.stdout.write(self.style.WARNING(erro))
+        for tipo, chaves in relatorio['amostras'].items():
+            for chave in chaves:
+                self.stdout.write(f'{tipo}: {chave}')
+
+        prefixo = 'Simulacao' if options['simular'] else 'Importacao'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{prefixo} concluida. Linhas: {processadas}. Inseridos: {relatorio["inseridos"]}. '
+                f'Alterados: {relatorio["alterados"]}. Removidos: {relatorio["removidos"]}. '
+                f'Sem alteracao: {relatorio["inalterados"]}. Erros: {relatorio["total_erros"]}. '
+                f'Fontes: {len(sources)} em {elapsed:.1f}s.'
+            )
+        )
@@ -0,0 +1,46 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import install_stop_handlers, run_worker
+from core.tasks import schedule_dumps
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas em segundo plano da fila (modelo Tarefa).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concorrencia',
+            type=int,
+            default=settings.TAREFAS_CONCORRENCIA,
+            help='Numero de tarefas executadas em paralelo (threads).',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=settings.TAREFAS_INTERVALO,
+            help='Segundos entre consultas quando a fila esta vazia.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Encerra quando a fila estiver vazia.',
+        )
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        install_stop_handlers(stop_event)
+        concurrency = max(1, options['concorrencia'])
+        if settings.DUMPS_AGENDAR:
+            schedule_dumps()
+        self.stdout.write(f'Processando tarefas com {concurrency} thread(s).')
+
+        processed = run_worker(
+            concurrency=concurrency,
+            poll_interval=options['intervalo'],
+            burst=options['burst'],
+            stop_event=stop_event,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Worker encerrado. Tarefas executadas: {processed}.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.publishing import prerender_root, publish_portal
+
+
+class Command(BaseCommand):
+    help = 'Gera a home e /api/public/portal-info/ como arquivos estaticos pre-comprimidos.'
+
+    def handle(self, *args, **options):
+        written = publish_portal()
+        root = prerender_root()
+        for path in written:
+            self.stdout.write(f'OK: {path.relative_to(root)}')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Publicacao concluida em {root}. Arquivos: {len(written)}.')
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.esic import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os contadores do painel do e-SIC (apos importacoes ou alteracoes em massa).'
+
+    def handle(self, *args, **options):
+        created = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados: {created}.'))
@@ -0,0 +1,160 @@
+import gzip
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .dumps import MANIFEST_NAME as DUMPS_MANIFEST_NAME
+
+from .routers import end_request, start_request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Fixa no banco primario as requisicoes que alteram dados."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_request(pinned=request.method not in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            end_request(token)
+
+
+class PortalWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise que tambem serve os dumps de ``DUMPS_ROOT`` em ``DUMPS_URL``.
+
+    Os dumps sao gerados com os workers no ar; o diretorio e reescaneado
+    quando o ``manifest.json`` (gravado por ultimo, com rename atomico) muda.
+    Arquivos de dados tem o hash no nome e recebem cache imutavel; o manifesto
+    usa o ``WHITENOISE_MAX_AGE``.
+    """
+
+    def __init__(self, get_response=None, settings=settings):
+        # immutable_file_test e chamado durante o __init__ do WhiteNoise.
+        self.dumps_root = Path(settings.DUMPS_ROOT)
+        self.dumps_prefix = settings.DUMPS_URL
+        self._dumps_versao = None
+        self._dumps_lock = threading.Lock()
+        super().__init__(get_response, settings)
+        if self.autorefresh:
+            self.add_files(self.dumps_root, prefix=self.dumps_prefix)
+
+    def __call__(self, request):
+        if not self.autorefresh and request.path_info.startswith(self.dumps_prefix):
+            self._refresh_dumps()
+        return super().__call__(request)
+
+    def _refresh_dumps(self):
+        try:
+            versao = (self.dumps_root / DUMPS_MANIFEST_NAME).stat().st_mtime_ns
+        except FileNotFoundError:
+            versao = None
+        if versao == self._dumps_versao:
+            return
+        with self._dumps_lock:
+            if versao == self._dumps_versao:
+                return
+            antigos = [url for url in self.files if url.startswith(self.dumps_prefix)]
+            if self.dumps_root.is_dir():
+                self.update_files_dictionary(str(self.dumps_root.resolve()) + os.sep, self.dumps_prefix)
+            for url in antigos:
+                if not (self.dumps_root / url[len(self.dumps_prefix):]).is_file():
+                    self.files.pop(url, None)
+            self._dumps_versao = versao
+
+    def immutable_file_test(self, path, url):
+        if url.startswith(self.dumps_prefix):
+            return url != self.dumps_prefix + DUMPS_MANIFEST_NAME
+        return super().immutable_file_test(path, url)
+
+
+def accepted_encodings(header):
+    """Qualidade de cada codificacao de um cabecalho ``Accept-Encoding``.
+
+    Entradas com ``q=0`` ficam no resultado: recusam a codificacao mesmo com
+    ``*`` aceito.
+    """
+    aceitas = {}
+    for item in header.lower().split(','):
+        nome, _, params = item.partition(';')
+        qualidade = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                qualidade = float(match.group(1))
+            except ValueError:
+                qualidade = 0.0
+        if nome.strip():
+            aceitas[nome.strip()] = qualidade
+    return aceitas
+
+
+def choose_encoding(header):
+    """Codificacao suportada com maior q; empate favorece brotli."""
+    aceitas = accepted_encodings(header)
+    suportadas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    curinga = aceitas.get('*', 0)
+    melhor, melhor_q = None, 0
+    for nome in suportadas:
+        qualidade = aceitas.get(nome, curinga)
+        if qualidade > melhor_q:
+            melhor, melhor_q = nome, qualidade
+    return melhor
+
+
+def _compressible(content_type):
+    tipo = content_type.split(';')[0].strip().lower()
+    return tipo.startswith('text/') or tipo.endswith(('/json', '+json', '/javascript', '/xml'))
+
+
+class ApiCompressionMiddleware:
+    """Comprime com brotli ou gzip (conforme ``Accept-Encoding``) as respostas
+    da API com pelo menos ``API_COMPRESSAO_MIN_BYTES``; estaticos ficam com o
+    WhiteNoise e os arquivos gerados ja sao servidos comprimidos."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            not request.path.startswith(settings.API_COMPRESSAO_PREFIXO)
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.API_COMPRESSAO_MIN_BYTES
+            or not _compressible(response.get('Content-Type', ''))
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding == 'br':
+            content = brotli.compress(response.content, quality=settings.API_COMPRESSAO_BROTLI_NIVEL)
+        elif encoding == 'gzip':
+            content = gzip.compress(response.content, compresslevel=settings.API_COMPRESSAO_GZIP_NIVEL, mtime=0)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_portalinformacao_arquivo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['exercicio', 'id'], name='despesa_exercicio_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='esicpedido',
+            index=models.Index(fields=['prazo', 'id'], name='esicpedido_prazo_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='licitacao',
+            index=models.Index(fields=['data_abertura', 'id'], name='licitacao_abertura_id_idx'),
+        ),
+    ]
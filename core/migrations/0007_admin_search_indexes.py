@@ -0,0 +1,58 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:28
+
+from django.db import migrations, models
+
+
+# Indices GIN de trigramas para a busca de texto livre do admin (somente
+# PostgreSQL). A expressao UPPER(col) e a mesma gerada pelo icontains.
+TRIGRAM_INDEXES = {
+    'core_unidadegestora': ['nome', 'sigla'],
+    'core_despesa': ['descricao'],
+    'core_licitacao': ['objeto'],
+    'core_servidor': ['nome', 'cargo'],
+    'core_esicpedido': ['descricao'],
+    'core_portalinformacao': ['titulo', 'descricao', 'link', 'arquivo'],
+}
+
+
+def _index_name(table, column):
+    return f'{table.removeprefix("core_")}_{column}_trgm'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {_index_name(table, column)} '
+                f'ON {table} USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in TRIGRAM_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {_index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_large_table_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['codigo'], name='despesa_codigo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='esicpedido',
+            index=models.Index(fields=['email'], name='esicpedido_email_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:29
+
+import core.models
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.CharField(default=core.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('nome', models.CharField(max_length=64)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDA', 'Concluída'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=16)),
+                ('tentativas', models.PositiveIntegerField(default=0)),
+                ('max_tentativas', models.PositiveIntegerField(default=5)),
+                ('executar_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reservada_ate', models.DateTimeField(blank=True, null=True)),
+                ('worker', models.CharField(blank=True, max_length=128)),
+                ('progresso', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('mensagem', models.CharField(blank=True, max_length=255)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'executar_em'], name='tarefa_status_executar_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='despesa',
+            name='hash_importacao',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='portalinformacao',
+            name='hash_importacao',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='portalinformacao',
+            index=models.Index(fields=['titulo', 'secao'], name='portalinfo_titulo_secao_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:40
+
+from datetime import timedelta
+
+import core.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    EsicPedido = apps.get_model('core', 'EsicPedido')
+    EsicContador = apps.get_model('core', 'EsicContador')
+    # Pedidos existentes nao tem data de criacao: o prazo padrao e de 20 dias.
+    EsicPedido.objects.update(criado_em=models.F('prazo') - timedelta(days=20))
+    totais = EsicPedido.objects.values('status', 'tipo', 'unidade_id').annotate(total=models.Count('id'))
+    EsicContador.objects.bulk_create(
+        [
+            EsicContador(
+                id=core.models.generate_uuid(),
+                status=row['status'],
+                tipo=row['tipo'],
+                unidade_id=row['unidade_id'],
+                total=row['total'],
+            )
+            for row in totais.order_by()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_import_hashes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EsicContador',
+            fields=[
+                ('id', models.CharField(default=core.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('ABERTO', 'Aberto'), ('EM_ANALISE', 'Em Análise'), ('RESPONDIDO', 'Respondido'), ('INDEFERIDO', 'Indeferido'), ('ARQUIVADO', 'Arquivado')], max_length=16)),
+                ('tipo', models.CharField(choices=[('PEDIDO_ACESSO', 'Pedido de Acesso à Informação'), ('RECLAMACAO', 'Reclamação'), ('DENUNCIA', 'Denúncia'), ('SUGESTAO', 'Sugestão'), ('ELOGIO', 'Elogio')], max_length=16)),
+                ('total', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='esicpedido',
+            name='criado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='esicpedido',
+            name='respondido_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='esicpedido',
+            index=models.Index(fields=['status', 'prazo'], name='esicpedido_status_prazo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='esicpedido',
+            index=models.Index(fields=['respondido_em'], name='esicpedido_respondido_idx'),
+        ),
+        migrations.AddField(
+            model_name='esiccontador',
+            name='unidade',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_esic', to='core.unidadegestora'),
+        ),
+        migrations.AddConstraint(
+            model_name='esiccontador',
+            constraint=models.UniqueConstraint(fields=('status', 'tipo', 'unidade'), name='esiccontador_status_tipo_unidade'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:45
+
+import uuid
+from django.db import migrations, models
+
+
+# Ids gravados como texto com hifens. No PostgreSQL o AlterField converte com
+# "USING id::uuid" (PK e FKs). Nos bancos sem tipo uuid nativo (SQLite) o
+# UUIDField guarda os 32 digitos hexadecimais sem hifens: os valores sao
+# reescritos antes, em lotes, para nao carregar tabelas grandes de uma vez.
+LOTE = 5000
+
+
+def _uuid_columns(apps):
+    for model in apps.get_app_config('core').get_models():
+        columns = [model._meta.pk.column]
+        columns += [
+            field.column
+            for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model._meta.app_label == 'core'
+        ]
+        yield model._meta.db_table, columns
+
+
+def _rewrite(apps, schema_editor, expression, condition):
+    connection = schema_editor.connection
+    if connection.features.has_native_uuid_field:
+        return
+    quote = schema_editor.quote_name
+    with connection.cursor() as cursor:
+        for table, columns in _uuid_columns(apps):
+            for column in columns:
+                sql = (
+                    f'UPDATE {quote(table)} SET {quote(column)} = {expression.format(c=quote(column))} '
+                    f'WHERE rowid IN (SELECT rowid FROM {quote(table)} WHERE {condition.format(c=quote(column))} LIMIT %s)'
+                )
+                while True:
+                    cursor.execute(sql, [LOTE])
+                    if cursor.rowcount < LOTE:
+                        break
+
+
+def strip_hyphens(apps, schema_editor):
+    _rewrite(apps, schema_editor, "REPLACE({c}, '-', '')", "{c} LIKE '%%-%%'")
+
+
+def add_hyphens(apps, schema_editor):
+    _rewrite(
+        apps,
+        schema_editor,
+        "SUBSTR({c}, 1, 8) || '-' || SUBSTR({c}, 9, 4) || '-' || SUBSTR({c}, 13, 4) || '-' "
+        "|| SUBSTR({c}, 17, 4) || '-' || SUBSTR({c}, 21)",
+        'LENGTH({c}) = 32',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_esic_painel'),
+    ]
+
+    operations = [
+        migrations.RunPython(strip_hyphens, add_hyphens),
+        migrations.AlterField(
+            model_name='despesa',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='esiccontador',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='esicpedido',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='licitacao',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='portalinformacao',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='servidor',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='tarefa',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='unidadegestora',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 18:51
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_uuid_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticaoDadosAbertos',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('conjunto', models.CharField(max_length=32)),
+                ('particao', models.CharField(max_length=32)),
+                ('alterada_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('gerada_em', models.DateTimeField(blank=True, null=True)),
+                ('arquivo', models.CharField(blank=True, max_length=255)),
+                ('linhas', models.PositiveIntegerField(default=0)),
+                ('tamanho', models.PositiveBigIntegerField(default=0)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'ordering': ['conjunto', 'particao'],
+                'constraints': [models.UniqueConstraint(fields=('conjunto', 'particao'), name='particaodadosabertos_conjunto_particao')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-19 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_dados_abertos'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='despesa',
+            name='despesa_codigo_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='esicpedido',
+            name='esicpedido_email_idx',
+        ),
+        migrations.AddIndex(
+            model_name='despesa',
+            index=models.Index(fields=['codigo'], name='despesa_codigo_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='esicpedido',
+            index=models.Index(fields=['email'], name='esicpedido_email_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
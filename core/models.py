@@ -2,14 +2,16 @@
 
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.utils import timezone
 
 
+# Default dos ids em CharField(36) das migracoes antigas (ate 0010).
 def generate_uuid():
 	return str(uuid.uuid4())
 
 
 class UnidadeGestora(models.Model):
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	codigo = models.CharField(max_length=32, unique=True)
 	nome = models.CharField(max_length=128)
 	sigla = models.CharField(max_length=16)
@@ -25,7 +27,7 @@ class Despesa(models.Model):
 		("INVESTIMENTO", "Investimento"),
 		("TRANSFERENCIA", "Transferência"),
 	]
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	codigo = models.CharField(max_length=32)
 	descricao = models.CharField(max_length=128)
 	categoria = models.CharField(max_length=16, choices=CATEGORIA_CHOICES)
@@ -35,6 +37,16 @@ class Despesa(models.Model):
 	pago = models.DecimalField(max_digits=15, decimal_places=2)
 	exercicio = models.IntegerField()
 	unidade = models.ForeignKey(UnidadeGestora, related_name="despesas", on_delete=models.CASCADE)
+	# SHA-256 dos campos importados (core/importacao.py); vazio se criado manualmente.
+	hash_importacao = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["exercicio", "id"], name="despesa_exercicio_id_idx"),
+			# varchar_pattern_ops: atende o LIKE 'termo%' da busca do admin em
+			# qualquer collation (o indice B-tree padrao so serve com "C").
+			models.Index(fields=["codigo"], name="despesa_codigo_like_idx", opclasses=["varchar_pattern_ops"]),
+		]
 
 	def __str__(self):
 		return self.descricao
@@ -56,7 +68,7 @@ class Licitacao(models.Model):
 		("SUSPENSA", "Suspensa"),
 		("REVOGADA", "Revogada"),
 	]
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	numero = models.CharField(max_length=32, unique=True)
 	objeto = models.CharField(max_length=256)
 	modalidade = models.CharField(max_length=24, choices=MODALIDADE_CHOICES)
@@ -65,6 +77,9 @@ class Licitacao(models.Model):
 	data_abertura = models.DateTimeField()
 	unidade = models.ForeignKey(UnidadeGestora, related_name="licitacoes", on_delete=models.CASCADE)
 
+	class Meta:
+		indexes = [models.Index(fields=["data_abertura", "id"], name="licitacao_abertura_id_idx")]
+
 	def __str__(self):
 		return self.numero
 
@@ -77,7 +92,7 @@ class Servidor(models.Model):
 		("TEMPORARIO", "Temporário"),
 		("ESTAGIARIO", "Estagiário"),
 	]
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	matricula = models.CharField(max_length=32, unique=True)
 	nome = models.CharField(max_length=128)
 	cargo = models.CharField(max_length=64)
@@ -106,7 +121,7 @@ class EsicPedido(models.Model):
 		("INDEFERIDO", "Indeferido"),
 		("ARQUIVADO", "Arquivado"),
 	]
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	protocolo = models.CharField(max_length=32, unique=True)
 	tipo = models.CharField(max_length=16, choices=TIPO_CHOICES)
 	descricao = models.TextField()
@@ -116,11 +131,43 @@ class EsicPedido(models.Model):
 	prazo = models.DateTimeField()
 	resposta = models.TextField(blank=True, null=True)
 	unidade = models.ForeignKey(UnidadeGestora, related_name="pedidos", on_delete=models.CASCADE)
+	criado_em = models.DateTimeField(default=timezone.now, editable=False)
+	# Preenchido na primeira transicao para um status de encerramento.
+	respondido_em = models.DateTimeField(blank=True, null=True, editable=False)
+
+	STATUS_EM_ABERTO = ("ABERTO", "EM_ANALISE")
+	STATUS_ENCERRADOS = ("RESPONDIDO", "INDEFERIDO")
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["prazo", "id"], name="esicpedido_prazo_id_idx"),
+			models.Index(fields=["email"], name="esicpedido_email_like_idx", opclasses=["varchar_pattern_ops"]),
+			models.Index(fields=["status", "prazo"], name="esicpedido_status_prazo_idx"),
+			models.Index(fields=["respondido_em"], name="esicpedido_respondido_idx"),
+		]
 
 	def __str__(self):
 		return self.protocolo
 
 
+class EsicContador(models.Model):
+	"""Total de pedidos por status/tipo/unidade, mantido pelos sinais de EsicPedido."""
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	status = models.CharField(max_length=16, choices=EsicPedido.STATUS_CHOICES)
+	tipo = models.CharField(max_length=16, choices=EsicPedido.TIPO_CHOICES)
+	unidade = models.ForeignKey(UnidadeGestora, related_name="contadores_esic", on_delete=models.CASCADE)
+	total = models.IntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=["status", "tipo", "unidade"], name="esiccontador_status_tipo_unidade"),
+		]
+
+	def __str__(self):
+		return f"{self.status}/{self.tipo}: {self.total}"
+
+
 class PortalInformacao(models.Model):
 	SECAO_CHOICES = [
 		("FINANCEIROS", "Relatórios Financeiros"),
@@ -129,7 +176,7 @@ class PortalInformacao(models.Model):
 		("POLITICAS", "Políticas e Regulamentos"),
 	]
 
-	id = models.CharField(primary_key=True, max_length=36, default=generate_uuid, editable=False)
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 	secao = models.CharField(max_length=20, choices=SECAO_CHOICES)
 	titulo = models.CharField(max_length=180)
 	descricao = models.TextField()
@@ -142,11 +189,13 @@ class PortalInformacao(models.Model):
 	)
 	ordem = models.PositiveIntegerField(default=0)
 	ativo = models.BooleanField(default=True)
+	hash_importacao = models.CharField(max_length=64, blank=True, default="", editable=False)
 	criado_em = models.DateTimeField(auto_now_add=True)
 	atualizado_em = models.DateTimeField(auto_now=True)
 
 	class Meta:
 		ordering = ["secao", "ordem", "titulo"]
+		indexes = [models.Index(fields=["titulo", "secao"], name="portalinfo_titulo_secao_idx")]
 
 	def __str__(self):
 		return f"{self.get_secao_display()} - {self.titulo}"
@@ -160,3 +209,71 @@ class PortalInformacao(models.Model):
 		if self.arquivo:
 			return self.arquivo.url
 		return self.link
+
+
+class Tarefa(models.Model):
+	STATUS_CHOICES = [
+		("PENDENTE", "Pendente"),
+		("EXECUTANDO", "Executando"),
+		("CONCLUIDA", "Concluída"),
+		("FALHOU", "Falhou"),
+	]
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	nome = models.CharField(max_length=64)
+	parametros = models.JSONField(default=dict, blank=True)
+	status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="PENDENTE")
+	tentativas = models.PositiveIntegerField(default=0)
+	max_tentativas = models.PositiveIntegerField(default=5)
+	executar_em = models.DateTimeField(default=timezone.now)
+	reservada_ate = models.DateTimeField(blank=True, null=True)
+	worker = models.CharField(max_length=128, blank=True)
+	progresso = models.PositiveIntegerField(default=0)
+	total = models.PositiveIntegerField(blank=True, null=True)
+	mensagem = models.CharField(max_length=255, blank=True)
+	resultado = models.JSONField(blank=True, null=True)
+	erro = models.TextField(blank=True)
+	criado_em = models.DateTimeField(auto_now_add=True)
+	atualizado_em = models.DateTimeField(auto_now=True)
+	concluida_em = models.DateTimeField(blank=True, null=True)
+
+	class Meta:
+		ordering = ["-criado_em"]
+		indexes = [models.Index(fields=["status", "executar_em"], name="tarefa_status_executar_idx")]
+
+	def __str__(self):
+		return f"{self.nome} ({self.get_status_display()})"
+
+	@property
+	def percentual(self):
+		if not self.total:
+			return None
+		return min(100, round(100 * self.progresso / self.total))
+
+
+class ParticaoDadosAbertos(models.Model):
+	"""Arquivo Parquet de um conjunto de dados abertos (ex.: despesas de um exercicio).
+
+	``alterada_em`` e atualizada pelos sinais a cada alteracao nos dados da
+	particao; o comando gerar_dados_abertos so regrava as particoes com
+	``alterada_em`` posterior a ``gerada_em``.
+	"""
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	conjunto = models.CharField(max_length=32)
+	particao = models.CharField(max_length=32)
+	alterada_em = models.DateTimeField(default=timezone.now)
+	gerada_em = models.DateTimeField(blank=True, null=True)
+	arquivo = models.CharField(max_length=255, blank=True)
+	linhas = models.PositiveIntegerField(default=0)
+	tamanho = models.PositiveBigIntegerField(default=0)
+	sha256 = models.CharField(max_length=64, blank=True)
+
+	class Meta:
+		ordering = ["conjunto", "particao"]
+		constraints = [
+			models.UniqueConstraint(fields=["conjunto", "particao"], name="particaodadosabertos_conjunto_particao"),
+		]
+
+	def __str__(self):
+		return f"{self.conjunto}/{self.particao}"
@@ -0,0 +1,210 @@
+"""Dados abertos em Parquet, um arquivo por particao.
+
+Despesas sao particionadas por ``exercicio`` e servidores por
+``competencia`` (``despesas/exercicio=2025/despesas.parquet``, layout lido
+direto por ``pyarrow.dataset``/DuckDB/Spark). A coluna de particao fica so no
+caminho, com o valor codificado como URI (``competencia=2025%2F01``), e nao
+dentro dos arquivos: leitores Hive a reconstroem ao ler o diretorio. Cada
+particao e gravada em
+grupos de linhas lidos com ``QuerySet.iterator()``, com memoria limitada
+pelo tamanho do grupo, e so e regravada quando ``ParticaoDadosAbertos``
+indica alteracao (sinais de ``Despesa``/``Servidor`` e importacoes).
+"""
+
+import hashlib
+import os
+import tempfile
+from itertools import islice
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Despesa, ParticaoDadosAbertos, Servidor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+
+class Conjunto:
+    nome = None
+    model = None
+    campo_particao = None
+    # (coluna, lookup no model, tipo Arrow: nome em pyarrow ou ('decimal', precisao, escala))
+    colunas = ()
+
+    def schema(self):
+        return pa.schema([(coluna, _arrow_type(tipo)) for coluna, _, tipo in self.colunas])
+
+    def queryset(self, particao):
+        return (
+            self.model.objects.filter(**{self.campo_particao: particao})
+            .order_by('pk')
+            .values_list(*(lookup for _, lookup, _ in self.colunas))
+        )
+
+    def particoes(self):
+        valores = self.model.objects.order_by().values_list(self.campo_particao, flat=True).distinct()
+        return {str(valor) for valor in valores}
+
+    def caminho(self, particao):
+        # Codificacao reversivel: '2025/01' e '2025-01' ficam em arquivos distintos.
+        return f'{self.nome}/{self.campo_particao}={quote(particao, safe="")}/{self.nome}.parquet'
+
+
+class DespesasConjunto(Conjunto):
+    nome = 'despesas'
+    model = Despesa
+    campo_particao = 'exercicio'
+    colunas = (
+        ('codigo', 'codigo', 'string'),
+        ('descricao', 'descricao', 'string'),
+        ('categoria', 'categoria', 'string'),
+        ('dotacao', 'dotacao', ('decimal', 15, 2)),
+        ('empenhado', 'empenhado', ('decimal', 15, 2)),
+        ('liquidado', 'liquidado', ('decimal', 15, 2)),
+        ('pago', 'pago', ('decimal', 15, 2)),
+        ('unidade', 'unidade__codigo', 'string'),
+    )
+
+
+class ServidoresConjunto(Conjunto):
+    nome = 'servidores'
+    model = Servidor
+    campo_particao = 'competencia'
+    colunas = (
+        ('matricula', 'matricula', 'string'),
+        ('nome', 'nome', 'string'),
+        ('cargo', 'cargo', 'string'),
+        ('vinculo', 'vinculo', 'string'),
+        ('remuneracao_bruta', 'remuneracao_bruta', ('decimal', 12, 2)),
+        ('descontos', 'descontos', ('decimal', 12, 2)),
+        ('unidade', 'unidade__codigo', 'string'),
+    )
+
+
+CONJUNTOS = {conjunto.nome: conjunto for conjunto in (DespesasConjunto(), ServidoresConjunto())}
+
+
+def _arrow_type(tipo):
+    if isinstance(tipo, tuple):
+        return pa.decimal128(*tipo[1:])
+    return getattr(pa, tipo)()
+
+
+def dados_abertos_root():
+    return Path(settings.DADOS_ABERTOS_ROOT)
+
+
+def _touch(nome, particoes):
+    agora = timezone.now()
+    for particao in particoes:
+        registros = ParticaoDadosAbertos.objects.filter(conjunto=nome, particao=particao)
+        if registros.update(alterada_em=agora):
+            continue
+        try:
+            with transaction.atomic():
+                ParticaoDadosAbertos.objects.create(conjunto=nome, particao=particao, alterada_em=agora)
+        except IntegrityError:
+            registros.update(alterada_em=agora)
+
+
+def mark_changed(nome, particoes):
+    """Marca particoes como alteradas na transacao da alteracao e de novo apos
+    o commit. Uma geracao que comecou antes do commit nao viu a alteracao;
+    com ``alterada_em`` posterior ao commit a particao entra na proxima."""
+    particoes = {str(valor) for valor in particoes if valor is not None}
+    _touch(nome, particoes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _touch(nome, particoes), robust=True)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for bloco in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def write_partition(conjunto, particao, row_group=None):
+    """Grava a particao e retorna ``(arquivo relativo, linhas, bytes, sha256)``."""
+    if pq is None:
+        raise ImproperlyConfigured('Dados abertos em Parquet exigem o pacote pyarrow.')
+    row_group = row_group or settings.DADOS_ABERTOS_ROW_GROUP
+    arquivo = conjunto.caminho(particao)
+    destino = dados_abertos_root() / arquivo
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    schema = conjunto.schema()
+
+    fd, tmp_name = tempfile.mkstemp(dir=destino.parent, prefix=f'.{destino.name}.')
+    os.close(fd)
+    linhas = 0
+    try:
+        with pq.ParquetWriter(tmp_name, schema, compression=settings.DADOS_ABERTOS_COMPRESSAO) as writer:
+            rows = conjunto.queryset(particao).iterator(chunk_size=row_group)
+            while lote := list(islice(rows, row_group)):
+                colunas = zip(*lote)
+                writer.write_batch(
+                    pa.RecordBatch.from_arrays(
+                        [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, schema)],
+                        schema=schema,
+                    )
+                )
+                linhas += len(lote)
+        os.replace(tmp_name, destino)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return arquivo, linhas, destino.stat().st_size, _sha256(destino)
+
+
+def generate(nomes=None, todas=False):
+    """Regrava as particoes alteradas (ou todas) e remove as que nao tem mais
+    dados. Retorna ``(geradas, removidas)`` como listas de registros."""
+    root = dados_abertos_root()
+    geradas, removidas = [], []
+    for nome in nomes or CONJUNTOS:
+        conjunto = CONJUNTOS[nome]
+        registros = {registro.particao: registro for registro in ParticaoDadosAbertos.objects.filter(conjunto=nome)}
+        atuais = conjunto.particoes()
+
+        for particao in sorted(atuais):
+            registro = registros.get(particao)
+            if (
+                not todas
+                and registro is not None
+                and registro.gerada_em is not None
+                and registro.alterada_em <= registro.gerada_em
+                and registro.arquivo == conjunto.caminho(particao)
+                and (root / registro.arquivo).is_file()
+            ):
+                continue
+            # Alteracoes feitas durante a gravacao ficam com alterada_em
+            # posterior e entram na proxima execucao.
+            inicio = timezone.now()
+            arquivo, linhas, tamanho, sha256 = write_partition(conjunto, particao)
+            if registro is not None and registro.arquivo and registro.arquivo != arquivo:
+                (root / registro.arquivo).unlink(missing_ok=True)
+            valores = {'gerada_em': inicio, 'arquivo': arquivo, 'linhas': linhas, 'tamanho': tamanho, 'sha256': sha256}
+            registro, _ = ParticaoDadosAbertos.objects.update_or_create(
+                conjunto=nome,
+                particao=particao,
+                defaults=valores,
+                create_defaults={**valores, 'alterada_em': inicio},
+            )
+            geradas.append(registro)
+
+        for particao in set(registros) - atuais:
+            registro = registros[particao]
+            if registro.arquivo:
+                (root / registro.arquivo).unlink(missing_ok=True)
+            registro.delete()
+            removidas.append(registro)
+    return geradas, removidas
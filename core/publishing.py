@@ -0,0 +1,126 @@
+import gzip
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_tiered_cache
+from .models import PortalInformacao
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+SECOES = ('FINANCEIROS', 'PRESTACAO', 'CONTRATACOES', 'POLITICAS')
+
+HOME_PATH = Path('index.html')
+PORTAL_INFO_PATH = Path('api') / 'public' / 'portal-info' / 'index.json'
+
+PORTAL_INFO_CACHE_KEY = 'portal-info'
+
+
+def active_portal_infos():
+    return PortalInformacao.objects.filter(ativo=True).order_by('secao', 'ordem', 'titulo')
+
+
+def group_by_secao(infos):
+    grouped = {secao: [] for secao in SECOES}
+    for info in infos:
+        grouped.setdefault(info.secao, []).append(info)
+    return grouped
+
+
+def serialize_portal_info(info):
+    return {
+        'id': info.id,
+        'secao': info.secao,
+        'titulo': info.titulo,
+        'descricao': info.descricao,
+        'ordem': info.ordem,
+        'possui_arquivo': info.possui_arquivo,
+        'url_documento': info.url_documento,
+        'atualizado_em': info.atualizado_em.isoformat(),
+    }
+
+
+def build_portal_info_payload(infos_por_secao):
+    return {
+        'items': {
+            secao: [serialize_portal_info(info) for info in infos]
+            for secao, infos in infos_por_secao.items()
+        }
+    }
+
+
+def cached_portal_info_payload():
+    def compute():
+        return build_portal_info_payload(group_by_secao(active_portal_infos()))
+
+    if not settings.PORTAL_INFO_CACHE_TTL:
+        return compute()
+    return get_tiered_cache().get_or_set(
+        PORTAL_INFO_CACHE_KEY,
+        compute,
+        ttl=settings.PORTAL_INFO_CACHE_TTL,
+        stale_ttl=settings.PORTAL_INFO_CACHE_STALE_TTL,
+    )
+
+
+def invalidate_portal_info_cache():
+    get_tiered_cache().delete(PORTAL_INFO_CACHE_KEY)
+
+
+def prerender_root():
+    return Path(settings.PORTAL_PRERENDER_ROOT)
+
+
+def _write_atomic(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _write_with_variants(path, content):
+    written = [path]
+    _write_atomic(path, content)
+
+    gz_path = path.with_name(path.name + '.gz')
+    _write_atomic(gz_path, gzip.compress(content, compresslevel=9, mtime=0))
+    written.append(gz_path)
+
+    if brotli is not None:
+        br_path = path.with_name(path.name + '.br')
+        _write_atomic(br_path, brotli.compress(content))
+        written.append(br_path)
+    return written
+
+
+def publish_portal(on_progress=None):
+    """Gera a home e o JSON publico como arquivos estaticos pre-comprimidos.
+
+    Retorna a lista de arquivos gravados em ``PORTAL_PRERENDER_ROOT``;
+    ``on_progress(concluidos, total)`` e chamado a cada pagina gravada.
+    """
+    infos_por_secao = group_by_secao(active_portal_infos())
+    root = prerender_root()
+
+    html = render_to_string('portal_transparencia.html', {'infos_por_secao': infos_por_secao})
+    written = _write_with_variants(root / HOME_PATH, html.encode('utf-8'))
+    if on_progress:
+        on_progress(1, 2)
+    payload = JSONRenderer().render(build_portal_info_payload(infos_por_secao))
+    written += _write_with_variants(root / PORTAL_INFO_PATH, payload)
+    if on_progress:
+        on_progress(2, 2)
+    return written
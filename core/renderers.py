@@ -0,0 +1,41 @@
+"""Renderer JSON da API com orjson.
+
+Datas, ``Decimal``, strings traduziveis e demais tipos fora do JSON passam
+pelo ``encoder_class`` do DRF (``OPT_PASSTHROUGH_DATETIME`` desliga o formato
+proprio do orjson) e ``\\u2028``/``\\u2029`` continuam escapados. Os floats
+sao serializados pelo proprio orjson e diferem do DRF: ``NaN``/``Infinity``
+viram ``null`` (o DRF, com ``STRICT_JSON``, levanta ``ValueError``) e o
+expoente sai sem sinal (``1e16`` em vez de ``1e+16``). Pedidos com
+``indent`` (API navegavel, ``Accept: application/json; indent=4``), objetos
+que o orjson recusa (inteiros maiores que 64 bits, por exemplo) e ambientes
+sem orjson usam o renderer do DRF.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,91 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+
+
+def pin_to_primary():
+    _pinned_to_primary.set(True)
+
+
+def start_request(pinned=False):
+    return _pinned_to_primary.set(pinned)
+
+
+def end_request(token):
+    _pinned_to_primary.reset(token)
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get()
+
+
+class PrimaryReplicaRouter:
+    """Envia leituras seguras para replicas e escritas para o primario.
+
+    Depois da primeira escrita (ou em requisicoes nao seguras), as leituras do
+    mesmo contexto ficam fixadas no primario para evitar ler dados atrasados.
+    Replicas que falham ao conectar ficam fora do rodizio por
+    ``DATABASE_REPLICA_RETRY_SECONDS``.
+    """
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._unavailable_until = {}
+        self._lock = threading.Lock()
+
+    def _replicas(self):
+        return [alias for alias in getattr(settings, 'DATABASE_REPLICAS', []) if alias in connections]
+
+    def _mark_unavailable(self, alias):
+        retry = getattr(settings, 'DATABASE_REPLICA_RETRY_SECONDS', 30)
+        with self._lock:
+            self._unavailable_until[alias] = time.monotonic() + retry
+
+    def _is_available(self, alias):
+        until = self._unavailable_until.get(alias)
+        if until is not None:
+            if time.monotonic() < until:
+                return False
+            with self._lock:
+                self._unavailable_until.pop(alias, None)
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self._mark_unavailable(alias)
+            return False
+        return True
+
+    def db_for_read(self, model, **hints):
+        if is_pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+
+        replicas = self._replicas()
+        start = next(self._counter)
+        for offset in range(len(replicas)):
+            alias = replicas[(start + offset) % len(replicas)]
+            if self._is_available(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *self._replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self._replicas():
+            return False
+        return None
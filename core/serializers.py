@@ -1,27 +1,68 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
-from .models import UnidadeGestora, Despesa, Licitacao, Servidor, EsicPedido
+from .models import UnidadeGestora, Despesa, Licitacao, Servidor, EsicPedido, Tarefa
 
-class UnidadeGestoraSerializer(serializers.ModelSerializer):
+
+class SparseFieldsetMixin:
+    """Aceita ``fields`` (campos mantidos) e ``omit`` (campos removidos)."""
+
+    def __init__(self, *args, fields=None, omit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for nome in list(self.fields):
+            if (fields is not None and nome not in fields) or (omit and nome in omit):
+                self.fields.pop(nome)
+
+
+def sparse_columns(serializer):
+    """Colunas do model lidas pelos campos do serializer (para ``only()``), ou
+    ``None`` se algum campo depender de algo alem de colunas do proprio model.
+    ``Meta.sparse_columns`` mapeia campos calculados para as colunas que usam."""
+    model = serializer.Meta.model
+    derivadas = getattr(serializer.Meta, 'sparse_columns', {})
+    colunas = []
+    for nome, field in serializer.fields.items():
+        if nome in derivadas:
+            colunas.extend(derivadas[nome])
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        colunas.append(model_field.name)
+    return colunas
+
+
+class UnidadeGestoraSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = UnidadeGestora
         fields = '__all__'
 
-class DespesaSerializer(serializers.ModelSerializer):
+class DespesaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Despesa
         fields = '__all__'
 
-class LicitacaoSerializer(serializers.ModelSerializer):
+class LicitacaoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Licitacao
         fields = '__all__'
 
-class ServidorSerializer(serializers.ModelSerializer):
+class ServidorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Servidor
         fields = '__all__'
 
-class EsicPedidoSerializer(serializers.ModelSerializer):
+class EsicPedidoSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = EsicPedido
         fields = '__all__'
+
+class TarefaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    percentual = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Tarefa
+        exclude = ('parametros', 'worker', 'reservada_ate')
+        sparse_columns = {'percentual': ('progresso', 'total')}
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .analytics import invalidate_despesa_analytics
+from .esic import bump_counter, counter_key, invalidate_protocol_status
+from .models import Despesa, EsicPedido, PortalInformacao, Servidor
+from .opendata import mark_changed
+from .publishing import invalidate_portal_info_cache
+from .tasks import enqueue_publish_portal
+
+
+def _schedule_once(func):
+    # Uma importacao em lote salva varias linhas na mesma transacao; basta
+    # executar uma vez, depois do commit. O conjunto de pendentes fica na
+    # conexao e o primeiro callback executado o limpa (um rollback descarta os
+    # callbacks, e a proxima transacao volta a agendar).
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'portal_pending_on_commit', None)
+    if pending is None:
+        pending = connection.portal_pending_on_commit = set()
+    pending.add(func)
+
+    def run():
+        if func in pending:
+            pending.discard(func)
+            func()
+
+    transaction.on_commit(run, robust=True)
+
+
+@receiver(post_save, sender=PortalInformacao)
+@receiver(post_delete, sender=PortalInformacao)
+def portal_informacao_changed(sender, **kwargs):
+    _schedule_once(invalidate_portal_info_cache)
+    if settings.PORTAL_PRERENDER_ON_CHANGE:
+        _schedule_once(enqueue_publish_portal)
+
+
+@receiver(pre_save, sender=Despesa)
+def despesa_before_save(sender, instance, raw=False, **kwargs):
+    instance._exercicio_anterior = None
+    if not raw and not instance._state.adding:
+        instance._exercicio_anterior = (
+            Despesa.objects.filter(pk=instance.pk).values_list('exercicio', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Despesa)
+@receiver(post_delete, sender=Despesa)
+def despesa_changed(sender, instance, **kwargs):
+    exercicios = {instance.exercicio, getattr(instance, '_exercicio_anterior', None)} - {None}
+    mark_changed('despesas', exercicios)
+    transaction.on_commit(lambda: invalidate_despesa_analytics(exercicios), robust=True)
+
+
+@receiver(pre_save, sender=Servidor)
+def servidor_before_save(sender, instance, raw=False, **kwargs):
+    instance._competencia_anterior = None
+    if not raw and not instance._state.adding:
+        instance._competencia_anterior = (
+            Servidor.objects.filter(pk=instance.pk).values_list('competencia', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Servidor)
+@receiver(post_delete, sender=Servidor)
+def servidor_changed(sender, instance, **kwargs):
+    mark_changed('servidores', {instance.competencia, getattr(instance, '_competencia_anterior', None)})
+
+
+@receiver(pre_save, sender=EsicPedido)
+def esic_pedido_before_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._contador_anterior = None
+    if not instance._state.adding:
+        instance._contador_anterior = (
+            EsicPedido.objects.filter(pk=instance.pk).values_list('status', 'tipo', 'unidade_id').first()
+        )
+    if instance.status in EsicPedido.STATUS_ENCERRADOS and instance.respondido_em is None:
+        instance.respondido_em = timezone.now()
+
+
+@receiver(post_save, sender=EsicPedido)
+def esic_pedido_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    atual = counter_key(instance)
+    anterior = getattr(instance, '_contador_anterior', None)
+    if created or anterior is None:
+        bump_counter(atual, 1)
+    elif anterior != atual:
+        bump_counter(anterior, -1)
+        bump_counter(atual, 1)
+    if not created:
+        transaction.on_commit(lambda: invalidate_protocol_status(instance.protocolo), robust=True)
+
+
+@receiver(post_delete, sender=EsicPedido)
+def esic_pedido_deleted(sender, instance, **kwargs):
+    bump_counter(counter_key(instance), -1)
+    transaction.on_commit(lambda: invalidate_protocol_status(instance.protocolo), robust=True)
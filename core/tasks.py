@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .dumps import generate_dumps
+from .importacao import PortalInformacaoSpec, empty_report, importar_arquivo
+from .jobs import enqueue, report_progress, task
+from .models import Tarefa
+from .publishing import invalidate_portal_info_cache, prerender_root, publish_portal
+
+
+def _renew_lease(tarefa, mensagem):
+    # Tarefas longas renovam a reserva a cada etapa; sem isso, outro worker a
+    # assumiria depois de TAREFAS_LEASE_SEGUNDOS e as duas rodariam juntas.
+    def on_progress(concluidos, total):
+        if not report_progress(tarefa, concluidos, total=total, mensagem=mensagem.format(concluidos, total)):
+            raise RuntimeError('Reserva da tarefa perdida; execucao interrompida.')
+
+    return on_progress
+
+
+@task('publicar_portal')
+def publicar_portal(tarefa):
+    root = prerender_root()
+    written = publish_portal(on_progress=_renew_lease(tarefa, '{} de {} pagina(s) publicada(s).'))
+    return {'arquivos': [str(path.relative_to(root)) for path in written]}
+
+
+def enqueue_publish_portal():
+    # Varias alteracoes seguidas geram uma unica publicacao pendente.
+    if not Tarefa.objects.filter(nome='publicar_portal', status='PENDENTE').exists():
+        enqueue('publicar_portal')
+
+
+def next_dumps_run(agora=None):
+    """Proxima ocorrencia de ``DUMPS_HORARIO`` (HH:MM, hora local)."""
+    hora, minuto = (int(parte) for parte in settings.DUMPS_HORARIO.split(':'))
+    local = timezone.localtime(agora or timezone.now())
+    proxima = local.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+    if proxima <= local:
+        proxima += timedelta(days=1)
+    return proxima
+
+
+def schedule_dumps():
+    """Garante uma geracao de dumps pendente no proximo ``DUMPS_HORARIO``."""
+    if not Tarefa.objects.filter(nome='gerar_dumps', status='PENDENTE').exists():
+        enqueue('gerar_dumps', executar_em=next_dumps_run())
+
+
+@task('gerar_dumps')
+def gerar_dumps(tarefa):
+    # Agenda a proxima noite antes de gerar: uma falha aqui nao interrompe a serie.
+    if settings.DUMPS_AGENDAR:
+        schedule_dumps()
+    manifest, removidos = generate_dumps(on_progress=_renew_lease(tarefa, '{} de {} conjunto(s) gerado(s).'))
+    return {
+        'linhas': {nome: conjunto['linhas'] for nome, conjunto in manifest['conjuntos'].items()},
+        'removidos': len(removidos),
+    }
+
+
+@task('importar_planilha_portal')
+def importar_planilha_portal(tarefa, arquivo, simular=False, remover_ausentes=False):
+    relatorio = {**empty_report(simular), **(tarefa.resultado or {})}
+    total = None
+
+    def on_total(value):
+        nonlocal total
+        total = value
+
+    def on_batch(processadas):
+        mensagem = f'{processadas} linha(s) processada(s), {relatorio["total_erros"]} erro(s).'
+        if not report_progress(tarefa, processadas, total=total, mensagem=mensagem, resultado=relatorio):
+            raise RuntimeError('Reserva da tarefa perdida; lote descartado.')
+
+    importar_arquivo(
+        PortalInformacaoSpec(),
+        lambda: default_storage.open(arquivo, 'rb'),
+        arquivo,
+        relatorio,
+        inicio=tarefa.progresso,
+        simular=simular,
+        remover_ausentes=remover_ausentes,
+        on_batch=on_batch,
+        on_total=on_total,
+    )
+    if simular:
+        # O arquivo fica no storage para "Aplicar importacao".
+        return relatorio
+
+    default_storage.delete(arquivo)
+    # bulk_create/bulk_update nao disparam os sinais de PortalInformacao.
+    if relatorio['inseridos'] or relatorio['alterados'] or relatorio['removidos']:
+        invalidate_portal_info_cache()
+        if settings.PORTAL_PRERENDER_ON_CHANGE:
+            enqueue_publish_portal()
+    return relatorio
@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@lru_cache(maxsize=16)
+def _read_static(path):
+    absolute = finders.find(path)
+    if not absolute:
+        raise template.TemplateSyntaxError(f'Arquivo estatico nao encontrado: {path}')
+    with open(absolute, encoding='utf-8') as handle:
+        return handle.read()
+
+
+@register.simple_tag
+def inline_static(path):
+    """Insere o conteudo de um arquivo estatico (ex.: CSS critico) no HTML."""
+    return mark_safe(_read_static(path))
@@ -1,18 +1,61 @@
-﻿from io import BytesIO
+﻿import gzip
+import hashlib
+import json
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-from django.core.management import call_command
-from django.core.exceptions import ValidationError
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import CommandError, call_command
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase, override_settings
+from django.db import connections, router, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from openpyxl import Workbook
+from django.utils import timezone
+import numpy as np
+import pyarrow.parquet as pq
+from openpyxl import Workbook, load_workbook
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 
-from .models import EsicPedido, PortalInformacao
+from portal_transparencia import gunicorn_conf
+from portal_transparencia.db_profiles import POSTGRESQL_ENGINE, SQLITE_ENGINE, apply_profile
+
+from .assets import minify_css, stale_portal_assets
+from .cache import TieredCache, get_tiered_cache
+from .dumps import generate_dumps, read_manifest, write_dump
+from .jobs import claim, enqueue, report_progress, run, run_worker, task
+from .admin_scaling import EstimatedCountPaginator, is_code_term
+from .analytics import PERCENTIS, despesa_statistics, grouped_stats, invalidate_despesa_analytics
+from .importacao import to_decimal
+from .models import (
+    Despesa, EsicContador, EsicPedido, ParticaoDadosAbertos, PortalInformacao, Servidor, Tarefa, UnidadeGestora,
+)
+from .publishing import PORTAL_INFO_CACHE_KEY
+from .renderers import FastJSONRenderer
+from .tasks import enqueue_publish_portal, schedule_dumps
+from .routers import PrimaryReplicaRouter, end_request, start_request
+from .throttles import SQLiteBucketStore, create_bucket_store, get_bucket_store, parse_rate
 
 
 class EsicSubmitApiTests(APITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
     def test_submit_esic_request_success(self):
         payload = {
             'tipo': 'Acesso à Informação',
@@ -111,21 +154,23 @@ class HealthAndRegisterApiTests(APITestCase):
 
 class PublicPortalInfoApiTests(APITestCase):
     def test_public_portal_info_returns_grouped_items(self):
-        PortalInformacao.objects.create(
-            secao='POLITICAS',
-            titulo='Lei Geral de Protecao de Dados (LGPD)',
-            descricao='Lei no 13.709/2018.',
-            link='https://www.planalto.gov.br/ccivil_03/_ato2015-2018/2018/lei/L13709.htm',
-            ordem=1,
-            ativo=True,
-        )
-        PortalInformacao.objects.create(
-            secao='FINANCEIROS',
-            titulo='Relatorio Financeiro 2025',
-            descricao='Balanco anual.',
-            ordem=1,
-            ativo=True,
-        )
+        # A invalidacao do cache roda apos o commit.
+        with self.captureOnCommitCallbacks(execute=True):
+            PortalInformacao.objects.create(
+                secao='POLITICAS',
+                titulo='Lei Geral de Protecao de Dados (LGPD)',
+                descricao='Lei no 13.709/2018.',
+                link='https://www.planalto.gov.br/ccivil_03/_ato2015-2018/2018/lei/L13709.htm',
+                ordem=1,
+                ativo=True,
+            )
+            PortalInformacao.objects.create(
+                secao='FINANCEIROS',
+                titulo='Relatorio Financeiro 2025',
+                descricao='Balanco anual.',
+                ordem=1,
+                ativo=True,
+            )
 
         response = self.client.get('/api/public/portal-info/')
 
@@ -137,13 +182,14 @@ class PublicPortalInfoApiTests(APITestCase):
         self.assertEqual(len(response.data['items']['FINANCEIROS']), 1)
 
     def test_public_portal_info_does_not_return_inactive_items(self):
-        PortalInformacao.objects.create(
-            secao='POLITICAS',
-            titulo='Documento inativo',
-            descricao='Nao deve aparecer.',
-            ordem=5,
-            ativo=False,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            PortalInformacao.objects.create(
+                secao='POLITICAS',
+                titulo='Documento inativo',
+                descricao='Nao deve aparecer.',
+                ordem=5,
+                ativo=False,
+            )
 
         response = self.client.get('/api/public/portal-info/')
 
@@ -211,6 +257,14 @@ class PortalInformacaoImportAdminTests(TestCase):
             email='admin_import@example.com',
         )
         self.client.force_login(self.user)
+        # Uploads e a publicacao enfileirada pelas importacoes ficam fora da arvore do projeto.
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=Path(tmp.name) / 'media', PORTAL_PRERENDER_ROOT=Path(tmp.name) / 'prerender'
+        )
+        override.enable()
+        self.addCleanup(override.disable)
 
     def _build_xlsx(self, rows):
         wb = Workbook()
@@ -224,6 +278,10 @@ class PortalInformacaoImportAdminTests(TestCase):
         buff.seek(0)
         return buff.getvalue()
 
+    def _run_tasks(self):
+        for tarefa in claim('worker-teste', limit=10):
+            run(tarefa)
+
     def test_importar_planilha_cria_itens_por_aba(self):
         xlsx_content = self._build_xlsx(
             [
@@ -242,6 +300,7 @@ class PortalInformacaoImportAdminTests(TestCase):
             {'arquivo': upload},
             follow=False,
         )
+        self._run_tasks()
 
         self.assertEqual(response.status_code, 302)
         self.assertEqual(PortalInformacao.objects.count(), 2)
@@ -265,9 +324,1297 @@ class PortalInformacaoImportAdminTests(TestCase):
         response = self.client.post(
             reverse('admin:core_portalinformacao_importar_planilha'),
             {'arquivo': upload},
-            follow=True,
         )
+        self._run_tasks()
+        response = self.client.get(response['Location'])
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Secao invalida')
         self.assertEqual(PortalInformacao.objects.count(), 0)
+
+    def _upload(self, rows):
+        upload = SimpleUploadedFile('importacao.xlsx', self._build_xlsx(rows))
+        self.client.post(reverse('admin:core_portalinformacao_importar_planilha'), {'arquivo': upload})
+        self._run_tasks()
+        return Tarefa.objects.get(nome='importar_planilha_portal')
+
+    @override_settings(IMPORTACAO_LOTE=2)
+    def test_importacao_em_lotes_retoma_do_ultimo_lote_confirmado(self):
+        rows = [['POLITICAS', f'Documento {n}', 'Descricao', '', n, 'sim'] for n in range(5)]
+        rows[3][0] = 'INVALIDA'
+        original = PortalInformacao.objects.bulk_create
+        chamadas = []
+
+        def bulk_create_instavel(objs, *args, **kwargs):
+            chamadas.append(len(objs))
+            if len(chamadas) == 2:
+                raise RuntimeError('conexao perdida')
+            return original(objs, *args, **kwargs)
+
+        with override_settings(TAREFAS_EAGER=True, TAREFAS_MAX_TENTATIVAS=1), \
+                mock.patch.object(PortalInformacao.objects, 'bulk_create', bulk_create_instavel):
+            tarefa = self._upload(rows)
+
+        self.assertEqual((tarefa.status, tarefa.progresso), ('FALHOU', 2))
+        self.assertEqual(PortalInformacao.objects.count(), 2)
+        response = self.client.get(
+            reverse('admin:core_portalinformacao_importar_planilha_progresso', args=[tarefa.id])
+        )
+        self.assertContains(response, 'conexao perdida')
+        self.assertContains(response, 'Retomar a partir da linha 4')
+
+        self.client.post(reverse('admin:core_portalinformacao_importar_planilha_progresso', args=[tarefa.id]))
+        self._run_tasks()
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'CONCLUIDA')
+        self.assertEqual((tarefa.progresso, tarefa.total), (5, 5))
+        self.assertEqual(tarefa.resultado['inseridos'], 4)
+        self.assertEqual(tarefa.resultado['erros'], ['Secao invalida na linha 5: INVALIDA'])
+        self.assertEqual(
+            sorted(PortalInformacao.objects.values_list('ordem', flat=True)), [0, 1, 2, 4]
+        )
+
+    def test_upload_e_enfileirado_e_mostra_progresso(self):
+        rows = [['POLITICAS', 'LAI', 'Lei.', '', 0, 'sim']]
+        upload = SimpleUploadedFile('importacao.xlsx', self._build_xlsx(rows))
+        self.client.post(reverse('admin:core_portalinformacao_importar_planilha'), {'arquivo': upload})
+        tarefa = Tarefa.objects.get(nome='importar_planilha_portal')
+
+        self.assertEqual(tarefa.status, 'PENDENTE')
+        self.assertEqual(PortalInformacao.objects.count(), 0)
+        response = self.client.get(
+            reverse('admin:core_portalinformacao_importar_planilha_progresso', args=[tarefa.id])
+        )
+        self.assertContains(response, 'http-equiv="refresh"')
+
+        run(claim('worker-teste')[0])
+        self.assertEqual(PortalInformacao.objects.get().titulo, 'LAI')
+
+    def _import(self, rows, **options):
+        upload = SimpleUploadedFile('importacao.xlsx', self._build_xlsx(rows))
+        self.client.post(
+            reverse('admin:core_portalinformacao_importar_planilha'), {'arquivo': upload, **options}
+        )
+        self._run_tasks()
+        return Tarefa.objects.filter(nome='importar_planilha_portal').order_by('-criado_em').first()
+
+    def test_reimportacao_grava_so_linhas_novas_alteradas_e_removidas(self):
+        self._import([
+            ['POLITICAS', 'LAI', 'Lei 12.527.', '', 1, 'sim'],
+            ['POLITICAS', 'LGPD', 'Lei 13.709.', '', 2, 'sim'],
+            ['POLITICAS', 'Antiga', 'Revogada.', '', 3, 'sim'],
+        ])
+        manual = PortalInformacao.objects.create(secao='POLITICAS', titulo='Manual', descricao='Criado no admin.')
+        lai = PortalInformacao.objects.get(titulo='LAI')
+
+        tarefa = self._import(
+            [
+                ['POLITICAS', 'LAI', 'Lei 12.527.', '', 1, 'sim'],
+                ['POLITICAS', 'LGPD', 'Lei 13.709/2018.', '', 2, 'sim'],
+                ['POLITICAS', 'Nova', 'Politica nova.', '', 4, 'sim'],
+            ],
+            remover_ausentes='on',
+        )
+
+        resultado = tarefa.resultado
+        self.assertEqual(
+            [resultado[k] for k in ('inseridos', 'alterados', 'inalterados', 'removidos')], [1, 1, 1, 1]
+        )
+        self.assertEqual(resultado['amostras']['removidos'], ['POLITICAS / Antiga'])
+        self.assertEqual(
+            sorted(PortalInformacao.objects.values_list('titulo', flat=True)), ['LAI', 'LGPD', 'Manual', 'Nova']
+        )
+        self.assertEqual(PortalInformacao.objects.get(titulo='LGPD').descricao, 'Lei 13.709/2018.')
+        self.assertEqual(PortalInformacao.objects.get(id=lai.id).atualizado_em, lai.atualizado_em)
+        self.assertTrue(PortalInformacao.objects.filter(id=manual.id).exists())
+
+    def test_simulacao_mostra_diff_sem_gravar_e_pode_ser_aplicada(self):
+        tarefa = self._import([['POLITICAS', 'LAI', 'Lei.', '', 1, 'sim']], simular='on')
+
+        self.assertEqual(PortalInformacao.objects.count(), 0)
+        url = reverse('admin:core_portalinformacao_importar_planilha_progresso', args=[tarefa.id])
+        response = self.client.get(url)
+        self.assertContains(response, 'Seriam inseridos')
+        self.assertContains(response, 'POLITICAS / LAI')
+
+        self.client.post(url)
+        self._run_tasks()
+        self.assertEqual(PortalInformacao.objects.get().titulo, 'LAI')
+        self.assertEqual(Tarefa.objects.filter(nome='importar_planilha_portal', status='CONCLUIDA').count(), 2)
+
+
+class ImportarPlanilhaCommandTests(TestCase):
+    def setUp(self):
+        self.unidade = UnidadeGestora.objects.create(codigo='UG-01', nome='Secretaria de Saude', sigla='SESAU')
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def _csv(self, linhas):
+        path = Path(self._tmp.name) / 'despesas.csv'
+        conteudo = 'codigo;descricao;categoria;dotacao;empenhado;liquidado;pago;exercicio;unidade\n'
+        path.write_text(conteudo + ''.join(f'{linha}\n' for linha in linhas), encoding='utf-8')
+        return str(path)
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('importar_planilha', 'despesa', *args, stdout=out)
+        return out.getvalue()
+
+    def test_importa_despesas_csv_de_forma_incremental(self):
+        self._run(self._csv([
+            'D-1;Medicamentos;custeio;1.000,00;900,00;800,00;700,00;2025;UG-01',
+            'D-2;Reforma;INVESTIMENTO;5000;0;0;0;2025;UG-01',
+        ]))
+        self.assertEqual(Despesa.objects.get(codigo='D-1').dotacao, Decimal('1000.00'))
+
+        arquivo = self._csv([
+            'D-1;Medicamentos;CUSTEIO;1000.00;900;800;750,00;2025;UG-01',
+            'D-2;Reforma;INVESTIMENTO;5000;0;0;0;2025;UG-01',
+            'D-3;Sem unidade;CUSTEIO;1;1;1;1;2025;UG-XX',
+        ])
+        output = self._run(arquivo, '--simular')
+        self.assertIn('Alterados: 1.', output)
+        self.assertEqual(Despesa.objects.get(codigo='D-1').pago, Decimal('700.00'))
+
+        output = self._run(arquivo)
+        self.assertIn('Inseridos: 0. Alterados: 1.', output)
+        self.assertIn('Sem alteracao: 1. Erros: 1.', output)
+        self.assertIn('Unidade gestora desconhecida na linha 4', output)
+        self.assertEqual(Despesa.objects.get(codigo='D-1').pago, Decimal('750.00'))
+
+    def test_marca_so_os_exercicios_importados(self):
+        self._run(self._csv(['D-1;Antiga;CUSTEIO;1;1;1;1;2024;UG-01', 'D-2;Nova;CUSTEIO;1;1;1;1;2025;UG-01']))
+        ParticaoDadosAbertos.objects.update(gerada_em=timezone.now())
+
+        self._run(self._csv(['D-1;Antiga;CUSTEIO;1;1;1;1;2024;UG-01', 'D-2;Nova;CUSTEIO;2;1;1;1;2025;UG-01']))
+        alteradas = [
+            registro.particao for registro in ParticaoDadosAbertos.objects.filter(conjunto='despesas')
+            if registro.alterada_em > registro.gerada_em
+        ]
+        self.assertEqual(alteradas, ['2025'])
+
+    def _xlsx(self, abas):
+        wb = Workbook()
+        wb.remove(wb.active)
+        for nome, linhas in abas.items():
+            ws = wb.create_sheet(nome)
+            ws.append(['codigo', 'descricao', 'categoria', 'dotacao', 'empenhado', 'liquidado', 'pago', 'exercicio', 'unidade'])
+            for linha in linhas:
+                ws.append(linha)
+        path = Path(self._tmp.name) / 'despesas.xlsx'
+        wb.save(path)
+        return str(path)
+
+    def test_importa_abas_em_paralelo_com_um_unico_gravador(self):
+        abas = {
+            f'Mes {mes}': [
+                [f'D-{mes}-{n}', 'Custeio mensal', 'CUSTEIO', 100, 90, 80, 70, 2025, 'UG-01'] for n in range(3)
+            ]
+            for mes in range(1, 4)
+        }
+        abas['Mes 3'].append(['D-X', 'Invalida', 'OUTRA', 1, 1, 1, 1, 2025, 'UG-01'])
+
+        output = self._run(self._xlsx(abas), '--todas-abas', '--processos', '2')
+
+        self.assertIn('Inseridos: 9.', output)
+        self.assertIn('Fontes: 3', output)
+        self.assertIn('despesas.xlsx:Mes 3: Categoria invalida na linha 5', output)
+        self.assertEqual(Despesa.objects.exclude(hash_importacao='').count(), 9)
+
+    def test_erro_em_uma_aba_interrompe_importacao_paralela(self):
+        arquivo = self._xlsx({'Mes 1': [['D-1', 'Custeio', 'CUSTEIO', 1, 1, 1, 1, 2025, 'UG-01']], 'Mes 2': []})
+        wb = load_workbook(arquivo)
+        wb['Mes 2'].delete_cols(9)
+        wb.save(arquivo)
+
+        with self.assertRaisesMessage(CommandError, 'Colunas obrigatorias ausentes: unidade'):
+            self._run(arquivo, '--todas-abas', '--processos', '2')
+
+    def test_to_decimal_formato_brasileiro(self):
+        casos = {
+            '1.234': Decimal('1234.00'),
+            '1.234.567': Decimal('1234567.00'),
+            'R$ 1.234': Decimal('1234.00'),
+            '1.234,5': Decimal('1234.50'),
+            '1234.56': Decimal('1234.56'),
+            '12.5': Decimal('12.50'),
+            1234.5: Decimal('1234.50'),
+        }
+        for valor, esperado in casos.items():
+            with self.subTest(valor=valor):
+                self.assertEqual(to_decimal(valor, 'pago', 2), esperado)
+        with self.assertRaises(ValueError):
+            to_decimal('1.23.4', 'pago', 2)
+
+
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    replica_alias = 'replica_teste'
+
+    @classmethod
+    def setUpClass(cls):
+        cls._replica_dir = tempfile.TemporaryDirectory()
+        connections.settings[cls.replica_alias] = {
+            **connections.settings['default'],
+            'NAME': str(Path(cls._replica_dir.name) / 'replica.sqlite3'),
+        }
+        cls.databases = {'default', cls.replica_alias}
+        call_command('migrate', database=cls.replica_alias, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.replica_alias].close()
+        del connections[cls.replica_alias]
+        del connections.settings[cls.replica_alias]
+        cls._replica_dir.cleanup()
+
+    def _router_settings(self):
+        return override_settings(
+            DATABASE_ROUTERS=['core.routers.PrimaryReplicaRouter'],
+            DATABASE_REPLICAS=[self.replica_alias],
+        )
+
+    def test_public_read_is_served_by_replica(self):
+        PortalInformacao.objects.using(self.replica_alias).create(
+            secao='POLITICAS', titulo='Somente na replica', descricao='Replicado.'
+        )
+
+        with self._router_settings():
+            response = self.client.get('/api/public/portal-info/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titulos = [item['titulo'] for item in response.json()['items']['POLITICAS']]
+        self.assertEqual(titulos, ['Somente na replica'])
+
+    def test_write_goes_to_primary_and_pins_following_reads(self):
+        with self._router_settings():
+            response = self.client.post(
+                '/api/esic/submit/', {'descricao': 'Pedido via primario'}, content_type='application/json'
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(EsicPedido.objects.using('default').count(), 1)
+
+            token = start_request()
+            try:
+                self.assertEqual(router.db_for_read(PortalInformacao), self.replica_alias)
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='Novo', descricao='Escrita.')
+                self.assertEqual(router.db_for_read(PortalInformacao), 'default')
+            finally:
+                end_request(token)
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        router_instance = PrimaryReplicaRouter()
+        with self._router_settings():
+            router_instance._mark_unavailable(self.replica_alias)
+            self.assertEqual(router_instance.db_for_read(PortalInformacao), 'default')
+
+    def test_round_robin_between_replicas(self):
+        router_instance = PrimaryReplicaRouter()
+        with override_settings(DATABASE_REPLICAS=['default', self.replica_alias]):
+            escolhas = {router_instance.db_for_read(PortalInformacao) for _ in range(4)}
+        self.assertEqual(escolhas, {'default', self.replica_alias})
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_default_profile_keeps_settings_untouched(self):
+        database = {'ENGINE': SQLITE_ENGINE, 'NAME': 'db.sqlite3'}
+        self.assertEqual(apply_profile(dict(database), 'default'), database)
+
+    def test_invalid_profile_raises(self):
+        with self.assertRaises(ImproperlyConfigured):
+            apply_profile({'ENGINE': SQLITE_ENGINE}, 'turbo')
+
+    def test_performance_profile_enables_postgres_pool(self):
+        database = apply_profile(
+            {'ENGINE': POSTGRESQL_ENGINE, 'CONN_MAX_AGE': 600},
+            'performance',
+            pool_min_size=1,
+            pool_max_size=8,
+        )
+        self.assertEqual(database['OPTIONS']['pool']['min_size'], 1)
+        self.assertEqual(database['OPTIONS']['pool']['max_size'], 8)
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+    def test_performance_profile_applies_sqlite_pragmas_on_connect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            database = apply_profile(
+                {'ENGINE': SQLITE_ENGINE, 'NAME': str(Path(tmp) / 'perfil.sqlite3')},
+                'performance',
+                sqlite_busy_timeout_ms=2500,
+            )
+            wrapper = SQLiteDatabaseWrapper(
+                {**connections.settings['default'], **database}, alias='perfil_teste'
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone()[0], 2500)
+            finally:
+                wrapper.close()
+
+
+class PortalPrerenderTests(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        self.settings_override = override_settings(PORTAL_PRERENDER_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_publicar_portal_gera_home_e_json_comprimidos(self):
+        PortalInformacao.objects.create(
+            secao='FINANCEIROS', titulo='Relatorio Publicado', descricao='Balanco.', ordem=1
+        )
+
+        call_command('publicar_portal', stdout=StringIO())
+
+        html = (self.root / 'index.html').read_bytes()
+        self.assertIn(b'Relatorio Publicado', html)
+        self.assertEqual(gzip.decompress((self.root / 'index.html.gz').read_bytes()), html)
+
+        json_path = self.root / 'api' / 'public' / 'portal-info' / 'index.json'
+        api_response = self.client.get('/api/public/portal-info/')
+        self.assertEqual(json_path.read_bytes(), api_response.content)
+        self.assertTrue(json_path.with_name('index.json.gz').exists())
+
+    @override_settings(PORTAL_PRERENDER_ON_CHANGE=True)
+    def test_alteracao_publica_uma_vez_apos_commit(self):
+        with mock.patch('core.signals.enqueue_publish_portal', wraps=enqueue_publish_portal) as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='LAI', descricao='Lei.')
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='LGPD', descricao='Lei.')
+
+        self.assertEqual(enqueue.call_count, 1)
+        [tarefa] = claim('worker-teste')
+        self.assertTrue(run(tarefa))
+        self.assertEqual(Tarefa.objects.get(nome='publicar_portal').status, 'CONCLUIDA')
+        self.assertIn(b'LGPD', (self.root / 'index.html').read_bytes())
+
+    @override_settings(PORTAL_PRERENDER_ON_CHANGE=True)
+    def test_rollback_nao_impede_publicacao_seguinte(self):
+        with mock.patch('core.signals.enqueue_publish_portal') as enqueue:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='LAI', descricao='Lei.')
+                raise RuntimeError
+            with self.captureOnCommitCallbacks(execute=True):
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='LGPD', descricao='Lei.')
+
+        enqueue.assert_called_once_with()
+
+    @override_settings(PORTAL_PRERENDER_ON_CHANGE=False)
+    def test_sem_flag_nao_publica(self):
+        with mock.patch('core.signals.enqueue_publish_portal') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                PortalInformacao.objects.create(secao='POLITICAS', titulo='LAI', descricao='Lei.')
+
+        enqueue.assert_not_called()
+        self.assertFalse((self.root / 'index.html').exists())
+
+
+class PortalAssetsTests(TestCase):
+    def test_assets_versionados_estao_atualizados(self):
+        self.assertEqual(stale_portal_assets(), [])
+
+    def test_minify_css_remove_comentarios_e_espacos(self):
+        css = '/* topo */\n.a , .b > .c {\n  color : red;\n  margin: 0 auto;\n}\n'
+        self.assertEqual(minify_css(css), '.a,.b>.c{color:red;margin:0 auto}\n')
+
+    def test_home_inlines_critical_css_and_links_external_assets(self):
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        html = response.content.decode('utf-8')
+        self.assertIn('.topbar{', html)
+        self.assertNotIn('.proj-card{', html)
+        self.assertIn('/static/css/portal.min.css', html)
+        self.assertIn('/static/js/portal.min.js', html)
+        self.assertNotIn('function showPage', html)
+
+
+class GunicornProfileTests(SimpleTestCase):
+    def test_workers_by_profile(self):
+        self.assertEqual(gunicorn_conf.compute_workers('sync', cpus=2), 5)
+        self.assertEqual(gunicorn_conf.compute_workers('gthread', cpus=2), 3)
+        self.assertEqual(gunicorn_conf.compute_workers('uvicorn', cpus=2), 2)
+
+    def test_workers_are_capped_by_memory_limit(self):
+        self.assertEqual(
+            gunicorn_conf.compute_workers('sync', cpus=8, memory_mb=512, worker_memory_mb=150), 2
+        )
+        self.assertEqual(
+            gunicorn_conf.compute_workers('sync', cpus=8, memory_mb=128, worker_memory_mb=150), 1
+        )
+
+    def test_threads_only_for_gthread(self):
+        self.assertEqual(gunicorn_conf.compute_threads('sync', cpus=4), 1)
+        self.assertEqual(gunicorn_conf.compute_threads('gthread', cpus=1), 2)
+        self.assertEqual(gunicorn_conf.compute_threads('gthread', cpus=16), 8)
+
+    def test_invalid_profile_raises(self):
+        with self.assertRaises(ValueError):
+            gunicorn_conf.compute_workers('gevent', cpus=2)
+
+
+@override_settings(THROTTLE_ENABLED=True)
+class TokenBucketThrottleTests(APITestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.addCleanup(get_bucket_store().clear)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/minute'), (10, 10 / 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 5 / 3600))
+
+    def test_sqlite_store_is_shared_and_refills(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / 'throttle.sqlite3')
+            worker_a, worker_b = SQLiteBucketStore(path), SQLiteBucketStore(path)
+            self.assertTrue(worker_a.consume('k', 2, 1.0, now=100)[0])
+            self.assertTrue(worker_b.consume('k', 2, 1.0, now=100)[0])
+            self.assertFalse(worker_a.consume('k', 2, 1.0, now=100)[0])
+            self.assertTrue(worker_b.consume('k', 2, 1.0, now=101)[0])
+
+    def test_sqlite_url_relative_and_absolute_paths(self):
+        self.assertEqual(create_bucket_store('sqlite:///throttle.sqlite3').path, 'throttle.sqlite3')
+        self.assertEqual(create_bucket_store('sqlite:////srv/app/throttle.sqlite3').path, '/srv/app/throttle.sqlite3')
+
+    @override_settings(
+        REST_FRAMEWORK={
+            'DEFAULT_THROTTLE_RATES': {'esic_submit': '2/hour', 'public_read': '100/minute', 'register': '5/hour'},
+        }
+    )
+    def test_esic_submit_returns_429_when_bucket_is_empty(self):
+        for _ in range(2):
+            response = self.client.post('/api/esic/submit/', {'descricao': 'Pedido'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post('/api/esic/submit/', {'descricao': 'Pedido'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        # Outro escopo tem balde proprio.
+        self.assertEqual(self.client.get('/api/public/portal-info/').status_code, status.HTTP_200_OK)
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        backend = LocMemCache('tiered-tests', {})
+        backend.clear()
+        self.cache = TieredCache(backend, local_max_entries=2, local_ttl=60)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'versao': self.calls}
+
+    def test_local_and_shared_hits(self):
+        self.assertEqual(self.cache.get_or_set('a', self.compute, ttl=60), {'versao': 1})
+        self.assertEqual(self.cache.get_or_set('a', self.compute, ttl=60), {'versao': 1})
+        self.cache.clear_local()
+        self.assertEqual(self.cache.get_or_set('a', self.compute, ttl=60), {'versao': 1})
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['local_hits'], stats['shared_hits']), (1, 1, 1))
+        self.assertEqual(self.calls, 1)
+
+    def test_lru_evicts_least_recently_used(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.get_or_set(key, self.compute, ttl=60)
+        self.assertEqual(len(self.cache.local), 2)
+        self.assertIsNone(self.cache.local.get('a'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_stale_value_is_served_while_another_worker_recomputes(self):
+        self.cache.get_or_set('a', self.compute, ttl=0, stale_ttl=60)
+        self.cache.clear_local()
+        # Outro worker detem o lock de recalculo.
+        self.assertTrue(self.cache.backend.add(self.cache._lock_key('a'), 'outro', 30))
+
+        self.assertEqual(self.cache.get_or_set('a', self.compute, ttl=60), {'versao': 1})
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+        self.cache.backend.delete(self.cache._lock_key('a'))
+        self.assertEqual(self.cache.get_or_set('a', self.compute, ttl=60), {'versao': 2})
+
+    def test_file_backend_uses_exclusive_lock_file(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        worker_a = TieredCache(FileBasedCache(tmp.name, {}))
+        worker_b = TieredCache(FileBasedCache(tmp.name, {}))
+
+        token = worker_a._acquire('a')
+        self.assertIsNotNone(token)
+        self.assertIsNone(worker_b._acquire('a'))
+        worker_a._release('a', token)
+        token = worker_b._acquire('a')
+        self.assertIsNotNone(token)
+        worker_b._release('a', token)
+
+    def test_failed_recompute_keeps_stale_value(self):
+        self.cache.get_or_set('a', self.compute, ttl=0, stale_ttl=60)
+        self.cache.clear_local()
+
+        def broken():
+            raise RuntimeError('banco indisponivel')
+
+        self.assertEqual(self.cache.get_or_set('a', broken, ttl=60), {'versao': 1})
+        self.assertEqual(self.cache.stats()['recompute_errors'], 1)
+
+    @override_settings(PORTAL_INFO_CACHE_TTL=60)
+    def test_portal_info_is_cached_and_invalidated_on_commit(self):
+        get_tiered_cache().delete(PORTAL_INFO_CACHE_KEY)
+        self.addCleanup(get_tiered_cache().delete, PORTAL_INFO_CACHE_KEY)
+
+        self.client.get('/api/public/portal-info/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/public/portal-info/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PortalInformacao.objects.create(secao='POLITICAS', titulo='Nova Lei', descricao='Lei.')
+
+        response = self.client.get('/api/public/portal-info/')
+        self.assertEqual(response.json()['items']['POLITICAS'][0]['titulo'], 'Nova Lei')
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(
+            get_user_model().objects.create_superuser(username='admin_big', password='SenhaSegura123!')
+        )
+        self.url = reverse('admin:core_esicpedido_changelist')
+
+    def _criar_pedidos(self, total):
+        from django.utils import timezone
+
+        inicio = UnidadeGestora.objects.count()
+        for numero in range(inicio, inicio + total):
+            unidade = UnidadeGestora.objects.create(
+                codigo=f'UG-{numero}', nome=f'Unidade {numero}', sigla=f'U{numero}'
+            )
+            EsicPedido.objects.create(
+                protocolo=f'ESIC-{numero}',
+                tipo='PEDIDO_ACESSO',
+                descricao='Pedido',
+                status='ABERTO',
+                prazo=timezone.now(),
+                unidade=unidade,
+            )
+
+    def _queries(self):
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self._criar_pedidos(2)
+        poucos, _ = self._queries()
+        self._criar_pedidos(6)
+        muitos, response = self._queries()
+
+        self.assertEqual(poucos, muitos)
+        # Filtro por autocomplete: as unidades nao sao listadas no HTML.
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Unidade 5</a>')
+
+    def test_autocomplete_filter_filters_by_unidade(self):
+        self._criar_pedidos(3)
+        unidade = UnidadeGestora.objects.get(nome='Unidade 1')
+
+        response = self.client.get(self.url, {'unidade__id__exact': unidade.pk})
+
+        self.assertContains(response, 'ESIC-1<')
+        self.assertNotContains(response, 'ESIC-2<')
+
+    def test_paginator_counts_exactly_outside_postgres(self):
+        self._criar_pedidos(2)
+        paginator = EstimatedCountPaginator(EsicPedido.objects.order_by('pk'), 10)
+        self.assertEqual(paginator.count, 2)
+
+
+class IndexedAdminSearchTests(TestCase):
+    def setUp(self):
+        from django.contrib import admin
+        from django.utils import timezone
+
+        self.model_admin = admin.site.get_model_admin(EsicPedido)
+        unidade = UnidadeGestora.objects.create(codigo='UG-BUSCA', nome='Secretaria de Saude', sigla='SESAU')
+        for protocolo, descricao in (
+            ('ESIC-20250101-1', 'Dados da saude basica'),
+            ('ESIC-20250202-2', 'Cita o protocolo ESIC-20250101-1 na descricao'),
+        ):
+            EsicPedido.objects.create(
+                protocolo=protocolo,
+                tipo='PEDIDO_ACESSO',
+                descricao=descricao,
+                status='ABERTO',
+                email='cidadao@example.com',
+                prazo=timezone.now(),
+                unidade=unidade,
+            )
+
+    def _search(self, term):
+        queryset, _ = self.model_admin.get_search_results(None, EsicPedido.objects.all(), term)
+        return queryset
+
+    def test_detects_code_terms(self):
+        self.assertTrue(is_code_term('ESIC-2025'))
+        self.assertTrue(is_code_term('cidadao@example.com'))
+        self.assertFalse(is_code_term('saude basica'))
+        self.assertFalse(is_code_term('saude'))
+
+    def test_code_term_uses_prefix_not_contains(self):
+        queryset = self._search('ESIC-20250101')
+
+        self.assertEqual([p.protocolo for p in queryset], ['ESIC-20250101-1'])
+        sql = str(queryset.query)
+        self.assertIn('ESIC-20250101%', sql)
+        self.assertNotIn('%ESIC', sql)
+
+    def test_code_search_fields_have_pattern_ops_index(self):
+        from django.contrib import admin
+
+        for model, model_admin in admin.site._registry.items():
+            for name in getattr(model_admin, 'code_search_fields', ()):
+                with self.subTest(model=model.__name__, field=name):
+                    # unique: o Django cria o indice *_like (varchar_pattern_ops) no PostgreSQL.
+                    pattern_ops = model._meta.get_field(name).unique or any(
+                        index.fields == [name] and index.opclasses == ['varchar_pattern_ops']
+                        for index in model._meta.indexes
+                    )
+                    self.assertTrue(pattern_ops)
+
+    def test_code_term_ignores_case(self):
+        self.assertEqual([p.protocolo for p in self._search('esic-20250202')], ['ESIC-20250202-2'])
+        self.assertEqual(self._search('CIDADAO@example.com').count(), 2)
+
+    def test_text_term_searches_description_words(self):
+        self.assertEqual([p.protocolo for p in self._search('SAUDE basica')], ['ESIC-20250101-1'])
+        self.assertEqual(self._search('cidadao@example.com').count(), 2)
+
+    def test_unidade_autocomplete_uses_indexed_search(self):
+        from django.contrib import admin
+
+        unidade_admin = admin.site.get_model_admin(UnidadeGestora)
+        queryset, _ = unidade_admin.get_search_results(None, UnidadeGestora.objects.all(), 'sesau')
+        self.assertEqual(queryset.get().codigo, 'UG-BUSCA')
+
+
+@task('teste_somar')
+def _tarefa_somar(tarefa, valores):
+    for indice, _ in enumerate(valores, start=1):
+        report_progress(tarefa, indice, total=len(valores))
+    return sum(valores)
+
+
+@task('teste_falhar')
+def _tarefa_falhar(tarefa):
+    raise RuntimeError('falha simulada')
+
+
+@override_settings(TAREFAS_EAGER=False, TAREFAS_BACKOFF_BASE=10, TAREFAS_BACKOFF_MAX=60)
+class JobQueueTests(TransactionTestCase):
+    def test_worker_executa_fila_e_registra_progresso(self):
+        tarefa = enqueue('teste_somar', valores=[1, 2, 3])
+        self.assertEqual(tarefa.status, 'PENDENTE')
+
+        self.assertEqual(run_worker(burst=True), 1)
+
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'CONCLUIDA')
+        self.assertEqual(tarefa.resultado, 6)
+        self.assertEqual((tarefa.progresso, tarefa.total, tarefa.percentual), (3, 3, 100))
+
+    def test_tarefa_reservada_nao_e_entregue_a_outro_worker(self):
+        enqueue('teste_somar', valores=[1])
+        enqueue('teste_somar', valores=[2], executar_em=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(len(claim('worker-a')), 1)
+        self.assertEqual(claim('worker-b'), [])
+
+    def test_reserva_expirada_e_retomada(self):
+        tarefa = enqueue('teste_somar', valores=[1])
+        claim('worker-a')
+        Tarefa.objects.filter(id=tarefa.id).update(reservada_ate=timezone.now() - timedelta(seconds=1))
+
+        [retomada] = claim('worker-b')
+        self.assertEqual((retomada.worker, retomada.tentativas), ('worker-b', 2))
+
+        # O worker antigo nao sobrescreve o resultado do novo dono.
+        tarefa.refresh_from_db()
+        tarefa.worker = 'worker-a'
+        run(tarefa)
+        self.assertEqual(Tarefa.objects.get(id=tarefa.id).status, 'EXECUTANDO')
+
+    def test_reserva_expirada_sem_tentativas_restantes_falha(self):
+        tarefa = enqueue('teste_somar', valores=[1], max_tentativas=1)
+        claim('worker-a')
+        # O worker morreu sem registrar a falha.
+        Tarefa.objects.filter(id=tarefa.id).update(reservada_ate=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(claim('worker-b'), [])
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), ('FALHOU', 1))
+        self.assertIn('Reserva expirada', tarefa.erro)
+
+    def test_falha_reagenda_com_backoff_e_depois_desiste(self):
+        tarefa = enqueue('teste_falhar', max_tentativas=2)
+
+        [tarefa] = claim('worker-a')
+        antes = timezone.now()
+        self.assertFalse(run(tarefa))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'PENDENTE')
+        self.assertIn('falha simulada', tarefa.erro)
+        self.assertGreaterEqual(tarefa.executar_em, antes + timedelta(seconds=8))
+        self.assertEqual(claim('worker-a'), [])
+
+        Tarefa.objects.filter(id=tarefa.id).update(executar_em=timezone.now())
+        [tarefa] = claim('worker-a')
+        run(tarefa)
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), ('FALHOU', 2))
+
+    def test_endpoint_de_status_exige_admin(self):
+        tarefa = enqueue('teste_somar', valores=[1])
+        url = f'/api/tarefas/{tarefa.id}/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha-forte-123')
+        self.client.force_login(admin_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], 'PENDENTE')
+        self.assertEqual(self.client.get('/api/tarefas/?status=CONCLUIDA').json(), [])
+
+
+class EsicPainelTests(APITestCase):
+    def setUp(self):
+        self.saude = UnidadeGestora.objects.create(codigo='UG-SAU', nome='Saude', sigla='SESAU')
+        self.educacao = UnidadeGestora.objects.create(codigo='UG-EDU', nome='Educacao', sigla='SEDUC')
+        self.now = timezone.now()
+
+    def _pedido(self, protocolo, unidade, status_pedido='ABERTO', prazo_dias=10, tipo='PEDIDO_ACESSO'):
+        return EsicPedido.objects.create(
+            protocolo=protocolo,
+            tipo=tipo,
+            descricao='Pedido.',
+            status=status_pedido,
+            prazo=self.now + timedelta(days=prazo_dias),
+            unidade=unidade,
+        )
+
+    def _contadores(self):
+        return {
+            (c.status, c.tipo, c.unidade_id): c.total for c in EsicContador.objects.exclude(total=0)
+        }
+
+    def test_contadores_acompanham_transicoes_e_exclusoes(self):
+        pedido = self._pedido('P-1', self.saude)
+        self._pedido('P-2', self.saude)
+        self.assertEqual(self._contadores(), {('ABERTO', 'PEDIDO_ACESSO', self.saude.id): 2})
+
+        pedido.status = 'RESPONDIDO'
+        pedido.unidade = self.educacao
+        pedido.save()
+        self.assertIsNotNone(pedido.respondido_em)
+        self.assertEqual(
+            self._contadores(),
+            {
+                ('ABERTO', 'PEDIDO_ACESSO', self.saude.id): 1,
+                ('RESPONDIDO', 'PEDIDO_ACESSO', self.educacao.id): 1,
+            },
+        )
+
+        pedido.delete()
+        EsicPedido.objects.filter(protocolo='P-2').update(tipo='DENUNCIA')
+        call_command('recalcular_contadores_esic', stdout=StringIO())
+        self.assertEqual(self._contadores(), {('ABERTO', 'DENUNCIA', self.saude.id): 1})
+
+    def test_painel_resume_backlog_prazos_e_mediana(self):
+        self._pedido('P-1', self.saude, prazo_dias=-2)
+        self._pedido('P-2', self.saude, 'EM_ANALISE', prazo_dias=3)
+        self._pedido('P-3', self.educacao, prazo_dias=30)
+        for protocolo, dias in (('P-4', 4), ('P-5', 10)):
+            pedido = self._pedido(protocolo, self.educacao, 'RESPONDIDO', tipo='RECLAMACAO')
+            EsicPedido.objects.filter(id=pedido.id).update(criado_em=self.now - timedelta(days=dias))
+
+        url = '/api/esic/painel/?dias=5'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha-forte-123')
+        self.client.force_login(admin_user)
+
+        with CaptureQueriesContext(connections['default']) as queries:
+            data = self.client.get(url).json()
+        # Totais vem dos contadores; o e-SIC so e lido com filtro (indices).
+        pedido_queries = [q['sql'] for q in queries.captured_queries if 'FROM "core_esicpedido"' in q['sql']]
+        self.assertTrue(pedido_queries)
+        self.assertTrue(all('WHERE' in sql for sql in pedido_queries))
+
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(data['por_status'], {'ABERTO': 2, 'EM_ANALISE': 1, 'RESPONDIDO': 2})
+        self.assertEqual(data['por_tipo'], {'PEDIDO_ACESSO': 3, 'RECLAMACAO': 2})
+        self.assertEqual(data['em_aberto'], 3)
+        self.assertEqual(data['vencidos'], {'total': 1, 'por_status': {'ABERTO': 1}})
+        self.assertEqual(data['vencendo'], {'dias': 5, 'total': 1})
+        self.assertEqual(data['mediana_resposta_dias'], 7.0)
+        saude = next(u for u in data['por_unidade'] if u['codigo'] == 'UG-SAU')
+        self.assertEqual((saude['total'], saude['em_aberto'], saude['vencidos']), (2, 2, 1))
+
+        response = self.client.get(reverse('admin:core_esicpedido_painel'))
+        self.assertContains(response, 'Painel do e-SIC')
+        self.assertContains(response, 'SESAU - Saude')
+
+
+@override_settings(ESIC_STATUS_CACHE_TTL=60)
+class EsicStatusTests(APITestCase):
+    def setUp(self):
+        self.pedido = EsicPedido.objects.create(
+            protocolo='ESIC-20250101-123',
+            tipo='PEDIDO_ACESSO',
+            email='maria@example.com',
+            descricao='Pedido sigiloso.',
+            status='ABERTO',
+            prazo=timezone.now() + timedelta(days=20),
+            unidade=UnidadeGestora.objects.create(codigo='UG-STS', nome='Saude', sigla='SESAU'),
+        )
+        self.url = '/api/esic/status/ESIC-20250101-123/'
+        get_tiered_cache().delete('esic-status:ESIC-20250101-123')
+        self.addCleanup(get_tiered_cache().delete, 'esic-status:ESIC-20250101-123')
+        get_bucket_store().clear()
+        self.addCleanup(get_bucket_store().clear)
+
+    def test_status_sem_dados_pessoais_e_cacheado(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(
+            set(data), {'protocolo', 'status', 'status_descricao', 'prazo', 'possui_resposta'}
+        )
+        self.assertEqual((data['status'], data['possui_resposta']), ('ABERTO', False))
+        self.assertNotIn('maria', str(data))
+        self.assertNotIn('sigiloso', str(data))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).json(), data)
+
+        self.assertEqual(self.client.get('/api/esic/status/ESIC-0/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/esic/status/a%20b/').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_alteracao_do_pedido_invalida_cache(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pedido.status = 'RESPONDIDO'
+            self.pedido.resposta = 'Segue a informacao.'
+            self.pedido.save()
+
+        data = self.client.get(self.url).json()
+        self.assertEqual((data['status'], data['possui_resposta']), ('RESPONDIDO', True))
+
+    @override_settings(
+        THROTTLE_ENABLED=True,
+        REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {'esic_status': '2/minute'}},
+    )
+    def test_consultas_por_ip_sao_limitadas(self):
+        for protocolo in ('ESIC-1', 'ESIC-2'):
+            self.assertEqual(self.client.get(f'/api/esic/status/{protocolo}/').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class UuidPrimaryKeyTests(APITestCase):
+    def test_api_mantem_ids_no_formato_com_hifens(self):
+        unidade = UnidadeGestora.objects.create(codigo='UG-UID', nome='Unidade', sigla='UID')
+        despesa = Despesa.objects.create(
+            codigo='D-1', descricao='Despesa', categoria='CUSTEIO', dotacao=10, empenhado=5,
+            liquidado=5, pago=5, exercicio=2025, unidade=unidade,
+        )
+        self.client.force_login(get_user_model().objects.create_user('leitor', password='SenhaSegura123!'))
+
+        data = self.client.get(f'/api/despesas/{despesa.id}/').json()
+        self.assertEqual((data['id'], data['unidade']), (str(despesa.id), str(unidade.id)))
+        self.assertRegex(data['id'], r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+        self.assertEqual(Despesa.objects.filter(unidade_id=data['unidade']).count(), 1)
+        self.assertEqual(self.client.get('/api/despesas/nao-e-uuid/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AnaliseDespesasTests(APITestCase):
+    def setUp(self):
+        self.saude = UnidadeGestora.objects.create(codigo='UG-SAU', nome='Saude', sigla='SESAU')
+        self.educacao = UnidadeGestora.objects.create(codigo='UG-EDU', nome='Educacao', sigla='SEDUC')
+        invalidate_despesa_analytics([2025])
+        self.addCleanup(invalidate_despesa_analytics, [2025])
+
+    def _despesa(self, codigo, unidade, dotacao, pago, categoria='CUSTEIO', empenhado=100, liquidado=50):
+        return Despesa.objects.create(
+            codigo=codigo, descricao=codigo, categoria=categoria, dotacao=dotacao, empenhado=empenhado,
+            liquidado=liquidado, pago=pago, exercicio=2025, unidade=unidade,
+        )
+
+    def test_percentis_por_grupo_iguais_ao_numpy(self):
+        rng = np.random.default_rng(7)
+        valores = rng.random(500)
+        valores[::13] = np.nan
+        grupos = rng.integers(0, 4, 500)
+        contagem, media, percentis = grouped_stats(valores, grupos, 5)
+        for grupo in range(4):
+            amostra = valores[(grupos == grupo) & ~np.isnan(valores)]
+            self.assertEqual(contagem[grupo], amostra.size)
+            np.testing.assert_allclose(percentis[grupo], np.percentile(amostra, PERCENTIS))
+            self.assertAlmostEqual(media[grupo], amostra.mean())
+        self.assertEqual(contagem[4], 0)
+        self.assertTrue(np.isnan(percentis[4]).all())
+
+    def test_estatisticas_por_unidade_categoria_e_outliers(self):
+        for n in range(8):
+            self._despesa(f'C-{n}', self.saude, 100, 50 + n)
+        self._despesa('C-FORA', self.educacao, 100, 300)
+        self._despesa('P-1', self.educacao, 200, 100, categoria='PESSOAL', empenhado=0)
+        self._despesa('P-2', self.educacao, 0, 10, categoria='PESSOAL')
+
+        self.assertEqual(self.client.get('/api/analise/despesas/?exercicio=2025').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_login(get_user_model().objects.create_user('auditor', password='SenhaSegura123!'))
+        self.assertEqual(self.client.get('/api/analise/despesas/').status_code, status.HTTP_400_BAD_REQUEST)
+        data = self.client.get('/api/analise/despesas/?exercicio=2025').json()
+
+        self.assertEqual(data['despesas'], 11)
+        self.assertEqual(data['totais']['pago'], 838.0)
+        # P-2 (dotacao 0) fica fora da taxa de pagamento; P-1 (empenhado 0) da de liquidacao.
+        self.assertEqual((data['taxas']['pagamento']['n'], data['taxas']['liquidacao']['n']), (10, 10))
+        custeio = next(row for row in data['por_categoria'] if row['categoria'] == 'CUSTEIO')
+        self.assertEqual((custeio['despesas'], custeio['pagamento']['p50']), (9, 0.54))
+        saude = next(row for row in data['por_unidade'] if row['unidade'] == 'UG-SAU')
+        self.assertEqual((saude['despesas'], saude['pagamento']['media']), (8, 0.535))
+        self.assertEqual([row['codigo'] for row in data['outliers']], ['C-FORA'])
+
+    @override_settings(ANALISE_DESPESAS_CACHE_TTL=60)
+    def test_estatisticas_em_cache_ate_despesa_mudar(self):
+        despesa = self._despesa('C-1', self.saude, 100, 50)
+        self.assertEqual(despesa_statistics(2025)['totais']['pago'], 50.0)
+        with self.assertNumQueries(0):
+            despesa_statistics(2025)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            despesa.pago = 80
+            despesa.save()
+        self.assertEqual(despesa_statistics(2025)['totais']['pago'], 80.0)
+
+
+class DadosAbertosTests(APITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        override = override_settings(DADOS_ABERTOS_ROOT=self.root, DADOS_ABERTOS_ROW_GROUP=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.unidade = UnidadeGestora.objects.create(codigo='UG-DA', nome='Unidade', sigla='UDA')
+
+    def _despesa(self, codigo, exercicio, pago='10.25'):
+        return Despesa.objects.create(
+            codigo=codigo, descricao=codigo, categoria='CUSTEIO', dotacao=100, empenhado=50,
+            liquidado=20, pago=Decimal(pago), exercicio=exercicio, unidade=self.unidade,
+        )
+
+    def _gerar(self):
+        out = StringIO()
+        call_command('gerar_dados_abertos', stdout=out)
+        return [linha for linha in out.getvalue().splitlines() if linha.startswith(('OK', 'Removida'))]
+
+    def test_gera_so_particoes_alteradas(self):
+        for n in range(3):
+            self._despesa(f'D-{n}', 2024)
+        despesa = self._despesa('D-9', 2025)
+        for competencia in ('2025/01', '2025-01'):
+            Servidor.objects.create(
+                matricula=f'M-{competencia}', nome='Ana', cargo='Analista', vinculo='EFETIVO', remuneracao_bruta=5000,
+                descontos=500, competencia=competencia, unidade=self.unidade,
+            )
+
+        self.assertEqual(len(self._gerar()), 4)
+        arquivo = pq.ParquetFile(self.root / 'despesas/exercicio=2024/despesas.parquet')
+        self.assertEqual((arquivo.metadata.num_rows, arquivo.num_row_groups), (3, 2))
+        tabela = arquivo.read()
+        self.assertEqual(tabela.column('pago').to_pylist(), [Decimal('10.25')] * 3)
+        self.assertEqual(tabela.column('unidade').to_pylist(), ['UG-DA'] * 3)
+        self.assertNotIn('exercicio', tabela.column_names)
+        self.assertTrue((self.root / 'servidores/competencia=2025%2F01/servidores.parquet').is_file())
+        self.assertTrue((self.root / 'servidores/competencia=2025-01/servidores.parquet').is_file())
+        # Leitura do diretorio com particionamento Hive.
+        despesas = pq.read_table(self.root / 'despesas')
+        self.assertEqual(sorted(despesas.column('exercicio').to_pylist()), [2024, 2024, 2024, 2025])
+        servidores = pq.read_table(self.root / 'servidores')
+        self.assertEqual(sorted(map(str, servidores.column('competencia').to_pylist())), ['2025-01', '2025/01'])
+        self.assertEqual(self._gerar(), [])
+
+        despesa.pago = Decimal('99.00')
+        despesa.save()
+        Despesa.objects.filter(exercicio=2024).delete()
+        gerada, removida = self._gerar()
+        self.assertTrue(gerada.startswith('OK: despesas/exercicio=2025/despesas.parquet (1 linhas'))
+        self.assertEqual(removida, 'Removida: despesas/2024')
+        self.assertFalse(ParticaoDadosAbertos.objects.filter(particao='2024').exists())
+        self.assertFalse((self.root / 'despesas/exercicio=2024/despesas.parquet').exists())
+        tabela = pq.read_table(self.root / 'despesas/exercicio=2025/despesas.parquet')
+        self.assertEqual(tabela.column('pago').to_pylist(), [Decimal('99.00')])
+
+    def test_alteracao_confirmada_durante_a_geracao_entra_na_proxima(self):
+        despesa = self._despesa('D-1', 2025)
+        self._gerar()
+        with self.captureOnCommitCallbacks(execute=True):
+            despesa.pago = Decimal('1.00')
+            despesa.save()
+            # Geracao que leu o banco antes deste commit.
+            ParticaoDadosAbertos.objects.filter(particao='2025').update(gerada_em=timezone.now())
+        self.assertEqual(len(self._gerar()), 1)
+
+    def test_lista_e_download_com_range(self):
+        self._despesa('D-1', 2025)
+        self._gerar()
+
+        [item] = self.client.get('/api/dados-abertos/').json()
+        self.assertEqual((item['conjunto'], item['particao'], item['linhas']), ('despesas', '2025', 1))
+        url = item['url'].replace('http://testserver', '')
+        self.assertEqual(url, '/dados-abertos/despesas/exercicio=2025/despesas.parquet')
+
+        response = self.client.get(url)
+        self.assertEqual((response.status_code, response['Accept-Ranges']), (200, 'bytes'))
+        self.assertEqual(len(b''.join(response.streaming_content)), item['tamanho'])
+
+        for intervalo in ('bytes=0-3', 'bytes=-4'):
+            response = self.client.get(url, HTTP_RANGE=intervalo)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b''.join(response.streaming_content), b'PAR1')
+        self.assertEqual(response['Content-Range'], f'bytes {item["tamanho"] - 4}-{item["tamanho"] - 1}/{item["tamanho"]}')
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE='bytes=999999-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/dados-abertos/../manage.py').status_code, 404)
+
+        Servidor.objects.create(
+            matricula='M-1', nome='Ana', cargo='Analista', vinculo='EFETIVO', remuneracao_bruta=5000,
+            descontos=500, competencia='2025/01', unidade=self.unidade,
+        )
+        self._gerar()
+        item = next(item for item in self.client.get('/api/dados-abertos/').json() if item['conjunto'] == 'servidores')
+        url = item['url'].replace('http://testserver', '')
+        self.assertEqual(url, '/dados-abertos/servidores/competencia=2025%252F01/servidores.parquet')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class DumpsTests(APITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        override = override_settings(DUMPS_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.unidade = UnidadeGestora.objects.create(codigo='UG-DMP', nome='Unidade', sigla='DMP')
+        for n in range(5):
+            Despesa.objects.create(
+                codigo=f'D-{n}', descricao='Manutencao', categoria='CUSTEIO', dotacao=100, empenhado=50,
+                liquidado=20, pago=Decimal('10.50'), exercicio=2025, unidade=self.unidade,
+            )
+        for matricula, vinculo in (('M-1', 'EFETIVO'), ('M-2', 'EFETIVO'), ('M-3', 'CLT')):
+            Servidor.objects.create(
+                matricula=matricula, nome='Nome', cargo='Cargo', vinculo=vinculo, remuneracao_bruta=1000,
+                descontos=100, competencia='2025-01', unidade=self.unidade,
+            )
+
+    def _linhas(self, arquivos):
+        linhas = []
+        for arquivo in arquivos:
+            conteudo = (self.root / arquivo['arquivo']).read_bytes()
+            self.assertEqual(hashlib.sha256(conteudo).hexdigest(), arquivo['sha256'])
+            linhas += [json.loads(linha) for linha in gzip.decompress(conteudo).splitlines()]
+        return linhas
+
+    def test_gera_arquivos_de_tamanho_fixo_com_manifesto(self):
+        call_command('gerar_dumps', linhas_por_arquivo=2, stdout=StringIO())
+        manifest = read_manifest(self.root)
+
+        despesas = manifest['conjuntos']['despesas']
+        self.assertEqual((despesas['linhas'], [a['linhas'] for a in despesas['arquivos']]), (5, [2, 2, 1]))
+        linhas = self._linhas(despesas['arquivos'])
+        self.assertEqual(linhas[0]['pago'], '10.50')
+        self.assertEqual(linhas[0]['unidade'], str(self.unidade.id))
+        self.assertNotIn('hash_importacao', linhas[0])
+
+        agregados = self._linhas(manifest['conjuntos']['servidores_agregados']['arquivos'])
+        self.assertEqual(
+            [(row['vinculo'], row['servidores'], row['remuneracao_bruta']) for row in agregados],
+            [('CLT', 1, '1000.00'), ('EFETIVO', 2, '2000.00')],
+        )
+        self.assertNotIn('nome', agregados[0])
+        self.assertEqual(manifest['conjuntos']['licitacoes'], {'linhas': 0, 'arquivos': []})
+
+        # Conteudo igual gera os mesmos nomes; arquivos fora dos dois ultimos manifestos sao removidos.
+        self.assertEqual(generate_dumps(linhas_por_arquivo=2)[0]['conjuntos'], manifest['conjuntos'])
+        Despesa.objects.update(pago=1)
+        novo, removidos = generate_dumps(linhas_por_arquivo=2)
+        self.assertEqual(removidos, [])
+        antigos = sorted(arquivo['arquivo'] for arquivo in despesas['arquivos'])
+        self.assertFalse(set(antigos) & {a['arquivo'] for a in novo['conjuntos']['despesas']['arquivos']})
+        self.assertEqual(generate_dumps(linhas_por_arquivo=2)[1], antigos)
+
+    def test_arquivos_servidos_pelo_whitenoise_com_cache_longo(self):
+        manifest, _ = generate_dumps()
+        response = self.client.get('/dumps/manifest.json')
+        self.assertEqual(response['Cache-Control'], 'max-age=60, public')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), manifest)
+
+        [arquivo] = manifest['conjuntos']['despesas']['arquivos']
+        response = self.client.get(arquivo['url'])
+        self.assertTrue(response['Cache-Control'].endswith('public, immutable'))
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(hashlib.sha256(b''.join(response.streaming_content)).hexdigest(), arquivo['sha256'])
+
+        # Geracoes feitas com o worker no ar: novos arquivos aparecem e os removidos somem.
+        Despesa.objects.update(pago=1)
+        [novo] = generate_dumps()[0]['conjuntos']['despesas']['arquivos']
+        self.assertEqual(self.client.get(novo['url']).status_code, 200)
+        Despesa.objects.update(pago=2)
+        generate_dumps()
+        self.assertEqual(self.client.get(arquivo['url']).status_code, 404)
+
+    def test_geracao_noturna_agendada_na_fila(self):
+        with override_settings(DUMPS_HORARIO='02:30', TAREFAS_EAGER=False):
+            schedule_dumps()
+            schedule_dumps()
+            [tarefa] = Tarefa.objects.filter(nome='gerar_dumps', status='PENDENTE')
+            executar_em = timezone.localtime(tarefa.executar_em)
+            self.assertEqual((executar_em.hour, executar_em.minute), (2, 30))
+            self.assertLessEqual(tarefa.executar_em - timezone.now(), timedelta(days=1))
+
+            Tarefa.objects.filter(id=tarefa.id).update(executar_em=timezone.now())
+            [tarefa] = claim('worker-a')
+            self.assertTrue(run(tarefa))
+            self.assertEqual(Tarefa.objects.filter(nome='gerar_dumps', status='PENDENTE').count(), 1)
+        self.assertTrue((self.root / 'manifest.json').is_file())
+
+    @override_settings(TAREFAS_EAGER=False, DUMPS_AGENDAR=False, DUMPS_LINHAS_POR_ARQUIVO=2)
+    def test_geracao_longa_renova_reserva(self):
+        tarefa = enqueue('gerar_dumps')
+        [tarefa] = claim('worker-a')
+        reservas_tomadas = []
+
+        def conjunto_demorado(*args, **kwargs):
+            reservas_tomadas.extend(claim('worker-b'))
+            resultado = write_dump(*args, **kwargs)
+            # Cada conjunto "demora" mais que a reserva: ela vence durante a escrita.
+            Tarefa.objects.filter(id=tarefa.id).update(reservada_ate=timezone.now() - timedelta(seconds=1))
+            return resultado
+
+        with mock.patch('core.dumps.write_dump', side_effect=conjunto_demorado):
+            self.assertTrue(run(tarefa))
+
+        self.assertEqual(reservas_tomadas, [])
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.worker, tarefa.progresso, tarefa.total), ('CONCLUIDA', 'worker-a', 4, 4))
+
+
+class ApiJsonCompressionTests(APITestCase):
+    def test_renderer_orjson_igual_ao_do_drf(self):
+        data = {
+            'valor': Decimal('10.50'),
+            'criado_em': datetime(2025, 3, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            'dia': date(2025, 3, 1),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'texto': 'Licitacao \u2028 pregao \u00e7',
+            'itens': [1, 2.5, None, True, (3, 4)],
+            2025: 'chave inteira',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indentado = FastJSONRenderer().render(data, 'application/json; indent=2')
+        self.assertEqual(indentado, JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_renderer_orjson_floats_diferem_do_drf(self):
+        self.assertEqual(FastJSONRenderer().render({'x': 1e16}), b'{"x":1e16}')
+        self.assertEqual(FastJSONRenderer().render({'x': float('nan')}), b'{"x":null}')
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'x': float('nan')})
+
+    @override_settings(API_COMPRESSAO_MIN_BYTES=200)
+    def test_respostas_da_api_comprimidas_conforme_accept_encoding(self):
+        unidade = UnidadeGestora.objects.create(codigo='UG-ZIP', nome='Unidade', sigla='ZIP')
+        for n in range(20):
+            Despesa.objects.create(
+                codigo=f'D-{n}', descricao='Material de consumo', categoria='CUSTEIO', dotacao=Decimal('1000.00'),
+                empenhado=0, liquidado=0, pago=0, exercicio=2025, unidade=unidade,
+            )
+        self.client.force_login(get_user_model().objects.create_user('leitor', password='SenhaSegura123!'))
+        original = self.client.get('/api/despesas/')
+        self.assertFalse(original.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', original['Vary'])
+
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), original.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='gzip;q=0.5, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0.1')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='br;q=0, *')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get('/api/despesas/', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        pequena = self.client.get(f'/api/unidades/{unidade.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(pequena.has_header('Content-Encoding'))
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        EsicPedido.objects.create(
+            protocolo='ESIC-20250101-900', tipo='PEDIDO_ACESSO', email='ana@example.com',
+            descricao='Texto longo do pedido.', resposta='Texto longo da resposta.', status='RESPONDIDO',
+            prazo=timezone.now() + timedelta(days=20),
+            unidade=UnidadeGestora.objects.create(codigo='UG-SPF', nome='Saude', sigla='SESAU'),
+        )
+        self.client.force_login(get_user_model().objects.create_user('leitor', password='SenhaSegura123!'))
+
+    def test_fields_e_omit_reduzem_resposta_e_select(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            data = self.client.get('/api/esic/?fields=protocolo,status').json()
+        self.assertEqual(data, [{'protocolo': 'ESIC-20250101-900', 'status': 'RESPONDIDO'}])
+        select = next(q['sql'] for q in queries if 'FROM "core_esicpedido"' in q['sql'])
+        self.assertNotIn('"descricao"', select)
+        self.assertNotIn('"resposta"', select)
+
+        [pedido] = self.client.get('/api/esic/?omit=descricao,resposta').json()
+        self.assertNotIn('descricao', pedido)
+        self.assertIn('email', pedido)
+        detalhe = self.client.get(f'/api/esic/{pedido["id"]}/?fields=id,unidade').json()
+        self.assertEqual(set(detalhe), {'id', 'unidade'})
+
+        response = self.client.get('/api/esic/?fields=protocolo,senha')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'fields': 'Campos desconhecidos: senha.'})
+
+    def test_campo_calculado_usa_colunas_declaradas(self):
+        tarefa = enqueue('teste_somar', valores=[1])
+        Tarefa.objects.filter(id=tarefa.id).update(progresso=1, total=4)
+        self.client.force_login(
+            get_user_model().objects.create_superuser('admin', 'admin@example.com', 'senha-forte-123')
+        )
+        with self.assertNumQueries(3):
+            data = self.client.get('/api/tarefas/?fields=nome,percentual').json()
+        self.assertEqual(data, [{'nome': 'teste_somar', 'percentual': 25}])
+
+    def test_escrita_ignora_fields(self):
+        unidade = UnidadeGestora.objects.get(codigo='UG-SPF')
+        response = self.client.patch(
+            f'/api/unidades/{unidade.id}/?fields=sigla', {'nome': 'Saude Publica'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['nome'], 'Saude Publica')
@@ -1,6 +1,239 @@
-from rest_framework.throttling import AnonRateThrottle
+import logging
+import math
+import random
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from urllib.parse import urlsplit
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
 
-class RegisterAnonThrottle(AnonRateThrottle):
-    scope = "register"
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
 
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """``'10/minute'`` -> ``(capacidade, fichas por segundo)``."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / DURATIONS[period[0]]
+
+
+class MemoryBucketStore:
+    """Baldes em memoria do processo (desenvolvimento/testes)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated_at) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+        return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Baldes em um arquivo SQLite compartilhado entre os workers do host.
+
+    Cada verificacao e uma leitura + upsert pela chave primaria dentro de uma
+    transacao ``BEGIN IMMEDIATE`` (atomica entre processos).
+    """
+
+    PURGE_PROBABILITY = 0.001
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS throttle_bucket ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated_at REAL NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS throttle_bucket_expires_at ON throttle_bucket (expires_at)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated_at FROM throttle_bucket WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = capacity if row is None else row[0] + max(0.0, now - row[1]) * refill_rate
+            tokens = min(capacity, tokens)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Depois de expires_at o balde estaria cheio: a linha pode ser apagada.
+            expires_at = now + (capacity - tokens) / refill_rate
+            connection.execute(
+                'INSERT INTO throttle_bucket (key, tokens, updated_at, expires_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, '
+                'updated_at = excluded.updated_at, expires_at = excluded.expires_at',
+                (key, tokens, now, expires_at),
+            )
+            if random.random() < self.PURGE_PROBABILITY:
+                connection.execute('DELETE FROM throttle_bucket WHERE expires_at < ?', (now,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, tokens
+
+    def clear(self):
+        self._connection().execute('DELETE FROM throttle_bucket')
+
+
+class RedisBucketStore:
+    """Baldes no Redis; o script Lua torna leitura + escrita atomicas."""
+
+    SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1])
+local updated_at = tonumber(bucket[2])
+if tokens == nil then
+  tokens = capacity
+  updated_at = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill_rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+    def __init__(self, url):
+        if redis is None:
+            raise ImproperlyConfigured('THROTTLE_STORE_URL usa Redis, mas o pacote redis nao esta instalado.')
+        self.client = redis.Redis.from_url(url)
+        self._script = self.client.register_script(self.SCRIPT)
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        allowed, tokens = self._script(keys=[key], args=[capacity, refill_rate])
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        for key in self.client.scan_iter('throttle:*'):
+            self.client.delete(key)
+
+
+def create_bucket_store(url):
+    parts = urlsplit(url)
+    if parts.scheme in {'redis', 'rediss', 'unix'}:
+        return RedisBucketStore(url)
+    if parts.scheme == 'sqlite':
+        # Como no dj-database-url: sqlite:///relativo.sqlite3 e sqlite:////absoluto.
+        return SQLiteBucketStore(parts.path[1:])
+    if parts.scheme == 'locmem':
+        return MemoryBucketStore()
+    raise ImproperlyConfigured(f'THROTTLE_STORE_URL invalida: {url}')
+
+
+@lru_cache(maxsize=1)
+def get_bucket_store():
+    return create_bucket_store(settings.THROTTLE_STORE_URL)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Token bucket por escopo, em um armazenamento compartilhado entre workers.
+
+    A taxa vem de ``DEFAULT_THROTTLE_RATES[scope]`` (``'N/periodo'``): ate N
+    requisicoes em rajada, reabastecidas continuamente ao longo do periodo.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f'Taxa de throttle ausente para o escopo {self.scope!r}.')
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        return f'throttle:{self.scope}:{ident}'
+
+    def allow_request(self, request, view):
+        rate = self.get_rate()
+        if not settings.THROTTLE_ENABLED or rate is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+        try:
+            allowed, tokens = get_bucket_store().consume(
+                self.get_cache_key(request, view), capacity, refill_rate
+            )
+        except Exception:
+            # Falha do armazenamento nao deve derrubar a API.
+            logger.warning('Throttle %s indisponivel; liberando requisicao.', self.scope, exc_info=True)
+            return True
+
+        if not allowed:
+            self.wait_seconds = math.ceil((1 - tokens) / refill_rate)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RegisterAnonThrottle(TokenBucketThrottle):
+    scope = 'register'
+
+
+class EsicSubmitThrottle(TokenBucketThrottle):
+    scope = 'esic_submit'
+
+
+class PublicReadThrottle(TokenBucketThrottle):
+    scope = 'public_read'
+
+
+class EsicStatusThrottle(TokenBucketThrottle):
+    # Consulta por protocolo: limite por IP contra enumeracao.
+    scope = 'esic_status'
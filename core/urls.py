@@ -8,12 +8,19 @@ router.register(r'despesas', views.DespesaViewSet)
 router.register(r'licitacoes', views.LicitacaoViewSet)
 router.register(r'servidores', views.ServidorViewSet)
 router.register(r'esic', views.EsicPedidoViewSet)
+router.register(r'tarefas', views.TarefaViewSet)
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('health/', views.health, name='health'),
     path('api/public/portal-info/', views.public_portal_info, name='public_portal_info'),
+    path('api/cache/stats/', views.cache_stats, name='cache_stats'),
     path('api/esic/submit/', views.submit_esic_request, name='submit_esic_request'),
+    path('api/esic/painel/', views.esic_painel, name='esic_painel'),
+    path('api/esic/status/<str:protocolo>/', views.esic_status, name='esic_status'),
+    path('api/analise/despesas/', views.analise_despesas, name='analise_despesas'),
+    path('api/dados-abertos/', views.dados_abertos, name='dados_abertos'),
+    path('dados-abertos/<path:caminho>', views.dados_abertos_arquivo, name='dados_abertos_arquivo'),
     path('api/', include(router.urls)),
     path('api/register/', views.register_user, name='register_user'),
 ]
@@ -0,0 +1,45 @@
+"""Limites de recursos do container (cgroup v1/v2).
+
+Sem dependencias do Django: usado pela configuracao do Gunicorn, antes de as
+settings serem carregadas, e pelos comandos de gerenciamento.
+"""
+
+import math
+import os
+
+
+def _read(path):
+    try:
+        with open(path, encoding='ascii') as handle:
+            return handle.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit():
+    # cgroup v2: "quota periodo" ou "max periodo".
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return max(1, math.ceil(int(quota) / int(period)))
+    # cgroup v1.
+    quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+    period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return max(1, math.ceil(int(quota) / int(period)))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - fora do Linux
+        return os.cpu_count() or 1
+
+
+def memory_limit_mb():
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value != 'max':
+            limit = int(value)
+            # cgroup v1 sem limite reporta um numero gigantesco.
+            if limit < 1 << 60:
+                return limit // (1024 * 1024)
+    return None
@@ -1,5 +1,6 @@
 ﻿import uuid
 from datetime import timedelta
+from urllib.parse import quote
 
 from django.contrib.auth.models import User
 from django.conf import settings
@@ -7,19 +8,28 @@ from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 from django.shortcuts import render
 from django.utils import timezone
+from django.views.decorators.http import require_safe
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError as ApiValidationError
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import UnidadeGestora, Despesa, Licitacao, Servidor, EsicPedido, PortalInformacao
-from .throttles import RegisterAnonThrottle
+from .analytics import despesa_statistics
+from .cache import get_tiered_cache
+from .downloads import ranged_file_response
+from .esic import PROTOCOLO_RE, backlog_summary, protocol_status
+from .models import UnidadeGestora, Despesa, Licitacao, Servidor, EsicPedido, ParticaoDadosAbertos, Tarefa
+from .publishing import cached_portal_info_payload
+from .throttles import EsicStatusThrottle, EsicSubmitThrottle, PublicReadThrottle, RegisterAnonThrottle
 from .serializers import (
     UnidadeGestoraSerializer,
     DespesaSerializer,
     LicitacaoSerializer,
     ServidorSerializer,
     EsicPedidoSerializer,
+    TarefaSerializer,
+    sparse_columns,
 )
 
 
@@ -102,6 +112,7 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([EsicSubmitThrottle])
 def submit_esic_request(request):
     tipo_input = (request.data.get('tipo') or '').strip()
     descricao = (request.data.get('descricao') or '').strip()
@@ -172,13 +183,7 @@ def submit_esic_request(request):
 
 
 def home(request):
-    infos = PortalInformacao.objects.filter(ativo=True)
-    infos_por_secao = {
-        'FINANCEIROS': infos.filter(secao='FINANCEIROS'),
-        'PRESTACAO': infos.filter(secao='PRESTACAO'),
-        'CONTRATACOES': infos.filter(secao='CONTRATACOES'),
-        'POLITICAS': infos.filter(secao='POLITICAS'),
-    }
+    infos_por_secao = cached_portal_info_payload()['items']
     return render(request, 'portal_transparencia.html', {'infos_por_secao': infos_por_secao})
 
 
@@ -190,58 +195,161 @@ def health(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([PublicReadThrottle])
 def public_portal_info(request):
-    infos = PortalInformacao.objects.filter(ativo=True).order_by('secao', 'ordem', 'titulo')
+    return Response(cached_portal_info_payload(), status=status.HTTP_200_OK)
 
-    payload = {
-        'FINANCEIROS': [],
-        'PRESTACAO': [],
-        'CONTRATACOES': [],
-        'POLITICAS': [],
-    }
 
-    for info in infos:
-        payload[info.secao].append(
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@throttle_classes([PublicReadThrottle])
+def dados_abertos(request):
+    particoes = ParticaoDadosAbertos.objects.filter(gerada_em__isnull=False)
+    return Response(
+        [
             {
-                'id': info.id,
-                'secao': info.secao,
-                'titulo': info.titulo,
-                'descricao': info.descricao,
-                'ordem': info.ordem,
-                'possui_arquivo': info.possui_arquivo,
-                'url_documento': info.url_documento,
-                'atualizado_em': info.atualizado_em.isoformat(),
+                'conjunto': particao.conjunto,
+                'particao': particao.particao,
+                'url': request.build_absolute_uri(settings.DADOS_ABERTOS_URL + quote(particao.arquivo, safe='/=')),
+                'linhas': particao.linhas,
+                'tamanho': particao.tamanho,
+                'sha256': particao.sha256,
+                'gerada_em': particao.gerada_em,
             }
-        )
+            for particao in particoes
+        ],
+        status=status.HTTP_200_OK,
+    )
+
+
+@require_safe
+def dados_abertos_arquivo(request, caminho):
+    # O nome do arquivo nao muda entre geracoes: cache curto, revalidado por ETag.
+    return ranged_file_response(request, settings.DADOS_ABERTOS_ROOT, caminho, 'public, max-age=3600')
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@throttle_classes([EsicStatusThrottle])
+def esic_status(request, protocolo):
+    if not PROTOCOLO_RE.match(protocolo):
+        return Response({'error': 'Protocolo invalido.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        payload = protocol_status(protocolo)
+    except EsicPedido.DoesNotExist:
+        return Response({'error': 'Protocolo nao encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(payload, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def esic_painel(request):
+    try:
+        dias = max(1, min(90, int(request.query_params.get('dias', 7))))
+    except ValueError:
+        return Response({'error': 'Parametro dias invalido.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(backlog_summary(dias=dias), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analise_despesas(request):
+    try:
+        exercicio = int(request.query_params['exercicio'])
+    except (KeyError, ValueError):
+        return Response({'error': 'Informe o exercicio (ano).'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(despesa_statistics(exercicio), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    # Contadores do processo que atendeu a requisicao.
+    return Response(get_tiered_cache().stats(), status=status.HTTP_200_OK)
+
+
+def _split_fields(valor):
+    nomes = {nome.strip() for nome in (valor or '').split(',')} - {''}
+    return nomes or None
+
+
+class SparseFieldsetViewMixin:
+    """``?fields=a,b`` e ``?omit=c`` nas leituras: reduzem os campos da resposta
+    e as colunas lidas do banco (``only()``)."""
 
-    return Response({'items': payload}, status=status.HTTP_200_OK)
+    sparse_fields = None
 
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self.sparse_fields = self._parse_sparse_fields(request.query_params)
 
-class UnidadeGestoraViewSet(viewsets.ModelViewSet):
+    def _parse_sparse_fields(self, params):
+        fields, omit = _split_fields(params.get('fields')), _split_fields(params.get('omit'))
+        if fields is None and omit is None:
+            return None
+        desconhecidos = ((fields or set()) | (omit or set())) - set(self.get_serializer_class()().fields)
+        if desconhecidos:
+            raise ApiValidationError({'fields': f'Campos desconhecidos: {", ".join(sorted(desconhecidos))}.'})
+        return {'fields': fields, 'omit': omit}
+
+    def _sparse(self):
+        return self.sparse_fields is not None and self.request.method in SAFE_METHODS
+
+    def get_serializer(self, *args, **kwargs):
+        if self._sparse():
+            kwargs.update(self.sparse_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self._sparse():
+            colunas = sparse_columns(self.get_serializer())
+            if colunas is not None:
+                queryset = queryset.only(*colunas)
+        return queryset
+
+
+class UnidadeGestoraViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = UnidadeGestora.objects.all()
     serializer_class = UnidadeGestoraSerializer
     permission_classes = [IsAuthenticated]
 
 
-class DespesaViewSet(viewsets.ModelViewSet):
+class DespesaViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Despesa.objects.all()
     serializer_class = DespesaSerializer
     permission_classes = [IsAuthenticated]
 
 
-class LicitacaoViewSet(viewsets.ModelViewSet):
+class LicitacaoViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Licitacao.objects.all()
     serializer_class = LicitacaoSerializer
     permission_classes = [IsAuthenticated]
 
 
-class ServidorViewSet(viewsets.ModelViewSet):
+class ServidorViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Servidor.objects.all()
     serializer_class = ServidorSerializer
     permission_classes = [IsAuthenticated]
 
 
-class EsicPedidoViewSet(viewsets.ModelViewSet):
+class EsicPedidoViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = EsicPedido.objects.all()
     serializer_class = EsicPedidoSerializer
     permission_classes = [IsAuthenticated]
+
+
+class TarefaViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    # Status e progresso das tarefas em segundo plano.
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for field in ('nome', 'status'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
@@ -9,7 +9,20 @@ if [ "${RUN_COLLECTSTATIC:-1}" = "1" ]; then
   python manage.py collectstatic --noinput
 fi
 
-exec gunicorn portal_transparencia.wsgi:application \
-  --bind 0.0.0.0:${PORT:-8000} \
-  --workers ${GUNICORN_WORKERS:-3} \
-  --timeout ${GUNICORN_TIMEOUT:-120}
+if [ "${RUN_PUBLISH_PORTAL:-1}" = "1" ]; then
+  python manage.py publicar_portal
+fi
+
+# Container unico: o worker da fila de tarefas roda ao lado do Gunicorn.
+# Com um processo "worker" separado (Procfile), use RUN_TASK_WORKER=0.
+if [ "${RUN_TASK_WORKER:-1}" = "1" ]; then
+  python manage.py processar_tarefas &
+fi
+
+# Perfil (sync, gthread, uvicorn), workers e threads: ver
+# portal_transparencia/gunicorn_conf.py. "check" falha cedo se o perfil ou as
+# settings forem invalidos, antes de subir os workers.
+python -c "import portal_transparencia.gunicorn_conf"
+python manage.py check --deploy --fail-level ERROR
+
+exec gunicorn -c python:portal_transparencia.gunicorn_conf
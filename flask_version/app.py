@@ -1,26 +1,38 @@
 ﻿from __future__ import annotations
 
+import hashlib
+import json
 import os
+import sqlite3
+import threading
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 
-from flask import Flask, jsonify, render_template, request
+import click
+from flask import Flask, jsonify, make_response, render_template, request, url_for
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from werkzeug.utils import secure_filename
 
+from serverless import PORTAL_CHANGED_MARKER, PORTAL_INFO_CACHE_CONTROL, RUNTIME_DIR
+
 BASE_DIR = Path(__file__).resolve().parent.parent
-IS_VERCEL = os.getenv("VERCEL") == "1"
-RUNTIME_DIR = Path("/tmp") if IS_VERCEL else BASE_DIR
 
+STATIC_DIR = BASE_DIR / "static"
 MEDIA_DIR = RUNTIME_DIR / "media"
 UPLOAD_DIR = MEDIA_DIR / "esic_anexos"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+SNAPSHOT_DIR = Path(os.getenv("PORTAL_SNAPSHOT_DIR") or Path(__file__).resolve().parent / "snapshot")
+SNAPSHOT_HOME = "index.html"
+SNAPSHOT_PORTAL_INFO = "portal_info.json"
 
 app = Flask(
     __name__,
     template_folder="templates",
-    static_folder=str(BASE_DIR / "static"),
+    static_folder=str(STATIC_DIR),
     static_url_path="/static",
 )
 
@@ -31,6 +43,35 @@ app.config["MAX_CONTENT_LENGTH"] = 3 * 1024 * 1024
 
 db = SQLAlchemy(app)
 
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@lru_cache(maxsize=32)
+def _static_digest(filename: str) -> str:
+    return hashlib.sha256((STATIC_DIR / filename).read_bytes()).hexdigest()[:12]
+
+
+@app.template_global()
+def static_url(filename: str) -> str:
+    return url_for("static", filename=filename, v=_static_digest(filename))
+
+
+@app.template_global()
+@lru_cache(maxsize=16)
+def inline_static(filename: str) -> Markup:
+    return Markup((STATIC_DIR / filename).read_text(encoding="utf-8"))
+
+
+@app.after_request
+def cache_versioned_static(response):
+    # URLs geradas por static_url() mudam junto com o conteudo do arquivo.
+    if request.endpoint == "static" and "v" in request.args and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
 
 class UnidadeGestora(db.Model):
     __tablename__ = "unidade_gestora"
@@ -81,6 +122,215 @@ class PortalInformacao(db.Model):
         return self.link
 
 
+SECOES = ("FINANCEIROS", "PRESTACAO", "CONTRATACOES", "POLITICAS")
+
+# Cache em processo do conteudo do portal. E invalidado por qualquer escrita em
+# PortalInformacao feita por este processo (eventos do mapper abaixo): no flush
+# e de novo no fim da transacao, ja que uma leitura concorrente entre o flush e
+# o commit guardaria o conteudo anterior. Commits que alteram o portal tambem
+# marcam PORTAL_CHANGED_MARKER, para a entrada serverless deixar o snapshot.
+_portal_cache: dict[str, object] = {}
+_portal_cache_lock = threading.RLock()
+
+
+def invalidate_portal_cache(*_args) -> None:
+    with _portal_cache_lock:
+        _portal_cache.clear()
+
+
+def _portal_changed(_mapper, _connection, target) -> None:
+    invalidate_portal_cache()
+    session = object_session(target)
+    if session is not None:
+        session.info["portal_changed"] = True
+
+
+def _portal_transaction_ended(session) -> None:
+    session.info.pop("portal_seed", None)
+    if session.info.pop("portal_changed", False):
+        invalidate_portal_cache()
+
+
+def _portal_committed(session) -> None:
+    seeded = session.info.pop("portal_seed", False)
+    if session.info.pop("portal_changed", False):
+        invalidate_portal_cache()
+        if not seeded:
+            PORTAL_CHANGED_MARKER.parent.mkdir(parents=True, exist_ok=True)
+            PORTAL_CHANGED_MARKER.touch()
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(PortalInformacao, _event_name, _portal_changed)
+event.listen(Session, "after_commit", _portal_committed)
+event.listen(Session, "after_rollback", _portal_transaction_ended)
+
+
+def cached_portal(key: str, builder):
+    value = _portal_cache.get(key)
+    if value is not None:
+        return value
+    with _portal_cache_lock:
+        value = _portal_cache.get(key)
+        if value is None:
+            value = builder()
+            _portal_cache[key] = value
+        return value
+
+
+def snapshot_portal_info(info: PortalInformacao) -> dict:
+    return {
+        "id": info.id,
+        "secao": info.secao,
+        "titulo": info.titulo,
+        "descricao": info.descricao,
+        "ordem": info.ordem,
+        "possui_arquivo": info.possui_arquivo,
+        "url_documento": info.url_documento,
+        "atualizado_em": info.atualizado_em.isoformat(),
+    }
+
+
+def load_portal_sections() -> dict[str, list[dict]]:
+    infos = PortalInformacao.query.filter_by(ativo=True).order_by(
+        PortalInformacao.secao, PortalInformacao.ordem, PortalInformacao.titulo
+    )
+    secoes: dict[str, list[dict]] = {secao: [] for secao in SECOES}
+    for info in infos:
+        secoes.setdefault(info.secao, []).append(snapshot_portal_info(info))
+    return secoes
+
+
+def portal_sections() -> dict[str, list[dict]]:
+    return cached_portal("sections", load_portal_sections)
+
+
+def portal_info_json(sections: dict[str, list[dict]]) -> bytes:
+    # Mesmo formato (e serializacao compacta) de core.views.public_portal_info.
+    return json.dumps({"items": sections}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _render_portal_info() -> tuple[bytes, str]:
+    body = portal_info_json(portal_sections())
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def _render_home() -> tuple[str, str]:
+    html = render_template("portal_transparencia.html", infos_por_secao=portal_sections())
+    return html, hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]
+
+
+def read_snapshot_sections() -> dict[str, list[dict]] | None:
+    try:
+        payload = json.loads((SNAPSHOT_DIR / SNAPSHOT_PORTAL_INFO).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return payload.get("items") or {}
+
+
+def seed_portal_from_snapshot() -> int:
+    sections = read_snapshot_sections()
+    if not sections or PortalInformacao.query.first() is not None:
+        return 0
+
+    total = 0
+    for secao, infos in sections.items():
+        for info in infos:
+            url = info.get("url_documento")
+            atualizado_em = datetime.fromisoformat(info["atualizado_em"])
+            if atualizado_em.tzinfo is not None:
+                atualizado_em = atualizado_em.astimezone(timezone.utc).replace(tzinfo=None)
+            db.session.add(
+                PortalInformacao(
+                    id=str(info["id"]),
+                    secao=secao,
+                    titulo=info["titulo"],
+                    descricao=info["descricao"],
+                    ordem=info.get("ordem") or 0,
+                    arquivo=url if info.get("possui_arquivo") else None,
+                    link=None if info.get("possui_arquivo") else url,
+                    criado_em=atualizado_em,
+                    atualizado_em=atualizado_em,
+                )
+            )
+            total += 1
+    # O conteudo semeado e o proprio snapshot; nao o torna desatualizado.
+    db.session.info["portal_seed"] = True
+    db.session.commit()
+    return total
+
+
+def _schema_ready() -> bool:
+    # Verificacao barata (sqlite3 da stdlib, sem reflexao do SQLAlchemy).
+    if not DB_PATH.exists():
+        return False
+    try:
+        with sqlite3.connect(DB_PATH) as connection:
+            rows = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    except sqlite3.Error:
+        return False
+    return set(db.metadata.tables) <= {name for (name,) in rows}
+
+
+_db_ready = False
+_db_lock = threading.Lock()
+
+
+def ensure_database() -> None:
+    """Cria o schema e semeia o conteudo do portal no primeiro uso do banco."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if _db_ready:
+            return
+        if not _schema_ready():
+            RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
+            db.create_all()
+            seed_portal_from_snapshot()
+        _db_ready = True
+
+
+@app.before_request
+def _bootstrap_database():
+    if request.endpoint not in {"static", "health"}:
+        ensure_database()
+
+
+def build_snapshot(sections: dict[str, list[dict]]) -> list[Path]:
+    """Grava o snapshot somente leitura usado pela entrada serverless."""
+    payload = portal_info_json(sections)
+    with app.test_request_context("/"):
+        html = render_template("portal_transparencia.html", infos_por_secao=sections)
+
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, content in ((SNAPSHOT_PORTAL_INFO, payload), (SNAPSHOT_HOME, html.encode("utf-8"))):
+        path = SNAPSHOT_DIR / name
+        path.write_bytes(content)
+        written.append(path)
+    return written
+
+
+@app.cli.command("build-snapshot")
+@click.option(
+    "--from-json",
+    "from_json",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Payload de /api/public/portal-info/ exportado pelo Django.",
+)
+def build_snapshot_command(from_json: Path | None) -> None:
+    """Gera flask_version/snapshot/ a partir do banco (ou de um JSON)."""
+    if from_json:
+        sections = {secao: [] for secao in SECOES}
+        sections.update(json.loads(from_json.read_text(encoding="utf-8"))["items"])
+    else:
+        ensure_database()
+        sections = load_portal_sections()
+    for path in build_snapshot(sections):
+        click.echo(f"Snapshot gravado: {path}")
+
+
 TIPO_ESIC_MAP = {
     "Acesso à Informação": "PEDIDO_ACESSO",
     "Acesso a Informacao": "PEDIDO_ACESSO",
@@ -130,16 +380,21 @@ def is_valid_email(value: str) -> bool:
 
 @app.get("/")
 def home():
-    infos = PortalInformacao.query.filter_by(ativo=True).order_by(
-        PortalInformacao.secao, PortalInformacao.ordem, PortalInformacao.titulo
-    )
-    infos_por_secao = {
-        "FINANCEIROS": [i for i in infos if i.secao == "FINANCEIROS"],
-        "PRESTACAO": [i for i in infos if i.secao == "PRESTACAO"],
-        "CONTRATACOES": [i for i in infos if i.secao == "CONTRATACOES"],
-        "POLITICAS": [i for i in infos if i.secao == "POLITICAS"],
-    }
-    return render_template("portal_transparencia.html", infos_por_secao=infos_por_secao)
+    html, etag = cached_portal("home", _render_home)
+    response = make_response(html)
+    response.set_etag(etag)
+    # O navegador/CDN sempre revalida; visitas repetidas recebem 304 sem corpo.
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.get("/api/public/portal-info/")
+def public_portal_info():
+    body, etag = cached_portal("portal-info", _render_portal_info)
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = PORTAL_INFO_CACHE_CONTROL
+    return response.make_conditional(request)
 
 
 @app.post("/api/esic/submit/")
@@ -165,6 +420,7 @@ def submit_esic_request():
             return jsonify({"error": "Apenas arquivos PDF sao permitidos."}), 400
 
         saved_name = f"pedido_{uuid.uuid4().hex[:8]}.pdf"
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
         destination = UPLOAD_DIR / saved_name
         anexo.save(destination)
         saved_file = f"/media/esic_anexos/{saved_name}"
@@ -207,9 +463,5 @@ def health():
     return jsonify({"status": "ok"})
 
 
-with app.app_context():
-    db.create_all()
-
-
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
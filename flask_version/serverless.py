@@ -0,0 +1,103 @@
+"""Entrada WSGI para deploy serverless (Vercel).
+
+Leituras publicas (``GET /`` e ``GET /api/public/portal-info/``) sao servidas
+a partir do snapshot somente leitura em ``snapshot/`` (gerado com
+``flask --app app build-snapshot``), sem importar Flask/SQLAlchemy nem tocar no
+banco. As demais rotas carregam o app completo (``app.py``) na primeira vez que
+forem usadas.
+
+O snapshot e fixado no build: alteracoes no conteudo do portal so chegam a
+essas rotas depois de regenerar o snapshot e refazer o deploy. Quando a
+instancia grava o portal no proprio banco (``RUNTIME_DIR``), o app marca
+``PORTAL_CHANGED_MARKER`` e, a partir dai, essas rotas passam a ser servidas
+pelo app (com o cache e o ETag dele). Na Vercel o ``/tmp`` e de cada instancia,
+entao a alteracao nao e vista pelas demais.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+SNAPSHOT_DIR = Path(os.getenv("PORTAL_SNAPSHOT_DIR") or Path(__file__).resolve().parent / "snapshot")
+RUNTIME_DIR = Path(
+    os.getenv("FLASK_RUNTIME_DIR") or ("/tmp" if os.getenv("VERCEL") == "1" else Path(__file__).resolve().parent.parent)
+)
+PORTAL_CHANGED_MARKER = RUNTIME_DIR / "portal_changed"
+
+# O JSON publico pode ser servido pela borda (CDN) por alguns minutos e
+# revalidado em segundo plano; a home sempre revalida via ETag.
+PORTAL_INFO_CACHE_CONTROL = os.getenv(
+    "PORTAL_INFO_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=86400",
+)
+
+SNAPSHOT_ROUTES = {
+    "/": ("index.html", "text/html; charset=utf-8", "no-cache"),
+    "/api/public/portal-info/": ("portal_info.json", "application/json", PORTAL_INFO_CACHE_CONTROL),
+}
+
+_app = None
+_app_lock = threading.Lock()
+
+
+def load_app():
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                from app import app as flask_app
+
+                _app = flask_app
+    return _app
+
+
+@lru_cache(maxsize=8)
+def load_snapshot(filename: str) -> tuple[bytes, str] | None:
+    try:
+        body = (SNAPSHOT_DIR / filename).read_bytes()
+    except OSError:
+        return None
+    return body, '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def snapshot_is_stale(filename: str) -> bool:
+    try:
+        changed = PORTAL_CHANGED_MARKER.stat().st_mtime_ns
+    except OSError:
+        return False
+    try:
+        return changed > (SNAPSHOT_DIR / filename).stat().st_mtime_ns
+    except OSError:
+        return True
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in header.split(","))
+
+
+def serve_snapshot(environ, start_response, body: bytes, etag: str, content_type: str, cache_control: str):
+    headers = [("ETag", etag), ("Cache-Control", cache_control)]
+    if _etag_matches(environ.get("HTTP_IF_NONE_MATCH", ""), etag):
+        start_response("304 NOT MODIFIED", headers)
+        return [b""]
+
+    headers += [("Content-Type", content_type), ("Content-Length", str(len(body)))]
+    start_response("200 OK", headers)
+    return [b"" if environ["REQUEST_METHOD"] == "HEAD" else body]
+
+
+def application(environ, start_response):
+    route = SNAPSHOT_ROUTES.get(environ.get("PATH_INFO") or "/")
+    if route and environ["REQUEST_METHOD"] in ("GET", "HEAD"):
+        filename, content_type, cache_control = route
+        snapshot = None if snapshot_is_stale(filename) else load_snapshot(filename)
+        if snapshot is not None:
+            return serve_snapshot(environ, start_response, *snapshot, content_type, cache_control)
+    return load_app()(environ, start_response)
+
+
+app = application
@@ -0,0 +1,169 @@
+"""Testes da versao Flask.
+
+Uso:
+    cd flask_version
+    python -m unittest tests
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+FLASK_DIR = Path(__file__).resolve().parent
+_runtime = tempfile.TemporaryDirectory()
+os.environ["FLASK_RUNTIME_DIR"] = str(Path(_runtime.name) / "runtime")
+os.environ["PORTAL_SNAPSHOT_DIR"] = str(Path(_runtime.name) / "snapshot")
+sys.path.insert(0, str(FLASK_DIR))
+
+import app as portal  # noqa: E402
+import serverless  # noqa: E402
+from werkzeug.test import Client  # noqa: E402
+
+
+def tearDownModule():
+    _runtime.cleanup()
+
+
+def load_vercel_entry():
+    spec = importlib.util.spec_from_file_location("vercel_index", FLASK_DIR.parent / "api" / "index.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FlaskPortalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.context = portal.app.app_context()
+        self.context.push()
+        portal.ensure_database()
+        portal.PortalInformacao.query.delete()
+        portal.db.session.commit()
+        portal.invalidate_portal_cache()
+        self.client = portal.app.test_client()
+
+    def tearDown(self):
+        portal.db.session.rollback()
+        self.context.pop()
+
+    def add_info(self, titulo: str, secao: str = "POLITICAS") -> portal.PortalInformacao:
+        info = portal.PortalInformacao(secao=secao, titulo=titulo, descricao="Lei.")
+        portal.db.session.add(info)
+        portal.db.session.commit()
+        return info
+
+
+class ConditionalGetTests(FlaskPortalTestCase):
+    def test_home_responde_304_com_etag_igual(self):
+        response = self.client.get("/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response.headers["Cache-Control"])
+
+        cached = self.client.get("/", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+
+    def test_portal_info_responde_304_com_etag_igual(self):
+        response = self.client.get("/api/public/portal-info/")
+        self.assertEqual(response.headers["Cache-Control"], serverless.PORTAL_INFO_CACHE_CONTROL)
+
+        cached = self.client.get("/api/public/portal-info/", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+
+class PortalCacheTests(FlaskPortalTestCase):
+    def test_commit_invalida_home_e_portal_info(self):
+        home = self.client.get("/")
+        info = self.client.get("/api/public/portal-info/")
+
+        registro = self.add_info("Relatorio de Gestao 2025")
+        atualizada = self.client.get("/", headers={"If-None-Match": home.headers["ETag"]})
+        self.assertEqual(atualizada.status_code, 200)
+        self.assertIn("Relatorio de Gestao 2025", atualizada.get_data(as_text=True))
+        self.assertNotEqual(
+            self.client.get("/api/public/portal-info/").headers["ETag"], info.headers["ETag"]
+        )
+
+        registro.titulo = "Relatorio de Gestao 2026"
+        portal.db.session.commit()
+        self.assertIn("Relatorio de Gestao 2026", self.client.get("/").get_data(as_text=True))
+
+        portal.db.session.delete(registro)
+        portal.db.session.commit()
+        self.assertNotIn("Relatorio de Gestao 2026", self.client.get("/").get_data(as_text=True))
+
+    def test_leitura_entre_flush_e_commit_nao_fica_no_cache(self):
+        portal.db.session.add(
+            portal.PortalInformacao(secao="POLITICAS", titulo="Relatorio de Gestao 2026", descricao="Lei.")
+        )
+        portal.db.session.flush()
+        portal.cached_portal("sections", lambda: {"POLITICAS": []})
+
+        portal.db.session.commit()
+        self.assertIn("Relatorio de Gestao 2026", self.client.get("/").get_data(as_text=True))
+
+
+class SnapshotTests(FlaskPortalTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_info("Relatorio de Gestao 2025")
+        self.add_info("Balanco 2025", secao="FINANCEIROS")
+        portal.build_snapshot(portal.load_portal_sections())
+        serverless.load_snapshot.cache_clear()
+        self.addCleanup(serverless.load_snapshot.cache_clear)
+
+    def test_snapshot_igual_a_renderizacao_ao_vivo(self):
+        snapshot = Client(serverless.application)
+        for path in ("/", "/api/public/portal-info/"):
+            with self.subTest(path=path):
+                live = self.client.get(path)
+                served = snapshot.get(path)
+                self.assertEqual(served.status_code, 200)
+                self.assertEqual(served.data, live.data)
+                self.assertEqual(served.headers["Cache-Control"], live.headers["Cache-Control"])
+
+        etag = snapshot.get("/").headers["ETag"]
+        self.assertEqual(snapshot.get("/", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_alteracao_apos_snapshot_e_servida_pelo_app(self):
+        snapshot = Client(serverless.application)
+        antigo = (Path(os.environ["PORTAL_SNAPSHOT_DIR"]) / "index.html").stat().st_mtime - 60
+        for name in ("index.html", "portal_info.json"):
+            os.utime(Path(os.environ["PORTAL_SNAPSHOT_DIR"]) / name, (antigo, antigo))
+
+        self.add_info("Relatorio de Gestao 2026")
+        self.assertTrue(serverless.snapshot_is_stale("index.html"))
+        for path in ("/", "/api/public/portal-info/"):
+            with self.subTest(path=path):
+                served = snapshot.get(path)
+                self.assertIn("Relatorio de Gestao 2026", served.get_data(as_text=True))
+                self.assertEqual(served.headers["ETag"], self.client.get(path).headers["ETag"])
+
+        portal.build_snapshot(portal.load_portal_sections())
+        self.assertFalse(serverless.snapshot_is_stale("index.html"))
+
+    def test_semear_do_snapshot_nao_o_torna_desatualizado(self):
+        portal.PortalInformacao.query.delete()
+        portal.db.session.commit()
+        serverless.PORTAL_CHANGED_MARKER.unlink(missing_ok=True)
+
+        self.assertEqual(portal.seed_portal_from_snapshot(), 2)
+        self.assertFalse(serverless.PORTAL_CHANGED_MARKER.exists())
+
+    def test_entrada_vercel_usa_snapshot_e_carrega_app_nas_demais_rotas(self):
+        entry = load_vercel_entry()
+        self.assertIs(entry.app, serverless.application)
+
+        client = Client(entry.app)
+        response = client.get("/")
+        self.assertEqual(response.data, (Path(os.environ["PORTAL_SNAPSHOT_DIR"]) / "index.html").read_bytes())
+        self.assertEqual(client.get("/", headers={"If-None-Match": response.headers["ETag"]}).status_code, 304)
+        self.assertEqual(client.get("/health").get_json(), {"status": "ok"})
+
+
+if __name__ == "__main__":
+    unittest.main()
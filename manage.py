@@ -6,7 +6,10 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'portal_transparencia.settings')
+    settings_module = 'portal_transparencia.settings'
+    if sys.argv[1:2] == ['test']:
+        settings_module = 'portal_transparencia.settings_test'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,62 @@
+"""Perfis de desempenho aplicados aos bancos configurados em settings.DATABASES.
+
+- ``default``: comportamento original (conexoes persistentes, SQLite em modo
+  rollback-journal).
+- ``performance``: pool de conexoes do psycopg para PostgreSQL e, para SQLite,
+  WAL + ``synchronous=NORMAL`` + mmap + busy timeout em cada conexao nova.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+PROFILES = ('default', 'performance')
+
+SQLITE_ENGINE = 'django.db.backends.sqlite3'
+POSTGRESQL_ENGINE = 'django.db.backends.postgresql'
+
+
+def sqlite_init_command(mmap_size, busy_timeout_ms):
+    return ';'.join(
+        [
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            f'PRAGMA mmap_size={int(mmap_size)}',
+            f'PRAGMA busy_timeout={int(busy_timeout_ms)}',
+        ]
+    )
+
+
+def apply_profile(
+    database,
+    profile,
+    *,
+    pool_min_size=2,
+    pool_max_size=4,
+    pool_timeout=10,
+    sqlite_mmap_size=128 * 1024 * 1024,
+    sqlite_busy_timeout_ms=5000,
+):
+    if profile not in PROFILES:
+        raise ImproperlyConfigured(
+            f'DATABASE_PROFILE invalido: {profile}. Use um de: {", ".join(PROFILES)}.'
+        )
+    if profile == 'default':
+        return database
+
+    options = database.setdefault('OPTIONS', {})
+    engine = database.get('ENGINE')
+    if engine == SQLITE_ENGINE:
+        options['init_command'] = sqlite_init_command(sqlite_mmap_size, sqlite_busy_timeout_ms)
+        # Transacoes de escrita pegam o lock no BEGIN, evitando "database is
+        # locked" ao promover uma leitura para escrita com WAL.
+        options['transaction_mode'] = 'IMMEDIATE'
+        options['timeout'] = sqlite_busy_timeout_ms / 1000
+    elif engine == POSTGRESQL_ENGINE:
+        options['pool'] = {
+            'min_size': pool_min_size,
+            'max_size': pool_max_size,
+            'timeout': pool_timeout,
+        }
+        # O pool do Django nao aceita conexoes persistentes.
+        database['CONN_MAX_AGE'] = 0
+    return database
@@ -0,0 +1,124 @@
+"""Configuracao do Gunicorn com perfis de worker.
+
+Uso: ``gunicorn -c python:portal_transparencia.gunicorn_conf``
+
+Perfis (``GUNICORN_PROFILE``):
+
+- ``sync``: workers sincronos com ``preload_app``; 2 x CPU + 1.
+- ``gthread``: workers com threads (``GUNICORN_THREADS``), tolerante a clientes
+  lentos; CPU + 1 workers. Padrao.
+- ``uvicorn``: workers ASGI (``portal_transparencia.asgi``); 1 por CPU.
+
+O numero de workers respeita os limites de CPU/memoria do container (cgroup)
+e pode ser fixado com ``GUNICORN_WORKERS``.
+"""
+
+import os
+
+from core.utils import cpu_limit, memory_limit_mb
+
+
+WSGI_APP = 'portal_transparencia.wsgi:application'
+ASGI_APP = 'portal_transparencia.asgi:application'
+
+PROFILES = {
+    'sync': {'worker_class': 'sync', 'wsgi_app': WSGI_APP},
+    'gthread': {'worker_class': 'gthread', 'wsgi_app': WSGI_APP},
+    'uvicorn': {'worker_class': 'uvicorn_worker.UvicornWorker', 'wsgi_app': ASGI_APP},
+}
+
+
+def _env_int(name, default):
+    value = os.getenv(name, '').strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {'1', 'true', 't', 'yes', 'y', 'on'}
+
+
+def validate_profile(profile):
+    if profile not in PROFILES:
+        raise ValueError(f'GUNICORN_PROFILE invalido: {profile}. Use um de: {", ".join(PROFILES)}.')
+    return profile
+
+
+def compute_workers(profile, cpus, memory_mb=None, worker_memory_mb=150, reserved_memory_mb=64):
+    validate_profile(profile)
+    if profile == 'sync':
+        workers = 2 * cpus + 1
+    elif profile == 'gthread':
+        workers = cpus + 1
+    else:
+        workers = cpus
+
+    if memory_mb:
+        workers = min(workers, (memory_mb - reserved_memory_mb) // worker_memory_mb)
+    return max(1, workers)
+
+
+def compute_threads(profile, cpus):
+    if profile != 'gthread':
+        return 1
+    # Requisicoes do portal passam a maior parte do tempo em I/O (banco,
+    # upload); algumas threads por worker absorvem clientes lentos.
+    return max(2, min(8, 2 * cpus))
+
+
+profile = validate_profile(os.getenv('GUNICORN_PROFILE', 'gthread').strip().lower())
+_cpus = cpu_limit()
+
+worker_class = PROFILES[profile]['worker_class']
+wsgi_app = PROFILES[profile]['wsgi_app']
+workers = _env_int('GUNICORN_WORKERS', 0) or compute_workers(
+    profile,
+    _cpus,
+    memory_limit_mb(),
+    worker_memory_mb=_env_int('GUNICORN_WORKER_MEMORY_MB', 150),
+)
+threads = _env_int('GUNICORN_THREADS', 0) or compute_threads(profile, _cpus)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = _env_bool('GUNICORN_PRELOAD', True)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recicla workers periodicamente (vazamentos de memoria); o jitter evita que
+# todos reiniciem ao mesmo tempo.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+
+
+def when_ready(server):
+    server.log.info(
+        'Perfil %s: %s workers (%s), %s threads, preload=%s, cpus=%s',
+        profile,
+        workers,
+        worker_class,
+        threads,
+        preload_app,
+        _cpus,
+    )
+
+
+def post_fork(server, worker):
+    # Com preload, conexoes abertas no master nao podem ser herdadas.
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
@@ -17,6 +17,8 @@ from secrets import token_urlsafe
 from pathlib import Path
 from django.core.exceptions import ImproperlyConfigured
 
+from portal_transparencia.db_profiles import apply_profile
+
 try:
     import dj_database_url
 except ImportError:  # pragma: no cover
@@ -123,6 +125,11 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
+    # orjson com a mesma saida do JSONRenderer do DRF (core/renderers.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
@@ -132,12 +139,75 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_THROTTLE_RATES': {
         'register': os.getenv('REGISTER_THROTTLE_RATE', '5/hour'),
+        'esic_submit': os.getenv('ESIC_SUBMIT_THROTTLE_RATE', '10/hour'),
+        'public_read': os.getenv('PUBLIC_READ_THROTTLE_RATE', '120/minute'),
+        'esic_status': os.getenv('ESIC_STATUS_THROTTLE_RATE', '30/minute'),
     },
 }
 
+# Compressao (br/gzip, negociada por Accept-Encoding) das respostas da API com
+# pelo menos API_COMPRESSAO_MIN_BYTES (core/middleware.py).
+API_COMPRESSAO_PREFIXO = '/api/'
+API_COMPRESSAO_MIN_BYTES = _env_int('API_COMPRESSAO_MIN_BYTES', 1024)
+API_COMPRESSAO_BROTLI_NIVEL = _env_int('API_COMPRESSAO_BROTLI_NIVEL', 4)
+API_COMPRESSAO_GZIP_NIVEL = _env_int('API_COMPRESSAO_GZIP_NIVEL', 6)
+
+# Token buckets dos throttles (core/throttles.py), compartilhados entre os
+# workers: redis://... em producao; sqlite:///caminho para um unico host.
+THROTTLE_STORE_URL = (
+    os.getenv('THROTTLE_STORE_URL') or os.getenv('REDIS_URL') or f"sqlite:///{BASE_DIR / 'throttle.sqlite3'}"
+)
+THROTTLE_ENABLED = _env_bool('THROTTLE_ENABLED', default=True)
+
+# Cache compartilhado entre os workers (Redis em producao, arquivos em um unico
+# host). core/cache.py coloca um LRU por processo na frente dele.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'portal',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', str(BASE_DIR / '.cache')),
+        },
+    }
+TIERED_CACHE = {
+    'LOCAL_MAX_ENTRIES': _env_int('CACHE_LOCAL_MAX_ENTRIES', 256),
+    'LOCAL_MAX_BYTES': _env_int('CACHE_LOCAL_MAX_BYTES', 8 * 1024 * 1024),
+    'LOCAL_TTL': _env_int('CACHE_LOCAL_TTL', 5),
+}
+# Payload publico do portal (home e /api/public/portal-info/). Depois do TTL o
+# valor obsoleto continua sendo servido por PORTAL_INFO_CACHE_STALE_TTL
+# segundos enquanto um unico worker recalcula. 0 desativa o cache.
+PORTAL_INFO_CACHE_TTL = _env_int('PORTAL_INFO_CACHE_TTL', 300)
+PORTAL_INFO_CACHE_STALE_TTL = _env_int('PORTAL_INFO_CACHE_STALE_TTL', 3600)
+
+# Fila de tarefas em segundo plano (core/jobs.py), executada pelo comando
+# processar_tarefas. Falhas sao repetidas com espera exponencial
+# (TAREFAS_BACKOFF_BASE * 2^n, ate TAREFAS_BACKOFF_MAX segundos).
+TAREFAS_EAGER = _env_bool('TAREFAS_EAGER', default=False)
+TAREFAS_MAX_TENTATIVAS = _env_int('TAREFAS_MAX_TENTATIVAS', 5)
+TAREFAS_LEASE_SEGUNDOS = _env_int('TAREFAS_LEASE_SEGUNDOS', 300)
+TAREFAS_BACKOFF_BASE = _env_int('TAREFAS_BACKOFF_BASE', 10)
+TAREFAS_BACKOFF_MAX = _env_int('TAREFAS_BACKOFF_MAX', 3600)
+TAREFAS_CONCORRENCIA = _env_int('TAREFAS_CONCORRENCIA', 2)
+TAREFAS_INTERVALO = _env_int('TAREFAS_INTERVALO', 1)
+# Linhas por lote confirmado nas importacoes de planilha (core/importacao.py).
+IMPORTACAO_LOTE = _env_int('IMPORTACAO_LOTE', 500)
+# Processos que leem abas/arquivos em paralelo em importar_planilha (0 = numero de CPUs).
+IMPORTACAO_PROCESSOS = _env_int('IMPORTACAO_PROCESSOS', 0)
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise + dumps de dados publicos (DUMPS_ROOT).
+    'core.middleware.PortalWhiteNoiseMiddleware',
+    'core.middleware.ApiCompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -188,6 +258,46 @@ if DATABASE_URL:
         ssl_require=not DEBUG,
     )
 
+# Replicas de leitura: lista separada por virgula de URLs de banco.
+# Leituras seguras vao para as replicas (rodizio); escritas e leituras apos
+# escrita na mesma requisicao ficam no primario.
+DATABASE_REPLICAS = []
+_replica_urls = [
+    url.strip()
+    for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+    if url.strip()
+]
+if _replica_urls and dj_database_url is None:
+    raise ImproperlyConfigured(
+        'DATABASE_REPLICA_URLS definido, mas pacote dj-database-url nao esta instalado.'
+    )
+for _index, _url in enumerate(_replica_urls, start=1):
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = dj_database_url.parse(
+        _url,
+        conn_max_age=600,
+        ssl_require=not DEBUG,
+    )
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_REPLICA_RETRY_SECONDS = _env_int('DATABASE_REPLICA_RETRY_SECONDS', default=30)
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter'] if DATABASE_REPLICAS else []
+
+# Perfil de desempenho: "default" mantem o comportamento original; "performance"
+# ativa pool do psycopg (PostgreSQL) ou WAL/mmap/busy timeout (SQLite).
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'default').strip().lower()
+for _database in DATABASES.values():
+    apply_profile(
+        _database,
+        DATABASE_PROFILE,
+        pool_min_size=_env_int('DATABASE_POOL_MIN_SIZE', default=2),
+        pool_max_size=_env_int('DATABASE_POOL_MAX_SIZE', default=4),
+        pool_timeout=_env_int('DATABASE_POOL_TIMEOUT', default=10),
+        sqlite_mmap_size=_env_int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024),
+        sqlite_busy_timeout_ms=_env_int('SQLITE_BUSY_TIMEOUT_MS', default=5000),
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -226,6 +336,54 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # Nomes com hash + .gz/.br; o WhiteNoise serve com cache de longa duracao.
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Dumps .ndjson.gz sao baixados como arquivo gzip.
+WHITENOISE_MIMETYPES = {'.gz': 'application/gzip'}
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Changelists do admin com mais linhas que isso usam a estimativa do
+# planejador do PostgreSQL em vez de COUNT(*).
+ADMIN_ESTIMATED_COUNT_THRESHOLD = _env_int('ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000)
+
+# Janela (dias) da mediana do tempo de resposta no painel do e-SIC.
+ESIC_PAINEL_JANELA_DIAS = _env_int('ESIC_PAINEL_JANELA_DIAS', 365)
+# Cache (segundos) da consulta publica de status por protocolo; invalidado a
+# cada alteracao do pedido. 0 desativa.
+ESIC_STATUS_CACHE_TTL = _env_int('ESIC_STATUS_CACHE_TTL', 60)
+# Estatisticas de execucao das despesas (core/analytics.py). O cache e
+# invalidado a cada alteracao de despesa; o TTL so limita o tempo de vida.
+ANALISE_DESPESAS_CACHE_TTL = _env_int('ANALISE_DESPESAS_CACHE_TTL', 86400)
+ANALISE_DESPESAS_MAX_OUTLIERS = _env_int('ANALISE_DESPESAS_MAX_OUTLIERS', 50)
+
+# Pre-renderizacao do portal publico (home e /api/public/portal-info/) em
+# arquivos estaticos .html/.json + .gz/.br, servidos direto pelo proxy reverso.
+# Fica fora do STATIC_ROOT: o WhiteNoise indexa os estaticos uma unica vez e
+# serviria tamanhos/ETags antigos dos arquivos regravados.
+PORTAL_PRERENDER_ROOT = Path(os.getenv('PORTAL_PRERENDER_ROOT') or BASE_DIR / 'prerender')
+PORTAL_PRERENDER_ON_CHANGE = _env_bool('PORTAL_PRERENDER_ON_CHANGE', default=True)
+
+# Dados abertos em Parquet (core/opendata.py), gerados por gerar_dados_abertos
+# e servidos em DADOS_ABERTOS_URL (de preferencia direto pelo proxy reverso).
+# Fora do STATIC_ROOT, como DUMPS_ROOT: os arquivos sao regravados com o servidor no ar.
+DADOS_ABERTOS_ROOT = Path(os.getenv('DADOS_ABERTOS_ROOT') or BASE_DIR / 'dados-abertos')
+DADOS_ABERTOS_URL = '/dados-abertos/'
+DADOS_ABERTOS_ROW_GROUP = _env_int('DADOS_ABERTOS_ROW_GROUP', 50000)
+DADOS_ABERTOS_COMPRESSAO = os.getenv('DADOS_ABERTOS_COMPRESSAO', 'zstd')
+# Dumps NDJSON + gzip de todos os dados publicos (core/dumps.py), gerados toda
+# noite as DUMPS_HORARIO (hora local) pela fila de tarefas e servidos pelo
+# WhiteNoise em DUMPS_URL. DUMPS_AGENDAR=false quando o agendamento for externo.
+DUMPS_ROOT = Path(os.getenv('DUMPS_ROOT') or BASE_DIR / 'dumps')
+DUMPS_URL = '/dumps/'
+DUMPS_AGENDAR = _env_bool('DUMPS_AGENDAR', default=True)
+DUMPS_HORARIO = os.getenv('DUMPS_HORARIO', '02:30')
+DUMPS_LINHAS_POR_ARQUIVO = _env_int('DUMPS_LINHAS_POR_ARQUIVO', 100000)
+DUMPS_GZIP_NIVEL = _env_int('DUMPS_GZIP_NIVEL', 6)
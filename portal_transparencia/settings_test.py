@@ -0,0 +1,17 @@
+"""Settings da suite de testes (``python manage.py test``).
+
+Troca apenas os backends que dependem de servicos externos ou do
+``collectstatic``. Throttles, caches com TTL e a fila de tarefas continuam
+como em producao; os testes que precisam mudar isso usam ``override_settings``.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import STORAGES
+
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+THROTTLE_STORE_URL = 'locmem://'
+# Sem collectstatic nao ha manifesto de arquivos com hash.
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}